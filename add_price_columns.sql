@@ -0,0 +1,29 @@
+-- Normalisierter Preis (prices.py): "1.200,50 € VB" -> price_eur 1200.50, price_negotiable true
+ALTER TABLE listings
+ADD COLUMN IF NOT EXISTS price_eur numeric,
+ADD COLUMN IF NOT EXISTS price_negotiable boolean DEFAULT false;
+
+-- Preisbereiche, Cleanup und Statistik laufen über den Index statt über alle Zeilen
+CREATE INDEX IF NOT EXISTS idx_listings_price_eur ON listings(price_eur);
+
+-- Bestehende Zeilen einmalig nachziehen (gleiche Regel wie prices.normalize_price)
+UPDATE listings
+SET price_eur = replace(replace(substring(price from '\d[\d.]*(?:,\d+)?'), '.', ''), ',', '.')::numeric,
+    price_negotiable = price ILIKE '%vb%'
+WHERE price_eur IS NULL AND price IS NOT NULL;
+
+-- Preis-Statistik für das Dashboard (/api/stats), optional pro Profil
+CREATE OR REPLACE FUNCTION listing_price_stats(p_profile text DEFAULT NULL)
+RETURNS TABLE (listings bigint, priced bigint, min_eur numeric, avg_eur numeric, max_eur numeric, negotiable bigint)
+LANGUAGE sql STABLE
+AS $$
+    SELECT count(*),
+           count(price_eur),
+           min(price_eur),
+           round(avg(price_eur), 2),
+           max(price_eur),
+           count(*) FILTER (WHERE price_negotiable)
+    FROM listings
+    WHERE deleted IS NOT TRUE
+      AND (p_profile IS NULL OR profile = p_profile);
+$$;
@@ -0,0 +1,36 @@
+-- Such-Profile: mehrere Suchbegriffe/Preisbereiche pro Scraper-Lauf
+CREATE TABLE IF NOT EXISTS search_profiles (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    name text NOT NULL UNIQUE,
+    search_term text NOT NULL,
+    min_price integer,
+    max_price integer,
+    pages integer DEFAULT 2,
+    prompt_template_id uuid,
+    is_active boolean DEFAULT true,
+    created_at timestamptz DEFAULT now()
+);
+
+-- Zusätzliche Ausschluss-Keywords pro Profil (Regel-Engine, rules.py)
+ALTER TABLE search_profiles
+ADD COLUMN IF NOT EXISTS skip_keywords text[] DEFAULT '{}';
+
+-- Modell-Kaskade für den KI-Titel-Check (leer = TITLE_MODELS aus der .env)
+ALTER TABLE search_profiles
+ADD COLUMN IF NOT EXISTS title_models text[];
+
+-- Listings merken, aus welchem Profil sie kommen
+ALTER TABLE listings
+ADD COLUMN IF NOT EXISTS profile text;
+
+CREATE INDEX IF NOT EXISTS idx_listings_profile ON listings(profile);
+
+ALTER TABLE search_profiles ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable access for authenticated users only"
+ON "public"."search_profiles"
+AS PERMISSIVE
+FOR ALL
+TO authenticated
+USING (true)
+WITH CHECK (true);
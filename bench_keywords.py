@@ -0,0 +1,87 @@
+"""
+Benchmark des Keyword-Matchers (keywords.py) gegen einzelne `in`-Checks pro Keyword.
+Synthetische Titel, alle Listen der Regel-Engine (rules.py); optional zusätzliche
+Keywords (--extra-keywords) für breite Suchen mit langen Listen.
+Prüft vorher, dass beide Wege exakt dieselben Treffer liefern.
+
+Aufruf: python bench_keywords.py [--titles 100000] [--extra-keywords 0] [--search-term ps5]
+"""
+
+import argparse
+import random
+import string
+import time
+
+from keywords import KeywordMatcher
+from rules import RuleEngine
+
+VOCAB = [
+    "ps5", "playstation 5", "playstation5", "sony", "konsole", "disc", "digital", "edition",
+    "controller", "dualsense", "edge", "scuf", "headset", "spiele", "game", "bundle", "ovp",
+    "neu", "wie neu", "top zustand", "defekt", "bastler", "ps4", "pro", "slim", "laufwerk",
+    "portal", "remote", "player", "ständer", "wandhalterung", "suche", "ankauf", "miete",
+    "versand", "nur abholung", "rechnung", "garantie", "1tb", "weiß", "schwarz",
+]
+
+
+def synthetic_titles(count: int, seed: int = 42) -> list[str]:
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choice(VOCAB) for _ in range(rnd.randint(3, 9))).title() for _ in range(count)]
+
+
+def extra_keywords(count: int, seed: int = 7) -> list[str]:
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 10))) for _ in range(count)]
+
+
+def naive_scan(groups: dict[str, list[str]], text: str) -> dict[str, set[str]]:
+    """Bisheriger Weg: pro Liste und Keyword ein `in`-Check auf dem kleingeschriebenen Text."""
+    text = text.lower()
+    hits = {}
+    for name, phrases in groups.items():
+        found = {p for p in phrases if p in text}
+        if found:
+            hits[name] = found
+    return hits
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark Keyword-Matcher vs. einzelne in-Checks")
+    arg_parser.add_argument("--titles", type=int, default=100000, help="Anzahl synthetischer Titel")
+    arg_parser.add_argument("--extra-keywords", type=int, default=0, help="Zusätzliche Skip-Keywords")
+    arg_parser.add_argument("--search-term", default="ps5")
+    args = arg_parser.parse_args()
+
+    groups = dict(RuleEngine(args.search_term).matcher.groups)
+    groups["skip"] = groups["skip"] + extra_keywords(args.extra_keywords)
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(groups)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    titles = synthetic_titles(args.titles)
+    phrases = sum(len(p) for p in groups.values())
+
+    # Beide Wege müssen identische Treffer liefern
+    for title in titles[:5000]:
+        assert matcher.scan(title) == naive_scan(groups, title), title
+
+    start = time.perf_counter()
+    for title in titles:
+        naive_scan(groups, title)
+    naive = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for title in titles:
+        matcher.scan(title)
+    compiled = time.perf_counter() - start
+
+    print(f"{args.titles} Titel, {phrases} Keywords in {len(groups)} Listen (Kompilieren: {compile_ms:.1f} ms)")
+    print(f"{'Weg':<10} {'Sekunden':>9} {'Titel/s':>10}")
+    print("-" * 31)
+    print(f"{'in-Checks':<10} {naive:>9.2f} {args.titles / naive:>10.0f}")
+    print(f"{'Matcher':<10} {compiled:>9.2f} {args.titles / compiled:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
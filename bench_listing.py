@@ -0,0 +1,135 @@
+"""
+Benchmark Listing-Record (listing.py) gegen den bisherigen Dict-Weg.
+Misst Speicher pro Listing (tracemalloc) und Durchsatz für: Erzeugen, Filter-Markierung,
+Supabase-Zeile bauen und Zeile wieder einlesen (wie sender.load_listings).
+
+Aufruf: python bench_listing.py [--count 100000]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from listing import Listing, ROW_COLUMNS
+
+
+def make_fields(i: int) -> dict:
+    return {
+        "id": str(3000000000 + i),
+        "title": f"PS5 Disc Edition + {i % 3 + 1} Controller",
+        "price": f"{200 + i % 300} € VB",
+        "link": f"https://www.kleinanzeigen.de/s-anzeige/ps5/{3000000000 + i}-279-1234",
+        "location": "10115 Berlin",
+        "date": "Heute, 12:00",
+        "tags": ["Versand möglich"],
+        "scraped_at": "2026-01-01T12:00:00",
+        "isGesuch": False,
+    }
+
+
+# --- Bisheriger Weg: freie Dicts ---
+
+def dict_create(fields: dict) -> dict:
+    return dict(fields)
+
+
+def dict_mark(l: dict):
+    l['profile'] = "ps5"
+    l['filter_status'] = 'passed_ai_title'
+    l['filter_reason'] = 'AI Title Check Passed'
+    l['category'] = 'normal'
+
+
+def dict_to_row(l: dict) -> dict:
+    return {
+        "id": l['id'], "title": l['title'], "price": l['price'], "price_eur": l.get('price_eur'),
+        "price_negotiable": l.get('price_negotiable', False), "link": l['link'],
+        "location": l.get('location'), "category": l.get('category', 'normal'),
+        "profile": l.get('profile'), "filter_status": l.get('filter_status', 'unknown'),
+        "filter_reason": l.get('filter_reason', 'No check ran'), "session_id": "bench", "data": l,
+    }
+
+
+def dict_from_row(row: dict) -> dict:
+    listing = {k: row.get(k) for k in ("id", "title", "price", "price_eur", "price_negotiable", "link", "location")}
+    listing["category"] = row.get("category", "normal")
+    if row.get("data"):
+        listing.update(row["data"])
+    return listing
+
+
+# --- Listing-Record ---
+
+def record_create(fields: dict) -> Listing:
+    return Listing(**fields)
+
+
+def record_to_row(l: Listing) -> dict:
+    return l.to_row(session_id="bench")
+
+
+PATHS = {
+    "dict": (dict_create, dict_mark, dict_to_row, dict_from_row),
+    "Listing": (record_create, dict_mark, record_to_row, Listing.from_row),
+}
+
+
+def measure_memory(path, fields: list[dict]) -> float:
+    """Bytes pro Listing nach der Filter-Markierung (nur das Objekt selbst, Feldwerte werden geteilt)."""
+    create, mark = path[:2]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [create(f) for f in fields]
+    for l in items:
+        mark(l)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(items)
+
+
+def measure_throughput(path, fields: list[dict]) -> dict[str, float]:
+    create, mark, to_row, from_row = path
+    timings = {}
+
+    start = time.perf_counter()
+    items = [create(f) for f in fields]
+    timings["erzeugen"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for l in items:
+        mark(l)
+    timings["markieren"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = [to_row(l) for l in items]
+    timings["zu Zeile"] = time.perf_counter() - start
+
+    # Zeilen wie aus Supabase: 'data' als eigenes Dict (JSONB)
+    rows = [dict(r, data=dict(r["data"]) if isinstance(r["data"], dict) else r["data"]) for r in rows]
+    start = time.perf_counter()
+    for r in rows:
+        from_row(r)
+    timings["aus Zeile"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark Listing-Record vs. Dict")
+    arg_parser.add_argument("--count", type=int, default=100000, help="Anzahl Listings")
+    args = arg_parser.parse_args()
+
+    fields = [make_fields(i) for i in range(args.count)]
+    # Supabase-Spalten müssen in beiden Wegen gleich sein
+    assert dict_to_row(dict(fields[0], category='normal')).keys() - {"session_id", "data"} == set(ROW_COLUMNS)
+
+    print(f"{'Weg':<8} {'Bytes/Listing':>14} " + " ".join(f"{s:>12}" for s in ("erzeugen", "markieren", "zu Zeile", "aus Zeile")))
+    print("-" * 76)
+    for name, path in PATHS.items():
+        per_item = measure_memory(path, fields)
+        timings = measure_throughput(path, fields)
+        rates = " ".join(f"{args.count / t / 1000:>10.0f}k/s" for t in timings.values())
+        print(f"{name:<8} {per_item:>14.0f} {rates}")
+
+
+if __name__ == "__main__":
+    main()
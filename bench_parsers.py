@@ -0,0 +1,71 @@
+"""
+Benchmark der HTML-Parser-Engines (parsers.py).
+Misst Seiten/s und Items/s auf den eingecheckten Fixtures (fixtures/) sowie auf einer
+synthetischen Ergebnisseite (Fixture-Rahmen + N generierte Anzeigen-Karten).
+
+Aufruf: python bench_parsers.py [--items 25] [--repeat 20]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from parsers import PARSERS
+from replay_stack import build_synthetic_page
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+FIXTURES = ["debug_source.html", "debug_no_adlist.html"]
+
+
+def strip_volatile(listings):
+    """Entfernt Felder, die sich pro Lauf ändern (für den Engine-Vergleich)."""
+    if listings is None:
+        return None
+    return [{k: v for k, v in l.to_dict().items() if k != "scraped_at"} for l in listings]
+
+
+def bench(parser, html: str, repeat: int) -> tuple[float, int]:
+    """Parst `html` `repeat`-mal, liefert (Sekunden gesamt, Items pro Durchlauf)."""
+    items = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = parser.parse(html)
+        items = len(result) if result else 0
+    return time.perf_counter() - start, items
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark der HTML-Parser-Engines")
+    arg_parser.add_argument("--items", type=int, default=25, help="Karten auf der synthetischen Seite")
+    arg_parser.add_argument("--repeat", type=int, default=20, help="Durchläufe pro Engine und Dokument")
+    args = arg_parser.parse_args()
+
+    documents = {}
+    for name in FIXTURES:
+        documents[name] = (FIXTURE_DIR / name).read_text(encoding="utf-8")
+    documents[f"synthetic ({args.items} Karten)"] = build_synthetic_page(documents["debug_no_adlist.html"], args.items)
+
+    engines = {}
+    for name, cls in PARSERS.items():
+        try:
+            engines[name] = cls()
+        except ImportError as e:
+            print(f"⚠️ Engine '{name}' übersprungen: {e}")
+
+    print(f"{'Dokument':<28} {'Engine':<6} {'KB':>6} {'ms/Seite':>10} {'Seiten/s':>9} {'Items':>6} {'Items/s':>9}")
+    print("-" * 80)
+    for doc_name, html in documents.items():
+        # Engines müssen das gleiche Ergebnis liefern
+        results = {name: strip_volatile(p.parse(html)) for name, p in engines.items()}
+        if len({repr(r) for r in results.values()}) > 1:
+            print(f"⚠️ {doc_name}: Engines liefern unterschiedliche Ergebnisse!")
+
+        for name, parser in engines.items():
+            total, items = bench(parser, html, args.repeat)
+            per_page = total / args.repeat
+            print(f"{doc_name:<28} {name:<6} {len(html) / 1024:>6.0f} {per_page * 1000:>10.2f} "
+                  f"{1 / per_page:>9.1f} {items:>6} {items / per_page:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+End-to-End-Benchmark gegen die lokale Replay-Umgebung (replay_stack.py): scraper.main
+(Ergebnisseiten, Filter, Groq, Detailseiten, DB) und optional sender.main (Nachrichten +
+sent_messages) laufen komplett offline und reproduzierbar. Gemessen werden Listings/s
+und die Latenz pro Stufe.
+
+Zustand (SQLite, Session-Dateien, Groq-Berichte) liegt in einem Temp-Verzeichnis,
+data/ und auth.json bleiben unberührt. Browser wie im echten Lauf (Camoufox, lokal).
+
+Aufruf: python bench_pipeline.py [--pages 2] [--items 25] [--send]
+        [--site-latency 0.05] [--groq-latency 0.3] [--groq-token-latency 0.5] [--db-latency 0.02]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+from replay_stack import REPLAY_DIR, ReplayStack
+
+
+class StageTimer:
+    """Umhüllt Modul-Funktionen und summiert Laufzeit, Aufrufe und Listings pro Stufe."""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.calls: Counter = Counter()
+        self.items: Counter = Counter()
+
+    def _record(self, label: str, start: float, args: tuple, result):
+        # Listings = erste Liste in den Argumenten, sonst das Ergebnis (z.B. eine Ergebnisseite)
+        batch = next((a for a in args if isinstance(a, list)), result if isinstance(result, list) else None)
+        self.seconds[label] += time.perf_counter() - start
+        self.calls[label] += 1
+        self.items[label] += len(batch) if batch is not None else 1
+
+    def wrap(self, module, name: str, label: str):
+        func = getattr(module, name)
+        if asyncio.iscoroutinefunction(func):
+            async def timed(*args, **kwargs):
+                start, result = time.perf_counter(), None
+                try:
+                    result = await func(*args, **kwargs)
+                    return result
+                finally:
+                    self._record(label, start, args, result)
+        else:
+            def timed(*args, **kwargs):
+                start, result = time.perf_counter(), None
+                try:
+                    result = func(*args, **kwargs)
+                    return result
+                finally:
+                    self._record(label, start, args, result)
+        setattr(module, name, timed)
+
+    def report(self, title: str):
+        print(f"\n{title}")
+        print(f"{'Stufe':<34} {'Calls':>6} {'Items':>6} {'Σ s':>8} {'ms/Call':>9} {'ms/Item':>9}")
+        print("-" * 76)
+        for label, seconds in self.seconds.items():
+            calls, items = self.calls[label], self.items[label]
+            print(f"{label:<34} {calls:>6} {items:>6} {seconds:>8.2f} "
+                  f"{seconds / calls * 1000:>9.1f} {seconds / max(items, 1) * 1000:>9.1f}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="End-to-End-Benchmark gegen die Replay-Umgebung")
+    arg_parser.add_argument("--term", default="ps5", help="Suchbegriff des Benchmark-Profils")
+    arg_parser.add_argument("--pages", type=int, default=2, help="Ergebnisseiten")
+    arg_parser.add_argument("--items", type=int, default=25, help="Karten pro synthetischer Ergebnisseite")
+    arg_parser.add_argument("--send", action="store_true", help="Danach sender.main gegen die Replay-Site")
+    arg_parser.add_argument("--site-latency", type=float, default=0.05, help="Sekunden pro Seitenabruf")
+    arg_parser.add_argument("--groq-latency", type=float, default=0.3, help="Sekunden pro Groq-Call")
+    arg_parser.add_argument("--groq-token-latency", type=float, default=0.5, help="Zusätzliche Sekunden pro 1000 Tokens")
+    arg_parser.add_argument("--db-latency", type=float, default=0.02, help="Sekunden pro PostgREST-Request")
+    arg_parser.add_argument("--fixtures", default=REPLAY_DIR, help="Aufgezeichnete Seiten (replay_stack.py record)")
+    arg_parser.add_argument("--quota", action="store_true", help="Groq-Quota (LLM_RPM/LLM_TPM) mitmessen")
+    args = arg_parser.parse_args()
+
+    state_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    stack = ReplayStack(items=args.items, site_latency=args.site_latency, groq_latency=args.groq_latency,
+                        groq_token_latency=args.groq_token_latency, db_latency=args.db_latency,
+                        fixtures_dir=args.fixtures)
+    with stack:
+        profiles_file = os.path.join(state_dir, "search_profiles.json")
+        with open(profiles_file, "w", encoding="utf-8") as f:
+            json.dump([{"name": "bench", "search_term": args.term, "min_price": 100, "max_price": 400,
+                        "pages": args.pages}], f)
+
+        # Vor dem Import setzen: die Module lesen ihre Konfiguration beim Laden
+        overrides = {
+            **stack.env(),
+            "STATE_DB": os.path.join(state_dir, "bot_state.db"),
+            "AUTH_FILE": os.path.join(state_dir, "auth.json"),
+            "DEVICE_FILE": os.path.join(state_dir, "device.json"),
+            "DEBUG_DIR": os.path.join(state_dir, "debug"),
+            "SEARCH_PROFILES_FILE": profiles_file,
+            "SCRAPE_HOST_INTERVAL": "0",
+            "PACING_PROFILE": "off",
+            "BROWSER_SERVICE": "false",
+            "HEADLESS": "true",
+            "LLM_QUOTA": "true" if args.quota else "false",
+            "KLEINANZEIGEN_EMAIL": "replay@example.invalid",
+            "KLEINANZEIGEN_PASSWORD": "replay",
+        }
+        os.environ.update(overrides)
+        import scraper
+        # scraper.py lädt die .env mit override=True – ALLES erneut setzen, bevor sender.py
+        # (und alles, was Variablen erst später liest) importiert wird
+        os.environ.update(overrides)
+        import browser_pool
+        import browser_service
+        import local_store
+        import sender
+        from supabase import create_client
+
+        # Nie gegen echten Zustand, echte Session oder echten Account laufen
+        leaks = {name: value for name, value, expected in (
+            ("STATE_DB", local_store.STATE_DB, overrides["STATE_DB"]),
+            ("DEBUG_DIR", scraper.DEBUG_DIR, overrides["DEBUG_DIR"]),
+            ("AUTH_FILE", browser_pool.AUTH_FILE, overrides["AUTH_FILE"]),
+            ("DEVICE_FILE", browser_pool.DEVICE_FILE, overrides["DEVICE_FILE"]),
+            ("KLEINANZEIGEN_EMAIL", sender.EMAIL, overrides["KLEINANZEIGEN_EMAIL"]),
+            ("BROWSER_SERVICE", browser_service.BROWSER_SERVICE, False),
+        ) if value != expected}
+        if leaks:
+            raise SystemExit(f"❌ Benchmark würde echte Konfiguration nutzen: {leaks}")
+        scraper.supabase = sender.supabase = create_client(stack.db.url, "replay")
+        scraper.LLM_RUN_REPORTS = state_dir
+
+        timer = StageTimer()
+        for name, label in (
+            ("_load_result_page", "Ergebnisseite laden + parsen"),
+            ("filter_profile_listings", "Titel-Filter (Regeln/Vor-Klass./KI)"),
+            ("pre_classify", "  Vor-Klassifikator"),
+            ("filter_titles_with_ai", "  KI-Titel-Check"),
+            ("fetch_details_async", "Detailseiten"),
+            ("filter_with_description_async", "Beschreibungs-Check"),
+            ("categorize_listings", "Kategorien"),
+            ("save_listings", "Speichern (listings)"),
+        ):
+            timer.wrap(scraper, name, label)
+
+        start = time.perf_counter()
+        scraper.main()
+        scrape_seconds = time.perf_counter() - start
+        scraped = timer.items["Ergebnisseite laden + parsen"]
+        saved = len(stack.db.tables["listings"])
+        timer.report("📊 scraper.main – Stufen")
+        print(f"\n⏱️ scraper.main: {scrape_seconds:.2f}s, {scraped} Anzeigen gescrapt ({scraped / scrape_seconds:.1f}/s), "
+              f"{saved} gespeichert ({saved / scrape_seconds:.1f}/s)")
+
+        if args.send:
+            send_timer = StageTimer()
+            for name, label in (
+                ("load_listings", "Listings laden"),
+                ("load_message_templates", "Vorlagen laden"),
+                ("send_all_messages", "Senden gesamt"),
+                ("send_message", "  Nachricht senden"),
+            ):
+                send_timer.wrap(sender, name, label)
+            start = time.perf_counter()
+            sender.main()
+            send_seconds = time.perf_counter() - start
+            send_timer.report("📊 sender.main – Stufen")
+            messages = len(stack.site.messages)
+            print(f"\n⏱️ sender.main: {send_seconds:.2f}s, {messages} Nachrichten ({messages / send_seconds:.2f}/s), "
+                  f"{len(stack.db.tables['sent_messages'])} Zeilen in sent_messages")
+
+        print()
+        stack.report()
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
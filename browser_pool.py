@@ -0,0 +1,190 @@
+"""
+Browser-Pool für paralleles Laden von Seiten.
+Hält mehrere Camoufox-Contexts (je eine Page) offen und verteilt Seitenaufrufe
+mit Concurrency-Limit und Pacing pro Host.
+Browser kommen bevorzugt vom warmen Browser-Service (browser_service.py).
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from camoufox.async_api import AsyncCamoufox
+from camoufox.sync_api import Camoufox
+from playwright.async_api import async_playwright
+from playwright.sync_api import sync_playwright
+
+from browser_service import service_endpoint
+from route_filter import install_route_filter, install_route_filter_async
+
+load_dotenv()
+
+# Wie viele Ergebnisseiten gleichzeitig geladen werden
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "3"))
+# Mindestabstand (Sekunden) zwischen zwei Navigationen auf denselben Host
+SCRAPE_HOST_INTERVAL = float(os.getenv("SCRAPE_HOST_INTERVAL", "2.0"))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Session-Dateien (Cookies/User-Agent); eigene Pfade z.B. für die Replay-Umgebung
+AUTH_FILE = os.getenv("AUTH_FILE", os.path.join(BASE_DIR, "auth.json"))
+DEVICE_FILE = os.getenv("DEVICE_FILE", os.path.join(BASE_DIR, "device.json"))
+
+
+class HostPacer:
+    """Vergibt pro Host Zeitslots, damit parallele Pages nicht gleichzeitig feuern."""
+
+    def __init__(self, min_interval: float = SCRAPE_HOST_INTERVAL, jitter: float = 1.0):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._next_slot: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        host = urlparse(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval + random.uniform(0, self.jitter)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class PagePool:
+    """
+    Begrenzter Pool aus Browser-Contexts mit je einer Page.
+    Nutzung: `async with PagePool(browser, size=3) as pool: async with pool.page(url) as page: ...`
+    """
+
+    def __init__(self, browser, size: int = SCRAPE_CONCURRENCY, pacer: HostPacer | None = None,
+                 context_options: dict | None = None):
+        self.browser = browser
+        self.size = max(1, size)
+        self.pacer = pacer or HostPacer()
+        self.context_options = context_options or {}
+        self._contexts = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self):
+        for _ in range(self.size):
+            context = await self.browser.new_context(**self.context_options)
+            await context.set_extra_http_headers({"Accept-Language": "de-DE,de;q=0.9"})
+            await install_route_filter_async(context)
+            page = await context.new_page()
+            self._contexts.append(context)
+            self._idle.put_nowait(page)
+        return self
+
+    async def __aexit__(self, *args):
+        for context in self._contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._contexts = []
+
+    @asynccontextmanager
+    async def page(self, url: str | None = None):
+        """Leiht eine freie Page aus; mit `url` wird vorher auf den Host-Slot gewartet."""
+        page = await self._idle.get()
+        try:
+            if url:
+                await self.pacer.wait(url)
+            yield page
+        finally:
+            self._idle.put_nowait(page)
+
+
+def load_session_files() -> tuple[str | None, list]:
+    """Liest gespeicherten User-Agent (device.json) und Cookies (auth.json)."""
+    user_agent = None
+    if os.path.exists(DEVICE_FILE):
+        try:
+            with open(DEVICE_FILE, 'r') as f:
+                user_agent = json.load(f).get('user_agent')
+        except Exception:
+            pass
+
+    cookies = []
+    if os.path.exists(AUTH_FILE):
+        try:
+            with open(AUTH_FILE, 'r') as f:
+                data = json.load(f)
+            cookies = data.get('cookies', []) if isinstance(data, dict) else data
+        except Exception as e:
+            print(f"   ⚠️ Cookies defekt ({e}), fahre fort.", flush=True)
+    return user_agent, cookies
+
+
+def new_session_context(browser):
+    """
+    Neuer (sync) Context mit gespeichertem User-Agent und vorab injizierten Cookies.
+    WICHTIG: Erst leeren Context, dann Cookies injizieren – storage_state im Konstruktor
+    verursacht "Doppel-Fenster" bei Problemen.
+    """
+    user_agent, cookies = load_session_files()
+    context = browser.new_context(user_agent=user_agent) if user_agent else browser.new_context()
+    install_route_filter(context)
+    if cookies:
+        try:
+            context.add_cookies(cookies)
+            print(f"   💉 {len(cookies)} Cookies injiziert.", flush=True)
+        except Exception as e:
+            print(f"   ❌ Cookie-Fehler: {e}", flush=True)
+    return context
+
+
+@asynccontextmanager
+async def open_browser(headless: bool = True):
+    """Hängt sich an den warmen Browser-Service (falls aktiv) oder startet Camoufox lokal."""
+    endpoint = service_endpoint()
+    if endpoint:
+        playwright = await async_playwright().start()
+        try:
+            browser = await playwright.firefox.connect(endpoint, timeout=15000)
+        except Exception as e:
+            print(f"   ⚠️ Browser-Service nicht nutzbar ({e}), starte lokal.", flush=True)
+            await playwright.stop()
+            browser = None
+
+        if browser:
+            print("♻️ Nutze warmen Browser-Service.", flush=True)
+            try:
+                yield browser
+            finally:
+                # Bei verbundenen Browsern: nur eigene Contexts schließen + trennen
+                await browser.close()
+                await playwright.stop()
+            return
+
+    async with AsyncCamoufox(headless=headless) as browser:
+        yield browser
+
+
+@contextmanager
+def open_browser_sync(headless: bool = True):
+    """Sync-Variante von open_browser (für sender.py)."""
+    endpoint = service_endpoint()
+    if endpoint:
+        playwright = sync_playwright().start()
+        try:
+            browser = playwright.firefox.connect(endpoint, timeout=15000)
+        except Exception as e:
+            print(f"   ⚠️ Browser-Service nicht nutzbar ({e}), starte lokal.", flush=True)
+            playwright.stop()
+            browser = None
+
+        if browser:
+            print("♻️ Nutze warmen Browser-Service.", flush=True)
+            try:
+                yield browser
+            finally:
+                browser.close()
+                playwright.stop()
+            return
+
+    with Camoufox(headless=headless) as browser:
+        yield browser
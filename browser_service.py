@@ -0,0 +1,163 @@
+"""
+Browser-Service (Daemon)
+Startet EINEN Camoufox-Browser als Playwright-Server, an den sich Scraper und Sender
+per WebSocket hängen. Browser-Start und Fingerprint-Generierung passieren so nur einmal
+pro Service-Lebenszeit statt einmal pro Skript und Lauf.
+Warm ist nur der Browser-Prozess: Contexts gehören in Playwright immer zur Verbindung, die sie
+anlegt, und schließen mit ihr. Contexts mit Session-Cookies baut deshalb jeder Client selbst
+(browser_pool.new_session_context) – das kostet Millisekunden, nicht Sekunden.
+
+Start: python browser_service.py   (oder automatisch über main.py, BROWSER_SERVICE=true)
+"""
+
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BROWSER_SERVICE = os.getenv("BROWSER_SERVICE", "true").lower() == "true"
+BROWSER_SERVICE_PORT = int(os.getenv("BROWSER_SERVICE_PORT", "9322"))
+BROWSER_SERVICE_PATH = os.getenv("BROWSER_SERVICE_PATH", "camoufox")
+# Sekunden zwischen zwei Health-Checks des Browsers
+HEALTH_INTERVAL = float(os.getenv("BROWSER_SERVICE_HEALTH_INTERVAL", "60"))
+STATE_FILE = os.path.join(BASE_DIR, "data", "browser_service.json")
+
+WS_ENDPOINT = f"ws://127.0.0.1:{BROWSER_SERVICE_PORT}/{BROWSER_SERVICE_PATH}"
+
+
+def is_port_open(timeout: float = 0.5) -> bool:
+    """Schneller Check, ob der Service-Port lauscht (ohne Playwright zu starten)."""
+    try:
+        with socket.create_connection(("127.0.0.1", BROWSER_SERVICE_PORT), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def service_endpoint() -> str | None:
+    """WebSocket-Endpoint des laufenden Services oder None (dann lokal starten)."""
+    if not BROWSER_SERVICE or not is_port_open():
+        return None
+    return WS_ENDPOINT
+
+
+def check_health(timeout: float = 15000) -> bool:
+    """Verbindet sich kurz mit dem Browser und fragt die Version ab."""
+    from playwright.sync_api import sync_playwright
+    try:
+        with sync_playwright() as p:
+            browser = p.firefox.connect(WS_ENDPOINT, timeout=timeout)
+            version = browser.version
+            browser.close()
+        return bool(version)
+    except Exception as e:
+        print(f"   ⚠️ Health-Check fehlgeschlagen: {e}", flush=True)
+        return False
+
+
+def _launch_server_process() -> subprocess.Popen:
+    """Wie camoufox.server.launch_server, aber mit festem Port/Pfad und Prozess-Handle."""
+    import orjson
+    from camoufox.server import LAUNCH_SCRIPT, get_nodejs, to_camel_case_dict
+    from camoufox.utils import launch_options
+
+    headless = os.getenv("HEADLESS", "true").lower() == "true"
+    config = launch_options(headless=headless)
+    config.update({"port": BROWSER_SERVICE_PORT, "host": "127.0.0.1", "ws_path": BROWSER_SERVICE_PATH})
+
+    nodejs = get_nodejs()
+    process = subprocess.Popen(
+        [nodejs, str(LAUNCH_SCRIPT)],
+        cwd=Path(nodejs).parent / "package",
+        stdin=subprocess.PIPE,
+        text=True,
+    )
+    process.stdin.write(base64.b64encode(orjson.dumps(to_camel_case_dict(config))).decode())
+    process.stdin.close()
+    return process
+
+
+def _wait_until_ready(process: subprocess.Popen, timeout: float = 60) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return False
+        if is_port_open():
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def run_service():
+    """Hauptschleife: Browser starten, überwachen, bei Absturz/Hänger neu starten."""
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+
+    while True:
+        print(f"🌎 Starte Browser-Service auf {WS_ENDPOINT}...", flush=True)
+        started = time.time()
+        process = _launch_server_process()
+
+        if not _wait_until_ready(process):
+            print("❌ Browser-Service nicht hochgekommen, neuer Versuch in 10s.", flush=True)
+            process.kill()
+            time.sleep(10)
+            continue
+
+        print(f"✅ Browser-Service bereit ({time.time() - started:.1f}s).", flush=True)
+        with open(STATE_FILE, "w") as f:
+            json.dump({"ws_endpoint": WS_ENDPOINT, "pid": os.getpid(), "started_at": started}, f)
+
+        try:
+            while process.poll() is None:
+                time.sleep(HEALTH_INTERVAL)
+                if process.poll() is None and not check_health():
+                    print("🚑 Browser reagiert nicht – Neustart.", flush=True)
+                    process.kill()
+        except KeyboardInterrupt:
+            process.kill()
+            return
+
+        print(f"⚠️ Browser-Prozess beendet (Code {process.poll()}), starte neu...", flush=True)
+        time.sleep(2)
+
+
+def ensure_service(timeout: float = 60) -> bool:
+    """Startet den Service im Hintergrund (eigene Session, überlebt den Bot-Lauf), falls nötig."""
+    if not BROWSER_SERVICE:
+        return False
+    if is_port_open():
+        return True
+
+    print("🌎 Browser-Service läuft nicht – starte im Hintergrund...", flush=True)
+    os.makedirs(os.path.join(BASE_DIR, "data"), exist_ok=True)
+    # Der Kindprozess erbt den Dateideskriptor, unsere Kopie kann direkt wieder zu
+    with open(os.path.join(BASE_DIR, "data", "browser_service.log"), "a") as log:
+        subprocess.Popen(
+            [sys.executable, "-u", os.path.join(BASE_DIR, "browser_service.py")],
+            cwd=BASE_DIR,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if is_port_open():
+            print("✅ Browser-Service bereit.", flush=True)
+            return True
+        time.sleep(0.5)
+
+    print("⚠️ Browser-Service nicht erreichbar – Skripte starten eigenen Browser.", flush=True)
+    return False
+
+
+if __name__ == "__main__":
+    run_service()
@@ -1,6 +1,5 @@
 
 import os
-import re
 from dotenv import load_dotenv
 from supabase import create_client
 
@@ -16,39 +15,24 @@ if not url or not key:
 
 supabase = create_client(url, key)
 
-def parse_price(price_str):
-    if not price_str: return 0.0
-    # Entferne 'VB', '€' und Leerzeichen
-    clean = price_str.lower().replace('vb', '').replace('€', '').strip()
-    # Entferne Tausender-Punkte (1.200 -> 1200)
-    clean = clean.replace('.', '')
-    # Ersetze Komma durch Punkt (12,50 -> 12.50)
-    clean = clean.replace(',', '.')
-    try:
-        return float(clean)
-    except:
-        return 0.0
+# Listings über diesem Preis werden gelöscht (Puffer für 300 €)
+CLEANUP_MAX_PRICE = float(os.getenv("CLEANUP_MAX_PRICE", "320"))
 
 def main():
     print("🧹 Starte Datenbank-Bereinigung...")
     
-    # 1. Fetch listings
-    # Pagination loop might be needed if > 1000, but let's try grabbing a chunk
-    response = supabase.table('listings').select('*').execute()
+    # 1. Nur zu teure Listings holen (Filter + Index price_eur in der DB, add_price_columns.sql)
+    response = supabase.table('listings').select('id, title, price') \
+        .gt('price_eur', CLEANUP_MAX_PRICE).execute()
     listings = response.data
     
-    print(f"📊 Analysiere {len(listings)} Listings auf Preise...")
+    print(f"📊 {len(listings)} Listings über {CLEANUP_MAX_PRICE:g} €...")
     
     ids_to_delete = []
     
     for l in listings:
-        p_str = l.get('price', '')
-        price = parse_price(p_str)
-        
-        # LOGIC: Delete if > 320 (Buffer for 300)
-        if price > 320:
-            print(f"   🗑️ Lösche: {l['title'][:30]}... ({p_str})")
-            ids_to_delete.append(l['id'])
+        print(f"   🗑️ Lösche: {l['title'][:30]}... ({l.get('price', '')})")
+        ids_to_delete.append(l['id'])
             
     if not ids_to_delete:
         print("✅ Keine zu teuren Listings gefunden.")
@@ -224,6 +224,14 @@ async def get_stats():
             res_error = supabase.table("sent_messages").select("id", count="exact").eq("status", "failed").execute()
             stats["error"] = res_error.count
             
+            # Preis-Statistik in der DB (add_price_columns.sql); fehlt die Funktion, bleibt sie weg
+            try:
+                res_price = supabase.rpc("listing_price_stats", {}).execute()
+                if res_price.data:
+                    stats["price"] = res_price.data[0]
+            except Exception as e:
+                print(f"DB Price Stats Error: {e}")
+            
             return stats
         except Exception as e:
             print(f"DB Stats Error: {e}")
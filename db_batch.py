@@ -0,0 +1,159 @@
+"""
+Gebündelte Schreibzugriffe auf Supabase (PostgREST).
+Statt eines Requests pro Zeile geht jeder Chunk (DB_BATCH_SIZE Zeilen bzw. IDs) als EIN Upsert,
+Insert oder Update (`.in_("id", ids)`) raus.
+Netzwerk- und Serverfehler werden mit Backoff wiederholt. Lehnt PostgREST einen Chunk wegen
+seiner Daten ab (z.B. eine kaputte Zeile), wird er halbiert, bis nur die schuldigen Zeilen
+übrig bleiben – der Rest des Chunks landet trotzdem in der DB.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from dotenv import load_dotenv
+from postgrest import ReturnMethod
+from postgrest.exceptions import APIError
+
+load_dotenv()
+
+# Zeilen pro Upsert-Request
+DB_BATCH_SIZE = max(1, int(os.getenv("DB_BATCH_SIZE", "100")))
+# Wiederholungen pro Chunk bei Netzwerk-/Serverfehlern (Backoff 0.5, 1, 2 ... Sekunden)
+DB_BATCH_RETRIES = int(os.getenv("DB_BATCH_RETRIES", "3"))
+
+# SQLSTATE-Klassen / PostgREST-Codes, bei denen ein neuer Versuch helfen kann
+# (Verbindung, Ressourcen, Timeout, PostgREST ohne DB-Verbindung)
+TRANSIENT_CODES = ("08", "53", "57", "PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+
+class BatchStats:
+    """Zähler pro Lauf und Tabelle: Zeilen, Requests, Wiederholungen, Halbierungen, nicht geschriebene Zeilen."""
+
+    def __init__(self):
+        self.rows: Counter = Counter()
+        self.failed: Counter = Counter()
+        self.requests: Counter = Counter()
+        self.retries: Counter = Counter()
+        self.bisections: Counter = Counter()
+        self.seconds: dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add(self, totals: dict, table: str, n: float = 1):
+        with self._lock:
+            totals[table] += n
+
+    def report(self):
+        for table in sorted(self.requests):
+            written = self.rows[table] - self.failed[table]
+            seconds = self.seconds[table]
+            line = f"💾 DB [{table}]: {written} Zeilen in {self.requests[table]} Requests"
+            if seconds:
+                line += f", {written / seconds:.0f} Zeilen/s"
+            if self.retries[table]:
+                line += f", {self.retries[table]} Wiederholungen"
+            if self.bisections[table]:
+                line += f", {self.bisections[table]}x halbiert"
+            if self.failed[table]:
+                line += f", {self.failed[table]} nicht geschrieben"
+            print(line, flush=True)
+
+
+# Ein Zähler pro Prozess/Lauf
+RUN_STATS = BatchStats()
+
+
+def is_transient(error: Exception) -> bool:
+    """Netzwerk- und Serverfehler: ja. Von PostgREST abgelehnte Daten: nein."""
+    if not isinstance(error, APIError):
+        return True
+    if isinstance(error.code, int):
+        # Antwort ohne PostgREST-JSON (z.B. 502/503 vom Gateway): code ist der HTTP-Status
+        return error.code >= 500 or error.code == 429
+    code = str(error.code or "")
+    return not code or code.startswith(TRANSIENT_CODES)
+
+
+def _execute(request, table: str, stats: BatchStats):
+    """Führt den Request aus; vorübergehende Fehler werden mit Backoff wiederholt."""
+    for attempt in range(DB_BATCH_RETRIES + 1):
+        stats.add(stats.requests, table)
+        try:
+            return request.execute()
+        except Exception as e:
+            if not is_transient(e) or attempt >= DB_BATCH_RETRIES:
+                raise
+            stats.add(stats.retries, table)
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def _write_chunk(build, table: str, chunk: list, stats: BatchStats, failed: list[tuple]):
+    """`build(chunk)` liefert den Request; bei abgelehnten Daten wird der Chunk halbiert."""
+    try:
+        _execute(build(chunk), table, stats)
+    except Exception as e:
+        if len(chunk) == 1 or is_transient(e):
+            # Einzelne kaputte Zeile – oder die DB ist nicht erreichbar, dann hilft Halbieren nicht
+            failed.extend((item, e) for item in chunk)
+            return
+        stats.add(stats.bisections, table)
+        middle = len(chunk) // 2
+        _write_chunk(build, table, chunk[:middle], stats, failed)
+        _write_chunk(build, table, chunk[middle:], stats, failed)
+
+
+def _write_chunks(build, table: str, items: list, batch_size: int, stats: BatchStats) -> list[tuple]:
+    failed: list[tuple] = []
+    start = time.perf_counter()
+    for i in range(0, len(items), batch_size):
+        _write_chunk(build, table, items[i:i + batch_size], stats, failed)
+    stats.add(stats.rows, table, len(items))
+    stats.add(stats.failed, table, len(failed))
+    stats.add(stats.seconds, table, time.perf_counter() - start)
+    return failed
+
+
+def upsert_rows(client, table: str, rows: list[dict], batch_size: int = DB_BATCH_SIZE,
+                on_conflict: str = "id", stats: BatchStats = RUN_STATS) -> list[tuple[dict, Exception]]:
+    """
+    Upsert von `rows` in Chunks. Gibt (Zeile, Fehler) für jede endgültig abgelehnte Zeile zurück.
+    Doppelte Schlüssel werden vorher zusammengefasst (die letzte Zeile gewinnt) – Postgres
+    lehnt ein Upsert ab, das dieselbe Zeile zweimal ändern würde.
+    """
+    if not rows:
+        return []
+    unique = {}
+    for i, row in enumerate(rows):
+        key = row.get(on_conflict)
+        unique[("row", i) if key is None else key] = row
+    # returning=minimal: PostgREST schickt die Zeilen nicht zurück
+    return _write_chunks(
+        lambda chunk: client.table(table).upsert(chunk, on_conflict=on_conflict, returning=ReturnMethod.minimal),
+        table, list(unique.values()), batch_size, stats,
+    )
+
+
+def insert_rows(client, table: str, rows: list[dict], batch_size: int = DB_BATCH_SIZE,
+                stats: BatchStats = RUN_STATS) -> list[tuple[dict, Exception]]:
+    """Insert von `rows` in Chunks (Tabellen ohne natürlichen Schlüssel, z.B. sent_messages)."""
+    if not rows:
+        return []
+    return _write_chunks(
+        lambda chunk: client.table(table).insert(chunk, returning=ReturnMethod.minimal),
+        table, rows, batch_size, stats,
+    )
+
+
+def update_rows(client, table: str, changes: dict, ids: list, column: str = "id",
+                batch_size: int = DB_BATCH_SIZE, stats: BatchStats = RUN_STATS) -> list[tuple[object, Exception]]:
+    """Setzt `changes` für alle Zeilen mit `column` in `ids` – ein Request pro Chunk statt pro ID."""
+    if not ids:
+        return []
+    return _write_chunks(
+        lambda chunk: client.table(table).update(changes, returning=ReturnMethod.minimal).in_(column, chunk),
+        table, list(dict.fromkeys(ids)), batch_size, stats,
+    )
+
+
+def report_db_writes():
+    RUN_STATS.report()
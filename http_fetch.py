@@ -0,0 +1,112 @@
+"""
+HTTP-Schnellpfad für Ergebnisseiten.
+Die Suchergebnisse sind server-gerendertes HTML – statt einer kompletten Camoufox-Page
+reicht ein Keep-Alive-HTTP-Client mit den Cookies (auth.json) und dem User-Agent
+(device.json) des Browsers. Bei Challenge/Captcha/Rate-Limit wird auf den Browser eskaliert.
+"""
+
+import os
+import httpx
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+from browser_pool import SCRAPE_CONCURRENCY, load_session_files
+from parsers import BASE_URL
+
+load_dotenv()
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+
+# (Merkmal im HTML, Meldung) – dieselben Heuristiken wie beim Debug-Snapshot
+BLOCK_MARKERS = [
+    (("captcha", "challenge"), "CAPTCHA/Challenge erkannt"),
+    (("blocked", "gesperrt"), "IP möglicherweise GEBLOCKT"),
+    (("too many requests",), "Rate Limit erkannt"),
+]
+BLOCK_STATUS = {403: "HTTP 403 (geblockt)", 429: "HTTP 429 (Rate Limit)"}
+
+
+def block_reasons(html: str) -> list[str]:
+    """Hinweise auf Challenge-, Captcha- oder Rate-Limit-Seiten im HTML."""
+    html_lower = html.lower()
+    return [msg for markers, msg in BLOCK_MARKERS if any(m in html_lower for m in markers)]
+
+
+class HttpFetcher:
+    """
+    Gepoolter httpx-Client mit Browser-Session. `fetch` liefert HTML oder None (= Browser nehmen).
+    Nach der ersten Sperre bleibt der Schnellpfad für den Rest des Laufs aus.
+    """
+
+    def __init__(self, concurrency: int = SCRAPE_CONCURRENCY):
+        self.concurrency = concurrency
+        self.enabled = True
+        self.fetched = 0
+        self.escalated = 0
+        self._client: httpx.AsyncClient | None = None
+
+    async def __aenter__(self) -> "HttpFetcher":
+        user_agent, cookies = load_session_files()
+        jar = httpx.Cookies()
+        for c in cookies:
+            jar.set(c['name'], c['value'], domain=c.get('domain', ''), path=c.get('path', '/'))
+
+        headers = {"Accept-Language": "de-DE,de;q=0.9"}
+        if user_agent:
+            headers["User-Agent"] = user_agent
+        self._client = httpx.AsyncClient(
+            headers=headers,
+            cookies=jar,
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    def _escalate(self, url: str, reason: str, disable: bool = False):
+        self.escalated += 1
+        if disable and self.enabled:
+            self.enabled = False
+            print(f"   🚨 {reason} – HTTP-Schnellpfad für diesen Lauf aus, weiter mit Browser.")
+        else:
+            print(f"   ↪️ {reason} – lade {url} mit Browser.")
+
+    async def fetch(self, url: str) -> str | None:
+        """HTML der Seite oder None, wenn der Browser übernehmen soll."""
+        if not self.enabled:
+            return None
+        try:
+            response = await self._client.get(url)
+        except httpx.HTTPError as e:
+            self._escalate(url, f"HTTP-Fehler ({e.__class__.__name__})")
+            return None
+
+        if response.status_code in BLOCK_STATUS:
+            self._escalate(url, BLOCK_STATUS[response.status_code], disable=True)
+            return None
+        if response.status_code != 200:
+            self._escalate(url, f"HTTP {response.status_code}")
+            return None
+        host = response.url.host or ""
+        if not (host.endswith("kleinanzeigen.de") or host == urlparse(BASE_URL).hostname):
+            self._escalate(url, f"Umleitung auf {response.url.host}", disable=True)
+            return None
+
+        self.fetched += 1
+        return response.text
+
+    def reject(self, url: str, html: str):
+        """HTML ohne Anzeigen-Liste: bei Sperr-Hinweisen Schnellpfad aus, sonst nur diese Seite im Browser."""
+        self.fetched -= 1
+        reasons = block_reasons(html)
+        if reasons:
+            self._escalate(url, ", ".join(reasons), disable=True)
+        else:
+            self._escalate(url, "Keine Anzeigen-Liste im HTML")
+
+    def report(self):
+        if self.fetched or self.escalated:
+            print(f"⚡ HTTP-Schnellpfad: {self.fetched} Seiten per HTTP, {self.escalated} an den Browser eskaliert.", flush=True)
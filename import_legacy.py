@@ -3,6 +3,8 @@ import os
 from dotenv import load_dotenv
 from supabase import create_client
 
+from listing import Listing
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -25,7 +27,7 @@ def import_sent():
     print(f"📦 Importiere {len(listings)} gesendete Nachrichten...")
     
     count = 0
-    for l in listings:
+    for l in map(Listing.from_dict, listings):
         try:
             # 1. Erst Listing anlegen (FK constraint)
             listing_data = {
@@ -33,7 +35,7 @@ def import_sent():
                 "title": l.get('title', 'Unknown'),
                 "price": l.get('price', ''),
                 "link": l.get('link', ''),
-                "data": l
+                "data": l.to_dict()
             }
             try:
                 supabase.table("listings").upsert(listing_data).execute()
@@ -64,14 +66,14 @@ def import_ready():
     print(f"📦 Importiere {len(listings)} Ready-Listings...")
     
     count = 0
-    for l in listings:
+    for l in map(Listing.from_dict, listings):
         try:
             listing_data = {
                 "id": l['id'],
                 "title": l['title'],
                 "price": l['price'],
                 "link": l['link'],
-                "data": l
+                "data": l.to_dict()
             }
             supabase.table("listings").upsert(listing_data).execute()
             count += 1
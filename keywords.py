@@ -0,0 +1,77 @@
+"""
+Kompilierter Multi-Keyword-Matcher für Titel und Beschreibungen.
+Alle Keyword-Listen (Skip-Wörter, Defekt-/Abholungs-Phrasen, Suchbegriff-Synonyme ...)
+werden EINMAL zu einem Regex (Trie aus allen Phrasen) kompiliert; `scan` liefert alle
+Treffer eines Textes in einem Durchlauf – mit derselben Semantik wie `phrase in text`.
+"""
+
+import re
+from collections import defaultdict
+
+
+def _trie_pattern(phrases: list[str]) -> str:
+    """Regex aus einem Zeichen-Trie: gemeinsame Präfixe werden nur einmal geprüft, längster Treffer gewinnt."""
+    trie: dict = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        if "" in node:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Gruppierte Keyword-Listen, z.B. {"skip": [...], "defekt": [...]}.
+    Nutzung: `hits = matcher.scan(title)` -> {"skip": {"controller"}, ...}
+    """
+
+    def __init__(self, groups: dict[str, list[str]]):
+        self.groups = {name: [p.lower() for p in phrases if p] for name, phrases in groups.items()}
+        self._phrase_groups: dict[str, list[str]] = defaultdict(list)
+        for name, phrases in self.groups.items():
+            for phrase in phrases:
+                if name not in self._phrase_groups[phrase]:
+                    self._phrase_groups[phrase].append(name)
+
+        phrases = list(self._phrase_groups)
+        # Lookahead: an JEDER Position den längsten Treffer finden (auch überlappend)
+        self._regex = re.compile(f"(?=({_trie_pattern(phrases)}))") if phrases else None
+        # Pro Regex-Treffer alle (Liste, Phrase)-Paare; kürzere Phrasen, die Präfix des
+        # längsten Treffers sind, zählen mit ('ps4' in 'ps4 pro')
+        self._expand = {
+            p: [(name, q) for q in phrases if p.startswith(q) for name in self._phrase_groups[q]]
+            for p in phrases
+        }
+
+    def scan(self, text: str) -> dict[str, set[str]]:
+        """Alle Treffer in `text` (case-insensitive), gruppiert nach Liste."""
+        hits: dict[str, set[str]] = {}
+        if not self._regex or not text:
+            return hits
+        expand = self._expand
+        for phrase in self._regex.findall(text.lower()):
+            if phrase:
+                for name, hit in expand[phrase]:
+                    if name in hits:
+                        hits[name].add(hit)
+                    else:
+                        hits[name] = {hit}
+        return hits
+
+    def first(self, hits: dict[str, set[str]], group: str) -> str | None:
+        """Erster Treffer von `group` in Listen-Reihenfolge (wie `next(kw for kw in liste if kw in text)`)."""
+        found = hits.get(group)
+        if not found:
+            return None
+        return next(p for p in self.groups[group] if p in found)
@@ -0,0 +1,125 @@
+"""
+Listing-Record für Scraper und Sender.
+Feste Feldmenge über __slots__ (weniger Speicher als ein Dict, Tippfehler bei Feldnamen
+fallen sofort als KeyError auf). Dict-Zugriff (l['title'], l.get(...), l.update(...))
+bleibt erhalten, damit Filter und Sender unverändert lesen können.
+"""
+
+FIELDS = (
+    # Aus der Ergebnisseite (parsers.build_listing)
+    "id", "title", "price", "link", "location", "date", "tags", "scraped_at", "isGesuch",
+    # Normalisierter Preis (prices.normalize_prices)
+    "price_eur", "price_negotiable",
+    # Scraper-Pipeline
+    "profile", "filter_status", "filter_reason", "filter_rule", "category", "description", "seller_name",
+    # Wer den Titel entschieden hat ('ai', 'model', 'near_duplicate') – spätere Stufen lassen es stehen
+    "title_source",
+    # Sender
+    "generated_message", "sent", "deleted",
+)
+FIELD_SET = frozenset(FIELDS)
+
+# Spalten der Supabase-Tabelle 'listings', die aus dem Record befüllt werden
+ROW_COLUMNS = (
+    "id", "title", "price", "price_eur", "price_negotiable", "link", "location", "category", "profile",
+    "filter_status", "filter_reason",
+)
+
+_MISSING = object()
+
+
+def _unknown(key) -> KeyError:
+    return KeyError(f"Unbekanntes Listing-Feld: {key!r}")
+
+
+class Listing:
+    # 'extra': unbekannte Schlüssel aus alten 'data'-JSONs (wird nur bei Bedarf angelegt)
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, **fields):
+        if not FIELD_SET.issuperset(fields):
+            raise _unknown(next(k for k in fields if k not in FIELD_SET))
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    def __getitem__(self, key: str):
+        if key not in FIELD_SET:
+            raise _unknown(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        if key not in FIELD_SET:
+            raise _unknown(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in FIELD_SET and hasattr(self, key)
+
+    def get(self, key: str, default=None):
+        """Wie dict.get – aber nur für bekannte Felder."""
+        if key not in FIELD_SET:
+            raise _unknown(key)
+        return getattr(self, key, default)
+
+    def update(self, other: dict):
+        for key, value in other.items():
+            self[key] = value
+
+    def update_lenient(self, other: dict):
+        """Wie update, aber unbekannte Schlüssel landen in `extra` statt einen Fehler zu werfen."""
+        for key, value in other.items():
+            if key in FIELD_SET:
+                setattr(self, key, value)
+            else:
+                extra = getattr(self, "extra", None)
+                if extra is None:
+                    extra = self.extra = {}
+                extra[key] = value
+
+    def __repr__(self) -> str:
+        return f"Listing({self.to_dict()!r})"
+
+    def to_dict(self) -> dict:
+        """Gesetzte Felder (+ extra) als Dict – für das 'data'-JSONB."""
+        data = dict(getattr(self, "extra", None) or ())
+        for key in FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                data[key] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Listing":
+        """Aus einem (evtl. alten) Dict, z.B. 'data'-JSONB oder Legacy-JSON."""
+        listing = cls()
+        listing.update_lenient(data)
+        return listing
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Listing":
+        """Aus einer Supabase-Zeile: Spalten plus 'data'-JSONB (data gewinnt, wie bisher)."""
+        listing = cls()
+        for key in ROW_COLUMNS:
+            setattr(listing, key, row.get(key))
+        listing.category = row.get("category", "normal")
+        if row.get("data"):
+            listing.update_lenient(row["data"])
+        return listing
+
+    def to_row(self, **columns) -> dict:
+        """Zeile für supabase.table('listings').upsert(...); `columns` z.B. session_id, created_at."""
+        row = {key: getattr(self, key, None) for key in ROW_COLUMNS}
+        if row["category"] is None:
+            row["category"] = "normal"
+        if row["filter_status"] is None:
+            row["filter_status"] = "unknown"
+        if row["filter_reason"] is None:
+            row["filter_reason"] = "No check ran"
+        if row["price_negotiable"] is None:
+            row["price_negotiable"] = False
+        row.update(columns)
+        row["data"] = self.to_dict()
+        return row
@@ -0,0 +1,373 @@
+"""
+Groq-Aufrufe der KI-Filter (Titel- und Beschreibungs-Check).
+Ein gemeinsamer Client für den Prozess, höchstens LLM_CONCURRENCY Requests gleichzeitig
+(EINE Semaphore für Threads und Event-Loops zusammen). Vor jedem Call wird Quota aus einem
+prozessübergreifenden Token-Bucket pro Modell genommen (LLM_RPM/LLM_TPM, data/bot_state.db);
+ein 429 pausiert das Modell für alle Prozesse. Latenz, Tokens und Wartezeit pro Call
+landen in RUN_STATS (Bericht am Ende des Laufs, optional als JSON).
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from groq import AsyncGroq, Groq, RateLimitError
+
+from local_store import RateQuota
+
+load_dotenv()
+
+# Gleichzeitige Groq-Requests (Titel-Chunks + Beschreibungen zusammen)
+LLM_CONCURRENCY = max(1, int(os.getenv("LLM_CONCURRENCY", "3")))
+# Wiederholungen nach 429 (Rate Limit), danach gilt der Call als fehlgeschlagen
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Geteilte Quota pro Modell (Groq-Limits des Accounts), über alle Prozesse
+LLM_QUOTA = os.getenv("LLM_QUOTA", "true").lower() == "true"
+LLM_RPM = int(os.getenv("LLM_RPM", "30"))
+LLM_TPM = int(os.getenv("LLM_TPM", "12000"))
+# Abweichende Limits pro Modell: "modell=rpm/tpm,modell2=rpm/tpm"
+LLM_LIMITS = os.getenv("LLM_LIMITS", "")
+
+
+def parse_limits(spec: str) -> dict[str, tuple[int, int]]:
+    limits = {}
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        model, _, values = entry.partition("=")
+        rpm, _, tpm = values.partition("/")
+        limits[model.strip()] = (int(rpm), int(tpm))
+    return limits
+
+
+QUOTA = RateQuota((LLM_RPM, LLM_TPM), parse_limits(LLM_LIMITS)) if LLM_QUOTA else None
+
+
+
+class FairSlots:
+    """
+    Zähl-Semaphore mit EINER FIFO-Warteschlange für Threads und Coroutines. Ein freiwerdender Slot
+    geht direkt an den ältesten Wartenden – wer gerade freigibt, kann nicht sofort wieder
+    überholen (threading.Semaphore lässt das zu, dann verhungern die anderen).
+    """
+
+    def __init__(self, size: int):
+        self._free = size
+        self._waiters: deque = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def acquire_async(self):
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+                    raise
+            # Slot war schon übergeben: zurückgeben (steht die Übergabe noch aus, macht das _grant)
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def _grant(self, future: asyncio.Future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                try:
+                    waiter.get_loop().call_soon_threadsafe(self._grant, waiter)
+                    return
+                except RuntimeError:
+                    continue  # Event-Loop schon geschlossen – nächster Wartender
+            self._free += 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# Gilt für sync (Titel-Chunks im Thread-Pool) und async Calls (Beschreibungen im Event-Loop) zusammen
+_slots = FairSlots(LLM_CONCURRENCY)
+_client: Groq | None = None
+_client_lock = threading.Lock()
+# Pro Event-Loop ein AsyncGroq-Client (httpx-Verbindungen gehören zu einem Loop)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncGroq]" = weakref.WeakKeyDictionary()
+
+
+def estimate_tokens(text: str) -> int:
+    """Grobe Token-Schätzung (~4 Zeichen pro Token)."""
+    return max(1, len(text) // 4)
+
+
+class LlmStats:
+    """
+    Zähler pro Lauf und Art ('title', 'desc', 'desc_batch' ...): Calls, Listings, Latenz,
+    Prompt-/Completion-Tokens, Wartezeit auf Quota und 429er. Jeder Call wird zusätzlich
+    einzeln gemerkt (für den JSON-Bericht).
+    """
+
+    def __init__(self):
+        self.calls: dict[str, int] = defaultdict(int)
+        self.items: dict[str, int] = defaultdict(int)
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.prompt_tokens: dict[str, int] = defaultdict(int)
+        self.completion_tokens: dict[str, int] = defaultdict(int)
+        self.quota_wait: dict[str, float] = defaultdict(float)
+        self.rate_limited: dict[str, int] = defaultdict(int)
+        # Listings, die eine Stufe (z.B. ein Modell der Kaskade) abschließend entschieden hat
+        self.resolved: dict[str, int] = defaultdict(int)
+        self.log: list[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, label: str, seconds: float, items: int = 1, model: str | None = None,
+               prompt_tokens: int = 0, completion_tokens: int = 0, quota_wait: float = 0.0):
+        with self._lock:
+            self.calls[label] += 1
+            self.items[label] += items
+            self.seconds[label] += seconds
+            self.prompt_tokens[label] += prompt_tokens
+            self.completion_tokens[label] += completion_tokens
+            self.quota_wait[label] += quota_wait
+            self.log.append({
+                "label": label, "model": model, "at": round(time.time(), 3), "latency": round(seconds, 3),
+                "items": items, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "quota_wait": round(quota_wait, 3),
+            })
+
+    def record_rate_limit(self, label: str):
+        with self._lock:
+            self.rate_limited[label] += 1
+
+    def record_resolved(self, label: str, items: int):
+        with self._lock:
+            self.resolved[label] += items
+
+    def labels(self) -> list[str]:
+        return sorted(set(self.calls) | set(self.rate_limited))
+
+    def report(self):
+        for label in self.labels():
+            calls, items, seconds = self.calls[label], self.items[label], self.seconds[label]
+            line = f"⏱️ Groq [{label}]: {calls} Calls für {items} Listings"
+            if calls:
+                line += (f", Ø {seconds / calls:.2f}s pro Call, Ø {seconds / max(items, 1):.2f}s pro Listing, "
+                         f"Tokens {self.prompt_tokens[label]} + {self.completion_tokens[label]}")
+            if label in self.resolved:
+                line += f", {self.resolved[label]} entschieden"
+            if self.quota_wait[label] >= 0.1:
+                line += f", {self.quota_wait[label]:.1f}s auf Quota gewartet"
+            if self.rate_limited[label]:
+                line += f", {self.rate_limited[label]}x 429"
+            print(line, flush=True)
+
+    def save(self, path: str):
+        """Alle Calls des Laufs + Summen pro Art als JSON (z.B. data/llm_runs/<session_id>.json)."""
+        if not self.log and not self.rate_limited:
+            return
+        summary = {
+            label: {"calls": self.calls[label], "items": self.items[label], "seconds": round(self.seconds[label], 3),
+                    "prompt_tokens": self.prompt_tokens[label], "completion_tokens": self.completion_tokens[label],
+                    "quota_wait": round(self.quota_wait[label], 3), "rate_limited": self.rate_limited[label],
+                    "resolved": self.resolved.get(label)}
+            for label in self.labels()
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"summary": summary, "calls": self.log}, f, indent=2)
+        print(f"   📝 Groq-Bericht: {path}")
+
+
+# Ein Zähler pro Prozess/Lauf
+RUN_STATS = LlmStats()
+
+
+def get_client() -> Groq:
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Retries machen wir selbst (außerhalb der Semaphore, mit Retry-After)
+            # Key erst hier lesen: scraper.py lädt die .env mit override=True
+            _client = Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+        return _client
+
+
+def _retry_after(error: RateLimitError, attempt: int) -> float:
+    """Wartezeit aus dem Retry-After-Header, sonst exponentiell (1, 2, 4 ... Sekunden)."""
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return float(2 ** attempt)
+
+
+def _answer(response) -> tuple[str, str | None]:
+    choice = response.choices[0]
+    return (choice.message.content or "").strip(), getattr(choice, "finish_reason", None)
+
+
+def _settle(model: str, reserved: int, response, label: str, seconds: float, items: int, waited: float):
+    """Tatsächliche Tokens aus response.usage: Bucket korrigieren und Call protokollieren."""
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    if QUOTA and (prompt_tokens or completion_tokens):
+        QUOTA.settle(model, reserved, prompt_tokens + completion_tokens)
+    RUN_STATS.record(label, seconds, items, model, prompt_tokens, completion_tokens, waited)
+
+
+def _refund(model: str, reserved: int):
+    """Call ohne Antwort (429 bis zum Schluss, Netzwerkfehler ...): reservierte Tokens zurück in den Bucket."""
+    if QUOTA:
+        QUOTA.settle(model, reserved, 0)
+
+
+def _rate_limited(model: str, label: str, error: RateLimitError, attempt: int) -> float:
+    """429: Modell für alle Prozesse pausieren, Wartezeit bis zum nächsten Versuch."""
+    wait = _retry_after(error, attempt)
+    RUN_STATS.record_rate_limit(label)
+    if QUOTA:
+        QUOTA.block(model, wait)
+    print(f"   ⏳ Groq Rate Limit – neuer Versuch in {wait:.1f}s ({attempt + 1}/{LLM_MAX_RETRIES})", flush=True)
+    return wait
+
+
+def wait_for_quota(model: str, tokens: int) -> float:
+    """Blockiert, bis der Bucket Request + Tokens hergibt. Gibt die Wartezeit zurück."""
+    waited = 0.0
+    while QUOTA:
+        wait = QUOTA.reserve(model, tokens)
+        if not wait:
+            break
+        time.sleep(wait)
+        waited += wait
+    return waited
+
+
+async def wait_for_quota_async(model: str, tokens: int) -> float:
+    """Wie wait_for_quota; reserve() sperrt SQLite (BEGIN IMMEDIATE, bis 30s) – daher im Thread."""
+    waited = 0.0
+    while QUOTA:
+        wait = await asyncio.to_thread(QUOTA.reserve, model, tokens)
+        if not wait:
+            break
+        await asyncio.sleep(wait)
+        waited += wait
+    return waited
+
+
+def complete(prompt: str, model: str, max_tokens: int, temperature: float = 0.0,
+             label: str = "llm", items: int = 1) -> tuple[str, str | None]:
+    """Ein Chat-Completion-Call -> (Antworttext, finish_reason). Wirft nach LLM_MAX_RETRIES x 429."""
+    client = get_client()
+    reserved = estimate_tokens(prompt) + max_tokens
+    # EINE Reservierung pro Call (auch über 429-Wiederholungen); auf Quota warten, ohne einen Slot zu belegen
+    waited = wait_for_quota(model, reserved)
+    settled = False
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            with _slots:
+                try:
+                    start = time.perf_counter()
+                    response = client.chat.completions.create(
+                        model=model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    )
+                    settled = True
+                    _settle(model, reserved, response, label, time.perf_counter() - start, items, waited)
+                    return _answer(response)
+                except RateLimitError as e:
+                    if attempt >= LLM_MAX_RETRIES:
+                        RUN_STATS.record_rate_limit(label)
+                        raise
+                    wait = _rate_limited(model, label, e, attempt)
+            # Slot freigeben, während wir warten
+            time.sleep(wait)
+    finally:
+        if not settled:
+            _refund(model, reserved)
+
+
+def _async_client() -> AsyncGroq:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+    return client
+
+
+@asynccontextmanager
+async def _async_slot():
+    """Slot aus derselben FIFO-Warteschlange wie die sync Calls, ohne den Event-Loop zu blockieren."""
+    await _slots.acquire_async()
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+async def complete_async(prompt: str, model: str, max_tokens: int, temperature: float = 0.0,
+                         label: str = "llm", items: int = 1) -> tuple[str, str | None]:
+    """Async-Variante von complete (teilt sich LLM_CONCURRENCY mit den sync Calls)."""
+    client = _async_client()
+    reserved = estimate_tokens(prompt) + max_tokens
+    waited = await wait_for_quota_async(model, reserved)
+    settled = False
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            async with _async_slot():
+                try:
+                    start = time.perf_counter()
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    )
+                    seconds = time.perf_counter() - start
+                except RateLimitError as e:
+                    if attempt >= LLM_MAX_RETRIES:
+                        RUN_STATS.record_rate_limit(label)
+                        raise
+                    error = e
+                else:
+                    error = None
+            # Quota-Bucket (SQLite-Sperre) nie direkt im Event-Loop anfassen
+            if error is None:
+                settled = True
+                await asyncio.to_thread(_settle, model, reserved, response, label, seconds, items, waited)
+                return _answer(response)
+            wait = await asyncio.to_thread(_rate_limited, model, label, error, attempt)
+            await asyncio.sleep(wait)
+    finally:
+        if not settled:
+            await asyncio.to_thread(_refund, model, reserved)
@@ -0,0 +1,376 @@
+"""
+Lokaler Zustand des Bots (SQLite unter data/bot_state.db).
+Überlebt Container-Neustarts über das Volume ./data (docker-compose.yml).
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_DB = os.getenv("STATE_DB", os.path.join(BASE_DIR, "data", "bot_state.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_ads (
+    id TEXT PRIMARY KEY,
+    price TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_seen_ads_last_seen ON seen_ads(last_seen);
+CREATE TABLE IF NOT EXISTS ad_details (
+    id TEXT PRIMARY KEY,
+    description TEXT,
+    seller_name TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS llm_verdicts (
+    key TEXT PRIMARY KEY,
+    passed INTEGER NOT NULL,
+    reason TEXT,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_verdicts_last_used ON llm_verdicts(last_used);
+CREATE TABLE IF NOT EXISTS llm_quota (
+    model TEXT PRIMARY KEY,
+    requests REAL NOT NULL,
+    tokens REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS send_journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    listing_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+
+
+def get_conn() -> sqlite3.Connection:
+    """Gemeinsame Verbindung (thread-safe über _lock, WAL für parallele Prozesse)."""
+    global _conn
+    with _lock:
+        if _conn is None:
+            os.makedirs(os.path.dirname(STATE_DB), exist_ok=True)
+            _conn = sqlite3.connect(STATE_DB, timeout=30, check_same_thread=False)
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.executescript(SCHEMA)
+        return _conn
+
+
+class SeenIndex:
+    """
+    Index bereits gesehener data-adids mit letztem Preis.
+    Wird beim Start komplett geladen (ein paar tausend IDs) und am Ende des Laufs gespeichert.
+    """
+
+    def __init__(self, max_age_days: float = 30):
+        self.max_age_days = max_age_days
+        self.known: dict[str, str] = {}
+
+    def load(self) -> "SeenIndex":
+        conn = get_conn()
+        with _lock:
+            # Alte Einträge wegräumen, damit wiederkehrende Anzeigen neu geprüft werden
+            conn.execute("DELETE FROM seen_ads WHERE last_seen < ?", (time.time() - self.max_age_days * 86400,))
+            conn.commit()
+            self.known = dict(conn.execute("SELECT id, price FROM seen_ads").fetchall())
+        print(f"   🗂️ Seen-Index: {len(self.known)} bekannte Anzeigen geladen.")
+        return self
+
+    def is_unchanged(self, listing: dict) -> bool:
+        """Bekannte ID mit gleichem Preis wie beim letzten Mal."""
+        return listing['id'] in self.known and self.known[listing['id']] == listing.get('price', '')
+
+    def page_fully_known(self, page_listings: list[dict]) -> bool:
+        """True, wenn die Seite nur aus bekannten, unveränderten Anzeigen besteht."""
+        return bool(page_listings) and all(self.is_unchanged(l) for l in page_listings)
+
+    def fresh(self, listings: list[dict]) -> list[dict]:
+        """Nur neue oder im Preis geänderte Listings."""
+        return [l for l in listings if not self.is_unchanged(l)]
+
+    def save(self, listings: list[dict]):
+        """Markiert Listings als gesehen (inkl. aktuellem Preis)."""
+        now = time.time()
+        conn = get_conn()
+        with _lock:
+            conn.executemany(
+                """INSERT INTO seen_ads (id, price, first_seen, last_seen) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET price = excluded.price, last_seen = excluded.last_seen""",
+                [(l['id'], l.get('price', ''), now, now) for l in listings if l.get('id')]
+            )
+            conn.commit()
+        for l in listings:
+            if l.get('id'):
+                self.known[l['id']] = l.get('price', '')
+
+
+class DetailCache:
+    """
+    Cache für Detailseiten (Beschreibung, Verkäufer) pro data-adid mit TTL.
+    Eine Beschreibung wird so einmal pro Anzeige geholt, nicht einmal pro Lauf.
+    """
+
+    def __init__(self, ttl_hours: float = 168):
+        self.ttl_hours = ttl_hours
+
+    def get_many(self, ids: list[str]) -> dict[str, dict]:
+        """Gültige Cache-Einträge für `ids` (abgelaufene zählen als fehlend)."""
+        if not ids:
+            return {}
+        min_ts = time.time() - self.ttl_hours * 3600
+        conn = get_conn()
+        with _lock:
+            rows = conn.execute(
+                f"SELECT id, description, seller_name FROM ad_details "
+                f"WHERE fetched_at >= ? AND id IN ({','.join('?' * len(ids))})",
+                (min_ts, *ids)
+            ).fetchall()
+        return {r[0]: {"description": r[1], "seller_name": r[2]} for r in rows}
+
+    def put(self, ad_id: str, details: dict):
+        conn = get_conn()
+        with _lock:
+            conn.execute(
+                """INSERT INTO ad_details (id, description, seller_name, fetched_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET description = excluded.description,
+                   seller_name = excluded.seller_name, fetched_at = excluded.fetched_at""",
+                (ad_id, details.get('description'), details.get('seller_name'), time.time())
+            )
+            conn.commit()
+
+    def prune(self):
+        """Abgelaufene Einträge löschen."""
+        conn = get_conn()
+        with _lock:
+            conn.execute("DELETE FROM ad_details WHERE fetched_at < ?", (time.time() - self.ttl_hours * 3600,))
+            conn.commit()
+
+
+def prompt_version(*parts: str) -> str:
+    """Kurzer Hash über Prompt-Gerüst, Modell etc. – ändert sich der Prompt, greift der Cache nicht mehr."""
+    return hashlib.sha1("\x00".join(parts).encode()).hexdigest()[:12]
+
+
+class VerdictCache:
+    """
+    Cache für KI-Urteile (Titel- und Beschreibungs-Check).
+    Schlüssel: Art des Checks, Prompt-Version, normalisierter Titel und Preis-Bucket
+    (+ optional ein Hash der Beschreibung). Treffer sparen den Groq-Call; Einträge laufen
+    nach `ttl_hours` ab, über `max_entries` werden die am längsten unbenutzten verdrängt.
+    """
+
+    def __init__(self, ttl_hours: float = 72, max_entries: int = 20000, price_bucket: float = 25):
+        self.ttl_hours = ttl_hours
+        self.max_entries = max_entries
+        self.price_bucket = price_bucket
+        self.stats: Counter = Counter()
+
+    def key(self, kind: str, version: str, title: str, price_eur: float | None, extra: str = "") -> str:
+        # 'PS5 Disc-Edition!!' und 'ps5 disc edition' sind derselbe Titel; 240 € und 245 € derselbe Bucket
+        norm = " ".join(re.findall(r"[0-9a-zäöüß]+", (title or "").lower()))
+        bucket = "-" if price_eur is None else int(price_eur // self.price_bucket)
+        if extra:
+            extra = hashlib.sha1(extra.encode()).hexdigest()[:12]
+        return f"{kind}:{version}:{bucket}:{norm}:{extra}"
+
+    def get_many(self, kind: str, keys: list[str]) -> dict[str, tuple[bool, str]]:
+        """Gültige Urteile für `keys` -> {key: (passed, reason)}; zählt Treffer/Fehlschläge pro Art."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if keys:
+            now = time.time()
+            conn = get_conn()
+            with _lock:
+                rows = conn.execute(
+                    f"SELECT key, passed, reason FROM llm_verdicts "
+                    f"WHERE created_at >= ? AND key IN ({','.join('?' * len(keys))})",
+                    (now - self.ttl_hours * 3600, *keys)
+                ).fetchall()
+                found = {r[0]: (bool(r[1]), r[2]) for r in rows}
+                if found:
+                    conn.executemany("UPDATE llm_verdicts SET last_used = ? WHERE key = ?",
+                                     [(now, k) for k in found])
+                    conn.commit()
+        self.stats[f"{kind}_hit"] += len(found)
+        self.stats[f"{kind}_miss"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, verdicts: dict[str, tuple[bool, str]]):
+        """Speichert {key: (passed, reason)} und verdrängt bei Bedarf die ältesten Einträge."""
+        if not verdicts:
+            return
+        now = time.time()
+        conn = get_conn()
+        with _lock:
+            conn.executemany(
+                """INSERT INTO llm_verdicts (key, passed, reason, created_at, last_used) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET passed = excluded.passed, reason = excluded.reason,
+                   created_at = excluded.created_at, last_used = excluded.last_used""",
+                [(k, int(passed), reason, now, now) for k, (passed, reason) in verdicts.items()]
+            )
+            count = conn.execute("SELECT count(*) FROM llm_verdicts").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM llm_verdicts WHERE key IN "
+                    "(SELECT key FROM llm_verdicts ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            conn.commit()
+
+    def prune(self):
+        """Abgelaufene Urteile löschen."""
+        conn = get_conn()
+        with _lock:
+            conn.execute("DELETE FROM llm_verdicts WHERE created_at < ?", (time.time() - self.ttl_hours * 3600,))
+            conn.commit()
+
+    def report(self):
+        """Treffer/Fehlschläge des Laufs pro Check-Art."""
+        for kind, label in (("title", "Titel"), ("desc", "Beschreibung")):
+            hits, misses = self.stats[f"{kind}_hit"], self.stats[f"{kind}_miss"]
+            if hits or misses:
+                print(f"🧠 KI-Cache {label}: {hits} Treffer, {misses} an Groq "
+                      f"({hits / (hits + misses):.0%} gespart)", flush=True)
+
+
+class RateQuota:
+    """
+    Geteilter Token-Bucket pro Modell (Requests und Tokens pro Minute) in data/bot_state.db.
+    Alle Prozesse (Scraper-Läufe, Trigger aus dem Dashboard) ziehen aus demselben Bucket;
+    BEGIN IMMEDIATE sperrt die Datenbank kurz, damit zwei Prozesse nicht dieselben Tokens nehmen.
+    """
+
+    def __init__(self, default: tuple[int, int], limits: dict[str, tuple[int, int]] | None = None):
+        self.default = default
+        self.limits = limits or {}
+
+    def limit(self, model: str) -> tuple[int, int]:
+        """(Requests pro Minute, Tokens pro Minute) für `model`."""
+        return self.limits.get(model, self.default)
+
+    def _update(self, model: str, change) -> float:
+        """Liest den Bucket (aufgefüllt bis jetzt), wendet `change` an und schreibt ihn zurück."""
+        rpm, tpm = self.limit(model)
+        now = time.time()
+        conn = get_conn()
+        with _lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT requests, tokens, blocked_until, updated_at FROM llm_quota WHERE model = ?", (model,)
+                ).fetchone()
+                requests, tokens, blocked_until, updated_at = row or (rpm, tpm, 0.0, now)
+                elapsed = max(0.0, now - updated_at)
+                bucket = {
+                    "requests": min(rpm, requests + elapsed * rpm / 60),
+                    "tokens": min(tpm, tokens + elapsed * tpm / 60),
+                    "blocked_until": blocked_until,
+                }
+                result = change(bucket, now, rpm, tpm)
+                conn.execute(
+                    """INSERT INTO llm_quota (model, requests, tokens, blocked_until, updated_at) VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT(model) DO UPDATE SET requests = excluded.requests, tokens = excluded.tokens,
+                       blocked_until = excluded.blocked_until, updated_at = excluded.updated_at""",
+                    (model, bucket["requests"], bucket["tokens"], bucket["blocked_until"], now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def reserve(self, model: str, tokens: int) -> float:
+        """Nimmt 1 Request + `tokens` aus dem Bucket. 0 = los, sonst Sekunden bis zum nächsten Versuch."""
+        def change(bucket, now, rpm, tpm):
+            # Ein Call über dem Minutenlimit muss trotzdem irgendwann durchkommen
+            needed = min(tokens, tpm)
+            if now < bucket["blocked_until"]:
+                return bucket["blocked_until"] - now
+            if bucket["requests"] < 1 or bucket["tokens"] < needed:
+                return max((1 - bucket["requests"]) * 60 / rpm, (needed - bucket["tokens"]) * 60 / tpm, 0.05)
+            bucket["requests"] -= 1
+            bucket["tokens"] -= needed
+            return 0.0
+        return self._update(model, change)
+
+    def settle(self, model: str, reserved: int, used: int):
+        """Korrigiert die Schätzung nach dem Call um die tatsächlich verbrauchten Tokens."""
+        def change(bucket, now, rpm, tpm):
+            # Rückgabe (used < reserved) nie über das Minutenlimit hinaus
+            bucket["tokens"] = min(tpm, bucket["tokens"] - (used - min(reserved, tpm)))
+        self._update(model, change)
+
+    def block(self, model: str, seconds: float):
+        """Nach einem 429: alle Prozesse pausieren dieses Modell für `seconds`."""
+        def change(bucket, now, rpm, tpm):
+            bucket["blocked_until"] = max(bucket["blocked_until"], now + seconds)
+            bucket["requests"] = min(bucket["requests"], 0.0)
+        self._update(model, change)
+
+
+class SendJournal:
+    """
+    Journal der Sende-Ergebnisse, bevor sie in Supabase stehen (write_behind.py).
+    Jeder Eintrag ist ein Schreibauftrag: target 'sent_messages' (payload = Zeile) oder
+    'listings' (payload = Änderungen für listing_id). Erledigte Einträge werden gelöscht,
+    was nach einem Absturz übrig ist, schreibt der nächste Lauf nach.
+    """
+
+    def append(self, entries: list[tuple[str, str, dict]]):
+        """(target, listing_id, payload) – alle in einer Transaktion, fsync über SQLite."""
+        now = time.time()
+        conn = get_conn()
+        with _lock:
+            conn.executemany(
+                "INSERT INTO send_journal (target, listing_id, payload, created_at) VALUES (?, ?, ?, ?)",
+                [(target, str(listing_id), json.dumps(payload), now) for target, listing_id, payload in entries]
+            )
+            conn.commit()
+
+    def pending(self, limit: int = 1000) -> list[tuple[int, str, str, dict]]:
+        """Älteste offene Einträge als (seq, target, listing_id, payload)."""
+        conn = get_conn()
+        with _lock:
+            rows = conn.execute(
+                "SELECT seq, target, listing_id, payload FROM send_journal ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [(seq, target, listing_id, json.loads(payload)) for seq, target, listing_id, payload in rows]
+
+    def count(self) -> int:
+        conn = get_conn()
+        with _lock:
+            return conn.execute("SELECT COUNT(*) FROM send_journal").fetchone()[0]
+
+    def sent_ids(self) -> set[str]:
+        """Listings mit erfolgreich gesendeter Nachricht, die noch nicht in sent_messages stehen."""
+        conn = get_conn()
+        with _lock:
+            rows = conn.execute(
+                "SELECT listing_id FROM send_journal WHERE target = 'sent_messages' "
+                "AND json_extract(payload, '$.status') = 'sent'"
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def done(self, seqs: list[int]):
+        if not seqs:
+            return
+        conn = get_conn()
+        with _lock:
+            conn.executemany("DELETE FROM send_journal WHERE seq = ?", [(seq,) for seq in seqs])
+            conn.commit()
@@ -8,6 +8,8 @@ import sys
 import time
 from pathlib import Path
 
+from browser_service import ensure_service, run_service
+
 
 def run_script(script_name: str) -> bool:
     """Führt ein Python-Script aus und zeigt die Ausgabe."""
@@ -35,7 +37,7 @@ import argparse
 def main():
     parser = argparse.ArgumentParser(description="Kleinanzeigen Bot")
     parser = argparse.ArgumentParser(description="Kleinanzeigen Bot")
-    parser.add_argument("--mode", type=str, default="full", choices=["full", "scrape", "send", "login"], help="Modus: full, scrape, send, login")
+    parser.add_argument("--mode", type=str, default="full", choices=["full", "scrape", "send", "login", "service"], help="Modus: full, scrape, send, login, service")
     args = parser.parse_args()
     
     mode = args.mode
@@ -44,6 +46,16 @@ def main():
     print("🎮 KLEINANZEIGEN PS5 BOT")
     print(f"Modus: {mode.upper()}")
     print("="*60)
+
+    # Nur Browser-Service (Daemon) im Vordergrund
+    if mode == "service":
+        run_service()
+        return
+
+    # Warmen Browser-Service sicherstellen: Scraper + Sender hängen sich daran,
+    # statt jeweils einen eigenen Camoufox zu starten
+    if mode in ["full", "scrape", "send"]:
+        ensure_service()
     
     # Schritt 1: Scraper
     if mode in ["full", "scrape"]:
@@ -0,0 +1,138 @@
+"""
+Near-Duplicate-Erkennung für Titel vor dem KI-Titel-Check.
+"PS5 Disc Edition + 2 Controller" und "PS5 disc edition mit 2 controllern" sind für die KI
+dieselbe Frage: Titel werden normalisiert, in Zeichen-Shingles zerlegt und per MinHash
+(+ LSH-Bänder für die Kandidatensuche) geclustert. Nur der erste Titel eines Clusters geht
+an Groq, die anderen übernehmen sein Urteil. Modell-Tokens (ps4/ps5, 1tb/825gb, "series x"/"s")
+müssen dabei exakt gleich sein – sonst wären PS4 und PS5 mit sonst gleichem Titel ein Cluster.
+"""
+
+import os
+import re
+import zlib
+from collections import Counter, defaultdict
+from dotenv import load_dotenv
+
+from llm import estimate_tokens
+
+load_dotenv()
+
+NEAR_DUPLICATES = os.getenv("NEAR_DUPLICATES", "true").lower() == "true"
+# Geschätzte Jaccard-Ähnlichkeit der Shingles, ab der zwei Titel als Duplikat gelten
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+# Preise im Cluster dürfen höchstens so weit (relativ) auseinander liegen
+NEAR_DUP_PRICE_TOLERANCE = float(os.getenv("NEAR_DUP_PRICE_TOLERANCE", "0.2"))
+
+NUM_PERM = 64
+BANDS, ROWS = 16, 4  # 16 x 4 = 64; Kandidat ab ca. 50 % Ähnlichkeit
+SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+_PERMS = [((i * 0x9E3779B1 + 1) % _PRIME, (i * 0x85EBCA77 + 7) % _PRIME) for i in range(1, NUM_PERM + 1)]
+
+# Füllwörter, die an der Frage "ist das das Gerät?" nichts ändern
+STOPWORDS = {"mit", "und", "inkl", "inklusive", "plus", "samt", "sowie", "incl", "the", "a"}
+SYNONYMS = [
+    (re.compile(r"playstation\s*(\d)"), r"ps\1"),
+    (re.compile(r"\bxbox\s+series\b"), "xbox"),
+    # '1 TB' = '1tb', '825 GB' = '825gb'
+    (re.compile(r"\b(\d+)\s*(tb|gb)\b"), r"\1\2"),
+]
+UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def normalize_title(title: str) -> str:
+    """Kleinschreibung, Umlaute, Synonyme, ohne Füllwörter; einfache Plural-/Kasusendungen weg."""
+    text = (title or "").lower()
+    for pattern, repl in SYNONYMS:
+        text = pattern.sub(repl, text)
+    words = []
+    for word in re.findall(r"[0-9a-zäöüß]+", text.translate(UMLAUTS)):
+        if word in STOPWORDS:
+            continue
+        # 'controllern' -> 'controller', 'spiele' -> 'spiel' (nur längere Wörter ohne Ziffern)
+        if len(word) > 5 and not any(c.isdigit() for c in word):
+            word = re.sub(r"(n|en|e|s)$", "", word)
+        words.append(word)
+    return " ".join(words)
+
+
+def model_tokens(norm: str) -> frozenset[str]:
+    """Wörter mit Ziffern (ps5, 1tb, 2) und einzelne Buchstaben (xbox x / s) aus dem normalisierten Titel."""
+    return frozenset(w for w in norm.split() if len(w) == 1 or any(c.isdigit() for c in w))
+
+
+def shingles(norm: str) -> set[str]:
+    if len(norm) <= SHINGLE_SIZE:
+        return {norm}
+    return {norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+
+
+def minhash(items: set[str]) -> tuple[int, ...]:
+    hashes = [zlib.crc32(s.encode()) for s in items]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    """Geschätzte Jaccard-Ähnlichkeit (Anteil gleicher MinHash-Werte)."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def _prices_close(a: float | None, b: float | None) -> bool:
+    if a is None or b is None:
+        return a is b
+    return abs(a - b) <= NEAR_DUP_PRICE_TOLERANCE * max(a, b, 1.0)
+
+
+# Zähler pro Lauf: Titel, davon an Groq geschickt, geschätzte gesparte Prompt-Tokens
+RUN_STATS: Counter = Counter()
+
+
+def cluster_titles(listings: list) -> list[list]:
+    """
+    Gruppiert Listings mit fast gleichem Titel und ähnlichem Preis.
+    Jeder Cluster ist eine Liste, deren erstes Element der Vertreter ist (Reihenfolge bleibt).
+    """
+    if not NEAR_DUPLICATES or len(listings) < 2:
+        RUN_STATS["titles"] += len(listings)
+        RUN_STATS["sent"] += len(listings)
+        return [[l] for l in listings]
+
+    clusters: list[list] = []
+    signatures: list[tuple[int, ...]] = []
+    tokens: list[frozenset[str]] = []
+    buckets: dict[tuple, list[int]] = defaultdict(list)
+    for l in listings:
+        norm = normalize_title(l['title'])
+        sig, model = minhash(shingles(norm)), model_tokens(norm)
+        bands = [(b, sig[b * ROWS:(b + 1) * ROWS]) for b in range(BANDS)]
+        candidates = dict.fromkeys(i for band in bands for i in buckets.get(band, ()))
+        match = next(
+            (i for i in candidates
+             if tokens[i] == model
+             and similarity(sig, signatures[i]) >= NEAR_DUP_THRESHOLD
+             and _prices_close(l.get('price_eur'), clusters[i][0].get('price_eur'))),
+            None,
+        )
+        if match is not None:
+            clusters[match].append(l)
+            continue
+        clusters.append([l])
+        signatures.append(sig)
+        tokens.append(model)
+        for band in bands:
+            buckets[band].append(len(clusters) - 1)
+
+    RUN_STATS["titles"] += len(listings)
+    RUN_STATS["sent"] += len(clusters)
+    RUN_STATS["tokens_saved"] += sum(
+        estimate_tokens(f"{m['title']} | {m.get('price')}") for c in clusters for m in c[1:]
+    )
+    return clusters
+
+
+def report_near_duplicates():
+    """Zusammengefasste Titel und geschätzte gesparte Prompt-Tokens des Laufs."""
+    titles, sent = RUN_STATS["titles"], RUN_STATS["sent"]
+    if titles:
+        print(f"🪞 Near-Duplicates: {titles - sent} von {titles} Titeln zusammengefasst, "
+              f"~{RUN_STATS['tokens_saved']} Prompt-Tokens gespart", flush=True)
@@ -0,0 +1,127 @@
+"""
+Warten & Pacing
+- wait_ready / wait_ready_async: Readiness-Waits (Selector, Network-Idle) statt fester Sleeps.
+  Warten nur so lange, bis die Seite wirklich bereit ist.
+- PacingPolicy: bewusst gewählte, menschlich wirkende Pausen pro Schritt mit Budget
+  pro Einheit (z.B. pro Listing). Profil über PACING_PROFILE, einzelne Schritte über
+  PACE_<SCHRITT>=min,max (z.B. PACE_BETWEEN_MESSAGES=20,40).
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Sekunden (min, max) pro Schritt
+PROFILES = {
+    "off": {},
+    "fast": {
+        "after_navigation": (0.2, 0.6),
+        "after_scroll": (0.1, 0.3),
+        "after_click": (0.2, 0.5),
+        "typing": (0.1, 0.3),
+        "after_send": (0.5, 1.0),
+        "between_messages": (1.0, 3.0),
+    },
+    "normal": {
+        "after_navigation": (0.8, 2.0),
+        "after_scroll": (0.3, 0.8),
+        "after_click": (0.4, 1.0),
+        "typing": (0.4, 1.0),
+        "after_send": (1.0, 2.0),
+        "between_messages": (3.0, 8.0),
+    },
+    "slow": {
+        "after_navigation": (2.0, 4.0),
+        "after_scroll": (1.0, 2.0),
+        "after_click": (1.5, 2.5),
+        "typing": (0.5, 1.0),
+        "after_send": (2.0, 3.0),
+        "between_messages": (10.0, 30.0),
+    },
+}
+
+PACING_PROFILE = os.getenv("PACING_PROFILE", "normal").lower()
+# Max. Pacing-Sekunden pro Einheit (Listing); 0 = unbegrenzt
+PACING_BUDGET = float(os.getenv("PACING_BUDGET", "15"))
+
+
+def _load_steps(profile: str) -> dict[str, tuple[float, float]]:
+    steps = dict(PROFILES.get(profile, PROFILES["normal"]))
+    for key, value in os.environ.items():
+        if key.startswith("PACE_"):
+            try:
+                lo, hi = (float(v) for v in value.split(","))
+                steps[key[5:].lower()] = (lo, hi)
+            except ValueError:
+                print(f"⚠️ Ungültiger Pacing-Wert {key}={value} (erwartet: min,max)")
+    return steps
+
+
+class PacingPolicy:
+    """Plant menschlich wirkende Pausen mit Budget; Readiness ist NICHT ihre Aufgabe."""
+
+    def __init__(self, profile: str = PACING_PROFILE, budget: float = PACING_BUDGET):
+        self.steps = _load_steps(profile)
+        self.budget = budget
+        self.remaining = budget
+        self.spent: dict[str, float] = defaultdict(float)
+
+    def start_unit(self):
+        """Neues Budget, z.B. vor jedem Listing."""
+        self.remaining = self.budget
+
+    def _draw(self, step: str, budgeted: bool) -> float:
+        lo, hi = self.steps.get(step, (0.0, 0.0))
+        duration = random.uniform(lo, hi)
+        if budgeted and self.budget > 0:
+            duration = min(duration, max(0.0, self.remaining))
+            self.remaining -= duration
+        self.spent[step] += duration
+        return duration
+
+    def pause(self, step: str, budgeted: bool = True):
+        """Pause für `step`; budgeted=False für Pausen außerhalb des Einheiten-Budgets."""
+        duration = self._draw(step, budgeted)
+        if duration > 0:
+            time.sleep(duration)
+
+    async def pause_async(self, step: str, budgeted: bool = True):
+        duration = self._draw(step, budgeted)
+        if duration > 0:
+            await asyncio.sleep(duration)
+
+    def report(self):
+        total = sum(self.spent.values())
+        if not total:
+            return
+        details = ", ".join(f"{k}={v:.1f}s" for k, v in sorted(self.spent.items(), key=lambda x: -x[1]))
+        print(f"⏱️ Pacing: {total:.1f}s gesamt [{details}]", flush=True)
+
+
+def wait_ready(page, selector: str | None = None, timeout: float = 10000, state: str = "visible") -> bool:
+    """Wartet auf `selector` (oder Network-Idle ohne Selector). False bei Timeout."""
+    try:
+        if selector:
+            page.wait_for_selector(selector, state=state, timeout=timeout)
+        else:
+            page.wait_for_load_state("networkidle", timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+async def wait_ready_async(page, selector: str | None = None, timeout: float = 10000, state: str = "visible") -> bool:
+    """Async-Variante von wait_ready."""
+    try:
+        if selector:
+            await page.wait_for_selector(selector, state=state, timeout=timeout)
+        else:
+            await page.wait_for_load_state("networkidle", timeout=timeout)
+        return True
+    except Exception:
+        return False
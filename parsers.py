@@ -0,0 +1,231 @@
+"""
+HTML-Parser für Kleinanzeigen-Ergebnisseiten.
+Austauschbare Engines: 'lxml' (schnell, Standard) und 'soup' (BeautifulSoup, Fallback).
+Auswahl über HTML_PARSER in der .env.
+
+Alternativ extrahiert AD_CARDS_JS die Karten direkt im Browser (EXTRACT_MODE=dom),
+dann wird nur eine kompakte JSON-Liste statt des ganzen Dokuments übertragen.
+"""
+
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+
+from listing import Listing
+
+load_dotenv()
+
+# Überschreibbar für die lokale Replay-Umgebung (replay_stack.py / bench_pipeline.py)
+BASE_URL = os.getenv("KLEINANZEIGEN_BASE_URL", "https://www.kleinanzeigen.de").rstrip("/")
+
+
+def build_listing(id_, title: str, href: str, price: str, details: list[str], tags: list[str]) -> Listing:
+    """Baut den Listing-Record – identisch für alle Engines."""
+    location = ""
+    date_str = ""
+    if len(details) >= 2:
+        location = details[0]
+        date_str = details[1]
+
+    return Listing(
+        id=id_,
+        title=title,
+        price=price,
+        link=BASE_URL + href,
+        location=location,
+        date=date_str,
+        tags=tags,
+        scraped_at=datetime.now().isoformat(),
+        isGesuch="Gesuch" in title or "suche" in title.lower() # Grober check
+    )
+
+
+class ListingParser:
+    """Interface: `parse(html)` liefert die Listings einer Seite oder None, wenn die Anzeigen-Liste fehlt."""
+    name = "base"
+
+    def parse(self, html: str) -> list[Listing] | None:
+        raise NotImplementedError
+
+
+class SoupParser(ListingParser):
+    """Bisheriger Weg über BeautifulSoup + html.parser (langsam, aber ohne Extra-Abhängigkeit)."""
+    name = "soup"
+
+    def parse(self, html: str) -> list[Listing] | None:
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, "html.parser")
+
+        ad_list = soup.find('ul', id='srchrslt-adtable')
+        if not ad_list:
+            return None
+
+        listings = []
+        for item in ad_list.find_all('li', class_='ad-listitem'):
+            if 'is-topad' in item.get('class', []): continue # Skip Top Ads (oft Werbung)
+
+            article = item.find('article')
+            if not article: continue
+
+            try:
+                link_elem = article.find('a', class_='ellipsis')
+                if not link_elem: continue
+
+                # Preis
+                price_elem = article.find('p', class_='aditem-main--middle--price-shipping--price')
+                price = price_elem.get_text().strip() if price_elem else ""
+
+                # Ort / Zeit
+                details_elem = article.find('div', class_='aditem-main--top--left')
+                details = []
+                if details_elem:
+                    txt = details_elem.get_text(separator='|').strip()
+                    details = [p.strip() for p in txt.split('|') if p.strip()]
+
+                # Tags
+                tags_elem = article.find('div', class_='aditem-main--bottom')
+                tags = []
+                if tags_elem:
+                    tags = [t.get_text().strip() for t in tags_elem.find_all('span', class_='text-module-end')]
+
+                listings.append(build_listing(
+                    article.get('data-adid'), link_elem.get_text().strip(), link_elem.get('href'),
+                    price, details, tags
+                ))
+            except Exception as e:
+                print(f"   Parsing Fehler für Item: {e}")
+                continue
+
+        return listings
+
+
+def _has_class(cls: str) -> str:
+    """XPath-Prädikat: Element hat CSS-Klasse `cls` (wie BeautifulSoup class_=...)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+class LxmlParser(ListingParser):
+    """Schnelle Engine über lxml (libxml2) + vorkompilierte XPath-Ausdrücke."""
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree
+        self._ad_list = etree.XPath("//ul[@id='srchrslt-adtable']")
+        self._items = etree.XPath(f".//li[{_has_class('ad-listitem')}]")
+        self._article = etree.XPath(".//article")
+        self._link = etree.XPath(f".//a[{_has_class('ellipsis')}]")
+        self._price = etree.XPath(f".//p[{_has_class('aditem-main--middle--price-shipping--price')}]")
+        self._details = etree.XPath(f".//div[{_has_class('aditem-main--top--left')}]")
+        self._tags = etree.XPath(f".//div[{_has_class('aditem-main--bottom')}]//span[{_has_class('text-module-end')}]")
+        self._texts = etree.XPath(".//text()")
+
+    def parse(self, html: str) -> list[Listing] | None:
+        import lxml.html
+        doc = lxml.html.document_fromstring(html)
+
+        ad_list = self._ad_list(doc)
+        if not ad_list:
+            return None
+
+        listings = []
+        for item in self._items(ad_list[0]):
+            if 'is-topad' in (item.get('class') or '').split(): continue # Skip Top Ads (oft Werbung)
+
+            article = self._article(item)
+            if not article: continue
+            article = article[0]
+
+            try:
+                link_elem = self._link(article)
+                if not link_elem: continue
+                link_elem = link_elem[0]
+
+                price_elem = self._price(article)
+                price = price_elem[0].text_content().strip() if price_elem else ""
+
+                details_elem = self._details(article)
+                details = []
+                if details_elem:
+                    txt = '|'.join(self._texts(details_elem[0]))
+                    details = [p.strip() for p in txt.split('|') if p.strip()]
+
+                tags = [t.text_content().strip() for t in self._tags(article)]
+
+                listings.append(build_listing(
+                    article.get('data-adid'), link_elem.text_content().strip(), link_elem.get('href'),
+                    price, details, tags
+                ))
+            except Exception as e:
+                print(f"   Parsing Fehler für Item: {e}")
+                continue
+
+        return listings
+
+
+# Läuft via page.evaluate im Browser. Liefert null, wenn die Anzeigen-Liste fehlt.
+AD_CARDS_JS = """
+() => {
+    const adList = document.querySelector('#srchrslt-adtable');
+    if (!adList) return null;
+
+    const texts = (el) => {
+        if (!el) return [];
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        const out = [];
+        while (walker.nextNode()) {
+            const t = walker.currentNode.textContent.trim();
+            if (t) out.push(t);
+        }
+        return out;
+    };
+
+    return Array.from(adList.querySelectorAll('li.ad-listitem article')).map(article => {
+        const link = article.querySelector('a.ellipsis');
+        const price = article.querySelector('p.aditem-main--middle--price-shipping--price');
+        return {
+            id: article.getAttribute('data-adid'),
+            title: link ? link.textContent.trim() : null,
+            href: link ? link.getAttribute('href') : null,
+            price: price ? price.textContent.trim() : '',
+            details: texts(article.querySelector('div.aditem-main--top--left')),
+            tags: Array.from(article.querySelectorAll('div.aditem-main--bottom span.text-module-end'))
+                .map(t => t.textContent.trim()),
+            top_ad: article.closest('li.ad-listitem').classList.contains('is-topad'),
+        };
+    });
+}
+"""
+
+
+def parse_cards(cards: list[dict] | None) -> list[Listing] | None:
+    """Wandelt das Ergebnis von AD_CARDS_JS in Listings um (Top Ads und Karten ohne Link fallen raus)."""
+    if cards is None:
+        return None
+
+    listings = []
+    for card in cards:
+        if card.get('top_ad') or not card.get('href'):
+            continue
+        try:
+            listings.append(build_listing(
+                card['id'], card['title'], card['href'], card['price'], card['details'], card['tags']
+            ))
+        except Exception as e:
+            print(f"   Parsing Fehler für Item: {e}")
+    return listings
+
+
+PARSERS = {
+    "lxml": LxmlParser,
+    "soup": SoupParser,
+}
+
+
+def get_parser(name: str | None = None) -> ListingParser:
+    """Liefert die konfigurierte Engine; fällt auf BeautifulSoup zurück, wenn lxml fehlt."""
+    name = (name or os.getenv("HTML_PARSER", "lxml")).lower()
+    try:
+        return PARSERS.get(name, LxmlParser)()
+    except ImportError:
+        print(f"   ⚠️ Parser '{name}' nicht verfügbar (lxml fehlt?), nutze BeautifulSoup.")
+        return SoupParser()
@@ -0,0 +1,320 @@
+"""
+Lokaler Vor-Klassifikator für Titel (zwischen Regel-Engine und KI-Titel-Check).
+Gelernt aus den bisherigen KI-Urteilen in Supabase 'listings': Titel, die den KI-Titel-Check
+bestanden haben (passed, passed_ai_title, rejected_ai_desc) gegen rejected_ai_title.
+Gehashte Wort- und Zeichen-n-Gramme + logistische Regression, reines Python auf der CPU.
+Ein Modell pro Such-Profil; nur Titel im unsicheren Band zwischen den beiden Schwellen
+gehen noch an Groq.
+
+Training: python pre_classifier.py train [--input export.json] [--target-precision 0.97]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import time
+import zlib
+from collections import Counter, defaultdict
+from dotenv import load_dotenv
+
+from prices import parse_price
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PRE_CLASSIFIER = os.getenv("PRE_CLASSIFIER", "true").lower() == "true"
+PRE_CLASSIFIER_FILE = os.getenv("PRE_CLASSIFIER_FILE", os.path.join(BASE_DIR, "data", "title_classifier.json"))
+
+DIMENSIONS = 2 ** 18
+# Labels: Titel hat den KI-Titel-Check bestanden (1) oder nicht (0)
+POSITIVE_STATUS = ("passed", "passed_ai_title", "rejected_ai_desc")
+NEGATIVE_STATUS = ("rejected_ai_title",)
+# Urteile des Modells selbst und Fehler-Fallbacks sind keine KI-Labels
+MODEL_REASON = "Title model"
+UNLABELED_REASONS = (MODEL_REASON, "Error fallback")
+# Herkunft des Titel-Urteils (Listing 'title_source', landet im 'data'-JSONB). filter_reason
+# überschreibt der Beschreibungs-Check später, title_source bleibt – nur 'ai' ist ein Label.
+TITLE_SOURCE_AI = "ai"
+TITLE_SOURCE_MODEL = "model"
+TITLE_SOURCE_DUPLICATE = "near_duplicate"
+
+
+def features(title: str, price_eur: float | None) -> dict[int, float]:
+    """Wörter, Wort-Bigramme, Zeichen-3/4-Gramme und Preisstufe -> L2-normierter Hash-Vektor."""
+    words = re.findall(r"[0-9a-zäöüß]+", (title or "").lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams += [f"#{padded[i:i + n]}" for n in (3, 4) for i in range(len(padded) - n + 1)]
+    # Preisstufen (0-1, 2-3, 4-7 ... €): Zubehör ist meist billig
+    grams.append("€:-" if price_eur is None else f"€:{int(math.log2(price_eur + 1))}")
+    counts = Counter(zlib.crc32(g.encode()) % DIMENSIONS for g in grams)
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    return {k: v / norm for k, v in counts.items()}
+
+
+def _sigmoid(z: float) -> float:
+    if z < -35:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+class TitleClassifier:
+    """Lineares Modell eines Profils mit Schwellen: p >= high -> angenommen, p <= low -> abgelehnt."""
+
+    def __init__(self, weights: dict[int, float], bias: float, low: float = 0.0, high: float = 1.0,
+                 meta: dict | None = None):
+        self.weights = weights
+        self.bias = bias
+        self.low = low
+        self.high = high
+        self.meta = meta or {}
+
+    def predict(self, title: str, price_eur: float | None) -> float:
+        """Wahrscheinlichkeit, dass die KI den Titel annehmen würde."""
+        weights = self.weights
+        return _sigmoid(self.bias + sum(weights.get(k, 0.0) * v for k, v in features(title, price_eur).items()))
+
+    @classmethod
+    def fit(cls, samples: list[tuple[dict[int, float], int]], epochs: int = 8, learning_rate: float = 0.5,
+            l2: float = 1e-5, seed: int = 42) -> "TitleClassifier":
+        """Logistische Regression per SGD mit AdaGrad (dünn besetzt, nur berührte Gewichte)."""
+        weights: dict[int, float] = defaultdict(float)
+        grad_sq: dict[int, float] = defaultdict(lambda: 1e-8)
+        bias, bias_sq = 0.0, 1e-8
+        order = list(range(len(samples)))
+        rnd = random.Random(seed)
+        for _ in range(epochs):
+            rnd.shuffle(order)
+            for i in order:
+                x, y = samples[i]
+                error = _sigmoid(bias + sum(weights[k] * v for k, v in x.items())) - y
+                for k, v in x.items():
+                    g = error * v + l2 * weights[k]
+                    grad_sq[k] += g * g
+                    weights[k] -= learning_rate * g / math.sqrt(grad_sq[k])
+                bias_sq += error * error
+                bias -= learning_rate * error / math.sqrt(bias_sq)
+        return cls({k: w for k, w in weights.items() if abs(w) > 1e-4}, bias)
+
+    def to_dict(self) -> dict:
+        return {"weights": {str(k): round(w, 6) for k, w in self.weights.items()}, "bias": self.bias,
+                "low": self.low, "high": self.high, "meta": self.meta}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TitleClassifier":
+        return cls({int(k): w for k, w in data["weights"].items()}, data["bias"], data["low"], data["high"],
+                   data.get("meta"))
+
+
+def choose_band(scored: list[tuple[float, int]], target: float, min_count: int = 5) -> tuple[float, float]:
+    """
+    Schwellen aus Holdout-Daten: `high` so niedrig, dass alle Titel mit p >= high noch zu `target`
+    von der KI angenommen wurden; `low` analog für Ablehnungen. Ohne genug Daten: alles unsicher.
+    """
+    high, positives = 1.01, 0
+    for k, (p, y) in enumerate(sorted(scored, key=lambda s: -s[0]), 1):
+        positives += y
+        if k >= min_count and positives / k >= target:
+            high = p
+    low, negatives = -0.01, 0
+    for k, (p, y) in enumerate(sorted(scored, key=lambda s: s[0]), 1):
+        negatives += 1 - y
+        if k >= min_count and negatives / k >= target:
+            low = p
+    # Nie annehmen, was das Modell eher für 'nein' hält (und umgekehrt)
+    high, low = max(high, 0.5), min(low, 0.5)
+    return min(low, high - 1e-6), high
+
+
+def evaluate(scored: list[tuple[float, int]], low: float, high: float) -> dict:
+    """Precision/Recall gegen die KI-Labels und Anteil der Titel, die Groq nicht mehr sieht."""
+    accepted = [y for p, y in scored if p >= high]
+    rejected = [y for p, y in scored if p <= low]
+    positives = sum(y for _, y in scored)
+    negatives = len(scored) - positives
+    at_half = [(p >= 0.5, y) for p, y in scored]
+    tp = sum(1 for pred, y in at_half if pred and y)
+    return {
+        "holdout": len(scored),
+        "precision@0.5": tp / max(sum(1 for pred, _ in at_half if pred), 1),
+        "recall@0.5": tp / max(positives, 1),
+        "accept_precision": sum(accepted) / max(len(accepted), 1),
+        "accept_recall": sum(accepted) / max(positives, 1),
+        "reject_precision": (len(rejected) - sum(rejected)) / max(len(rejected), 1),
+        "reject_recall": (len(rejected) - sum(rejected)) / max(negatives, 1),
+        "llm_avoided": (len(accepted) + len(rejected)) / max(len(scored), 1),
+    }
+
+
+def label_rows(rows: list[dict], default_profile: str) -> dict[str, list[tuple[str, float | None, int]]]:
+    """Zeilen aus 'listings' -> {profil: [(titel, preis, label)]} (nur echte KI-Urteile)."""
+    by_profile = defaultdict(list)
+    for row in rows:
+        status, reason = row.get("filter_status"), row.get("filter_reason") or ""
+        if status not in POSITIVE_STATUS + NEGATIVE_STATUS:
+            continue
+        source = row.get("title_source")
+        if source is not None and source != TITLE_SOURCE_AI:
+            continue
+        # Ältere Zeilen ohne title_source: nur filter_reason als Anhaltspunkt
+        if source is None and reason.startswith(UNLABELED_REASONS):
+            continue
+        price = row.get("price_eur")
+        if price is None and row.get("price"):
+            price = parse_price(row["price"]) or None
+        by_profile[row.get("profile") or default_profile].append(
+            (row.get("title") or "", price, int(status in POSITIVE_STATUS))
+        )
+    return by_profile
+
+
+def train_profile(samples: list[tuple[str, float | None, int]], target: float,
+                  holdout_share: float = 0.2, seed: int = 42) -> TitleClassifier:
+    """Trainiert auf 80 %, wählt Schwellen und misst auf den restlichen 20 %."""
+    samples = samples[:]
+    random.Random(seed).shuffle(samples)
+    split = int(len(samples) * (1 - holdout_share))
+    train, holdout = samples[:split], samples[split:]
+    model = TitleClassifier.fit([(features(t, p), y) for t, p, y in train], seed=seed)
+    scored = [(model.predict(t, p), y) for t, p, y in holdout]
+    model.low, model.high = choose_band(scored, target)
+    model.meta = {"trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "rows": len(samples),
+                  "positive_share": round(sum(y for *_, y in samples) / len(samples), 3),
+                  "target_precision": target, **evaluate(scored, model.low, model.high)}
+    return model
+
+
+def fetch_rows(supabase) -> list[dict]:
+    """Alle Listings mit KI-Urteil aus Supabase (seitenweise, PostgREST liefert max. 1000 pro Request)."""
+    rows, start, page = [], 0, 1000
+    while True:
+        res = supabase.table("listings") \
+            .select("title, price, price_eur, profile, filter_status, filter_reason, title_source:data->>title_source") \
+            .in_("filter_status", list(POSITIVE_STATUS + NEGATIVE_STATUS)) \
+            .range(start, start + page - 1).execute()
+        rows += res.data or []
+        if len(res.data or []) < page:
+            return rows
+        start += page
+
+
+# --- Inferenz im Scraper ---
+
+_MODELS: dict[str, TitleClassifier] | None = None
+RUN_STATS: dict[str, Counter] = defaultdict(Counter)
+
+
+def load_models() -> dict[str, TitleClassifier]:
+    """Modelle aus PRE_CLASSIFIER_FILE (einmal pro Prozess); fehlt die Datei, gibt es keine."""
+    global _MODELS
+    if _MODELS is None:
+        _MODELS = {}
+        if PRE_CLASSIFIER and os.path.exists(PRE_CLASSIFIER_FILE):
+            with open(PRE_CLASSIFIER_FILE, "r") as f:
+                data = json.load(f)
+            if data.get("dimensions") != DIMENSIONS:
+                print("⚠️ Vor-Klassifikator: Modell passt nicht zu den Features, bitte neu trainieren.")
+                return _MODELS
+            _MODELS = {name: TitleClassifier.from_dict(m) for name, m in data.get("profiles", {}).items()}
+            print(f"🧮 Vor-Klassifikator: Modelle für {', '.join(_MODELS) or '-'} geladen.")
+    return _MODELS
+
+
+def pre_classify(listings: list, profile: dict) -> list:
+    """
+    Entscheidet sichere Titel lokal ('passed_ai_title' / 'rejected_ai_title', Grund 'Title model: p').
+    Unsichere bleiben 'passed_prefilter' und gehen an die KI.
+    """
+    model = load_models().get(profile['name'])
+    if not model:
+        return listings
+    stats = RUN_STATS[profile['name']]
+    for l in listings:
+        if l.get('filter_status') != 'passed_prefilter':
+            continue
+        p = model.predict(l['title'], l.get('price_eur'))
+        if p >= model.high:
+            l['filter_status'] = 'passed_ai_title'
+            l['filter_reason'] = f"{MODEL_REASON}: {p:.2f}"
+            l['title_source'] = TITLE_SOURCE_MODEL
+            stats['accepted'] += 1
+        elif p <= model.low:
+            l['filter_status'] = 'rejected_ai_title'
+            l['filter_reason'] = f"{MODEL_REASON}: {p:.2f}"
+            l['title_source'] = TITLE_SOURCE_MODEL
+            stats['rejected'] += 1
+        else:
+            stats['uncertain'] += 1
+    print(f"🧮 Vor-Klassifikator '{profile['name']}': {stats['accepted']} angenommen, "
+          f"{stats['rejected']} abgelehnt, {stats['uncertain']} unsicher (an die KI) bisher im Lauf.")
+    return listings
+
+
+def report_pre_classifier():
+    """Anteil der Titel pro Profil, die ohne Groq entschieden wurden."""
+    for name, stats in RUN_STATS.items():
+        total = sum(stats.values())
+        if total:
+            local = stats['accepted'] + stats['rejected']
+            print(f"🧮 Vor-Klassifikator [{name}]: {local} von {total} Titeln lokal entschieden "
+                  f"({local / total:.0%} weniger KI-Titel)", flush=True)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Vor-Klassifikator für Titel trainieren")
+    arg_parser.add_argument("command", choices=["train"])
+    arg_parser.add_argument("--input", help="JSON-Export der listings-Tabelle statt Supabase")
+    arg_parser.add_argument("--output", default=PRE_CLASSIFIER_FILE)
+    arg_parser.add_argument("--target-precision", type=float, default=0.97,
+                            help="Mindest-Übereinstimmung mit der KI für lokale Entscheidungen")
+    arg_parser.add_argument("--min-rows", type=int, default=200, help="Mindestanzahl Labels pro Profil")
+    arg_parser.add_argument("--default-profile", default=os.getenv("SEARCH_TERM", "ps5"),
+                            help="Profil für alte Zeilen ohne 'profile'")
+    args = arg_parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r") as f:
+            rows = json.load(f)
+    else:
+        from supabase import create_client
+        url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            print("❌ Keine Supabase Credentials in .env (oder --input nutzen)")
+            exit(1)
+        rows = fetch_rows(create_client(url, key))
+
+    by_profile = label_rows(rows, args.default_profile)
+    print(f"📚 {len(rows)} Zeilen, {sum(map(len, by_profile.values()))} KI-Labels in {len(by_profile)} Profilen.")
+
+    models = {}
+    for name, samples in sorted(by_profile.items()):
+        classes = {y for *_, y in samples}
+        if len(samples) < args.min_rows or len(classes) < 2:
+            print(f"   ⏭️ {name}: {len(samples)} Labels – zu wenig (oder nur eine Klasse), kein Modell.")
+            continue
+        start = time.perf_counter()
+        model = train_profile(samples, args.target_precision)
+        m = model.meta
+        print(f"   🧮 {name}: {m['rows']} Labels, trainiert in {time.perf_counter() - start:.1f}s, "
+              f"Band {model.low:.2f}–{model.high:.2f}")
+        print(f"      Holdout ({m['holdout']}): Precision {m['precision@0.5']:.1%} / Recall {m['recall@0.5']:.1%} @0.5 | "
+              f"lokal angenommen: Precision {m['accept_precision']:.1%}, Recall {m['accept_recall']:.1%} | "
+              f"lokal abgelehnt: Precision {m['reject_precision']:.1%}, Recall {m['reject_recall']:.1%}")
+        print(f"      ➡️ {m['llm_avoided']:.0%} der Titel brauchen keinen Groq-Call mehr.")
+        models[name] = model
+
+    if not models:
+        print("⚠️ Kein Modell trainiert, Datei bleibt unverändert.")
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"dimensions": DIMENSIONS, "profiles": {n: m.to_dict() for n, m in models.items()}}, f)
+    print(f"💾 Modelle gespeichert: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
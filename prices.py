@@ -0,0 +1,51 @@
+"""
+Preis-Normalisierung: "1.200,50 € VB" -> price_eur=1200.5, price_negotiable=True.
+normalize_prices arbeitet auf einer ganzen Ergebnisseite in einem Regex-Durchlauf;
+in der DB landen die Werte in listings.price_eur / price_negotiable (add_price_columns.sql),
+damit Preisfilter, Cleanup und Statistiken dort laufen statt in Python.
+"""
+
+import re
+
+# Eine Zeile pro Preis: erste Zahl (Tausender-Punkte, Komma-Dezimalen) oder leer
+_PRICE_LINES = re.compile(r"^[^\d\n]*(\d[\d.]*(?:,\d+)?)?[^\n]*$", re.M)
+
+
+def _to_eur(number: str) -> float | None:
+    if not number:
+        return None
+    try:
+        # Tausender-Punkte weg (1.200 -> 1200), Komma -> Punkt (12,50 -> 12.50)
+        return float(number.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def normalize_price(price_str: str | None) -> tuple[float | None, bool]:
+    """(Euro-Betrag oder None, Verhandlungsbasis) für einen Preis-String."""
+    price_str = price_str or ''
+    match = _PRICE_LINES.match(price_str.replace('\n', ' '))
+    return _to_eur(match.group(1) if match else None), 'vb' in price_str.lower()
+
+
+def normalize_prices(listings: list) -> list:
+    """Setzt price_eur/price_negotiable für alle Listings einer Seite (ein Regex-Lauf für alle Preise)."""
+    if not listings:
+        return listings
+    prices = [(l.get('price') or '').replace('\n', ' ') for l in listings]
+    numbers = _PRICE_LINES.findall("\n".join(prices))
+    for l, price, number in zip(listings, prices, numbers):
+        l['price_eur'] = _to_eur(number)
+        l['price_negotiable'] = 'vb' in price.lower()
+    return listings
+
+
+def parse_price(price_str) -> float:
+    """Betrag in Euro, 0.0 wenn keiner erkennbar ist ("VB", "Zu verschenken")."""
+    return normalize_price(price_str)[0] or 0.0
+
+
+def format_price(price_eur: float | None, negotiable: bool = False) -> str:
+    """Kompakte Preisangabe für Prompts, z.B. '250 VB'."""
+    text = "0" if price_eur is None else f"{price_eur:g}"
+    return f"{text} VB" if negotiable else text
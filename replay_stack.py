@@ -0,0 +1,586 @@
+"""
+Lokale Replay-Umgebung, um die Pipeline ohne kleinanzeigen.de, Groq und Supabase zu messen
+(bench_pipeline.py). Drei HTTP-Server auf 127.0.0.1, jeder in einem Daemon-Thread:
+
+- FixtureSite: Ergebnis- und Detailseiten wie kleinanzeigen.de. Aufgezeichnete Seiten
+  (data/replay, siehe `record`) haben Vorrang, sonst synthetisch aus den Fixtures in
+  fixtures/ (debug_no_adlist.html als Rahmen der Ergebnisseiten, debug_source.html als Startseite).
+- FakeGroq: Groq/OpenAI-kompatibles /openai/v1/chat/completions mit deterministischen
+  Urteilen (Titel-Array, Kaskaden-Format, Beschreibung einzeln/Batch) und einstellbarer Latenz.
+- FakePostgrest: PostgREST im Speicher für listings, sent_messages, message_templates und
+  prompt_templates (Filter eq/neq/gt/gte/lt/lte/like/ilike/in/is, Upsert, Update, Delete).
+
+Skripte aus allen Fixture-Seiten werden entfernt, damit kein Request nach außen geht.
+
+Aufzeichnen: python replay_stack.py record --url <Such-URL> [--pages 2] [--details 10]
+Nur starten: python replay_stack.py serve [--items 25]  (gibt die Env-Variablen aus)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPLAY_DIR = os.path.join(BASE_DIR, "data", "replay")
+FIXTURE_DIR = os.path.join(BASE_DIR, "fixtures")
+
+# Reihum verwendete Titel der synthetischen Ergebnisseiten (Mischung aus Treffern und Fehlgriffen)
+SYNTHETIC_TITLES = [
+    "PS5 Disc Edition + 2 Controller",
+    "PlayStation 5 Digital Edition wie neu",
+    "PS5 Konsole mit OVP und Rechnung",
+    "PS5 Controller DualSense weiß",
+    "Suche PS5 Konsole",
+    "PS5 defekt für Bastler",
+    "PS4 Pro 1TB mit Spielen",
+    "PS5 Slim Disc 1TB",
+    "PlayStation Portal Remote Player",
+    "PS5 Spiele Paket (5 Spiele)",
+]
+
+# Aufbau wie eine echte Karte in #srchrslt-adtable
+CARD_TEMPLATE = """
+<li class="ad-listitem {extra_class}">
+  <article class="aditem" data-adid="{adid}" data-href="/s-anzeige/ps5-{adid}/{adid}-279-1234">
+    <div class="aditem-image"><a href="/s-anzeige/ps5-{adid}/{adid}-279-1234"><img src="https://img.kleinanzeigen.de/api/v1/prod-ads/images/{adid}.jpg" alt=""></a></div>
+    <div class="aditem-main">
+      <div class="aditem-main--top">
+        <div class="aditem-main--top--left"><i class="icon icon-small icon-pin-gray"></i> 10115 Berlin <!-- plz --></div>
+        <div class="aditem-main--top--right"><i class="icon icon-small icon-calendar-open"></i> Heute, 12:{minute:02d}</div>
+      </div>
+      <div class="aditem-main--middle">
+        <h2 class="text-module-begin"><a class="ellipsis" href="/s-anzeige/ps5-{adid}/{adid}-279-1234">{title}</a></h2>
+        <p class="aditem-main--middle--description">Verkaufe meine PlayStation 5 inkl. Zubehör, voll funktionsfähig.</p>
+        <div class="aditem-main--middle--price-shipping"><p class="aditem-main--middle--price-shipping--price">{price} € VB</p></div>
+      </div>
+      <div class="aditem-main--bottom"><p class="text-module-end"><span class="simpletag">Versand möglich</span><span class="text-module-end">Direkt kaufen</span></p></div>
+    </div>
+  </article>
+</li>
+"""
+
+
+def build_synthetic_page(template_html: str, num_items: int, start: int = 0, titles: list[str] | None = None) -> str:
+    """
+    Baut eine Ergebnisseite aus dem Fixture-Rahmen und `num_items` Karten (jede 10. ist eine Top-Anzeige).
+    `start` verschiebt die Anzeigen-IDs (Folgeseiten), `titles` wird reihum verwendet.
+    """
+    cards = "".join(
+        CARD_TEMPLATE.format(
+            adid=3000000000 + i,
+            extra_class="is-topad" if i % 10 == 0 else "",
+            minute=i % 60,
+            title=titles[i % len(titles)] if titles else f"PS5 Disc Edition + {i % 3 + 1} Controller",
+            price=200 + i % 150,
+        )
+        for i in range(start, start + num_items)
+    )
+    ad_table = f'<ul id="srchrslt-adtable" class="itemlist ad-list it3">{cards}</ul>'
+    return template_html.replace("</body>", ad_table + "</body>", 1)
+
+
+SEARCH_PATH = re.compile(r"^/s-[^/]+(?:/seite:(\d+))?(?:/[^/]+)*/k0")
+DETAIL_PATH = re.compile(r"^/s-anzeige/[^/]+/(\d+)")
+SCRIPT_TAGS = re.compile(r"<script\b[^>]*>.*?</script>", re.S | re.I)
+
+DETAIL_TEMPLATE = """<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>{title} | kleinanzeigen.de</title></head>
+<body>
+{header}
+<div id="viewad-main">
+  <h1 id="viewad-title">{title}</h1>
+  <h2 id="viewad-price">{price} € VB</h2>
+  <span class="pvap-reserved-title is-hidden">Reserviert</span>
+  <p id="viewad-description-text">{description}</p>
+  <div id="viewad-contact"><span class="text-body-regular-strong">Replay-Verkäufer {seller}</span></div>
+  <button id="viewad-contact-button" onclick="document.getElementById('message-modal').style.display = 'block'">Nachricht schreiben</button>
+  <div id="message-modal" style="display: none">
+    <textarea id="message-textarea-input"></textarea>
+    <button id="message-submit-button" type="submit" onclick="sendReplayMessage()">Senden</button>
+  </div>
+</div>
+<script>
+function sendReplayMessage() {{
+  const text = document.getElementById('message-textarea-input').value;
+  fetch('/m-nachrichten/senden', {{method: 'POST', body: JSON.stringify({{adId: '{adid}', message: text}})}})
+    .then(() => {{ document.getElementById('message-modal').style.display = 'none'; }});
+}}
+</script>
+</body></html>
+"""
+
+# Deterministische "KI": Gerät = Suchbegriff-Konsole ohne diese Wörter
+NEGATIVE_WORDS = ("ps4", "defekt", "suche", "portal", "dualsense", "spiele paket", "bastler")
+DEVICE_PATTERN = re.compile(r"ps5|playstation 5")
+
+
+def strip_scripts(html: str) -> str:
+    return SCRIPT_TAGS.sub("", html)
+
+
+def _read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return strip_scripts(f.read())
+
+
+class _Server:
+    """ThreadingHTTPServer in einem Daemon-Thread; `handle` liefert (Status, Header, Body)."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests: Counter = Counter()
+        self._httpd: ThreadingHTTPServer | None = None
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"backend": self})
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def handle(self, method: str, path: str, query: list[tuple[str, str]], headers, body: bytes) -> tuple[int, dict, bytes]:
+        raise NotImplementedError
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-Alive wie bei den echten Diensten
+    backend: _Server = None
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.backend.latency:
+            time.sleep(self.backend.latency)
+        try:
+            status, headers, payload = self.backend.handle(
+                self.command, unquote(url.path), parse_qsl(url.query, keep_blank_values=True), self.headers, body
+            )
+        except Exception as e:
+            status, headers, payload = 500, {"Content-Type": "application/json"}, json.dumps({"message": str(e)}).encode()
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, *args):
+        pass
+
+
+def _html(html: str, status: int = 200) -> tuple[int, dict, bytes]:
+    return status, {"Content-Type": "text/html; charset=utf-8"}, html.encode("utf-8")
+
+
+def _json(data, status: int = 200, headers: dict | None = None) -> tuple[int, dict, bytes]:
+    return status, {"Content-Type": "application/json", **(headers or {})}, json.dumps(data).encode("utf-8")
+
+
+class FixtureSite(_Server):
+    """
+    kleinanzeigen.de-Ersatz. Ergebnisseite `n` hat `items` Karten mit fortlaufenden IDs,
+    die Detailseite jeder ID passt zu ihrer Karte. Gesendete Nachrichten landen in `messages`.
+    """
+
+    def __init__(self, fixtures_dir: str = REPLAY_DIR, items: int = 25, latency: float = 0.0,
+                 titles: list[str] | None = None):
+        super().__init__(latency)
+        self.fixtures_dir = fixtures_dir
+        self.items = items
+        self.titles = titles or SYNTHETIC_TITLES
+        self.messages: list[dict] = []
+        self.recorded = {}
+        index_file = os.path.join(fixtures_dir, "index.json")
+        if os.path.exists(index_file):
+            with open(index_file, encoding="utf-8") as f:
+                self.recorded = json.load(f)
+        self._search_frame = _read_fixture("debug_no_adlist.html")
+        self._home = _read_fixture("debug_source.html")
+        self._header = _read_fixture("debug_header.html")
+
+    def _title(self, adid: int) -> str:
+        return self.titles[(adid - 3000000000) % len(self.titles)]
+
+    def handle(self, method, path, query, headers, body):
+        if method == "POST" and path == "/m-nachrichten/senden":
+            self.requests["message"] += 1
+            self.messages.append(json.loads(body or b"{}"))
+            return _json({"ok": True})
+
+        if path in self.recorded:
+            self.requests["recorded"] += 1
+            with open(os.path.join(self.fixtures_dir, self.recorded[path]), encoding="utf-8") as f:
+                return _html(strip_scripts(f.read()))
+
+        detail = DETAIL_PATH.match(path)
+        if detail:
+            self.requests["detail"] += 1
+            adid = int(detail.group(1))
+            title = self._title(adid)
+            return _html(DETAIL_TEMPLATE.format(
+                title=title, price=200 + (adid - 3000000000) % 150, adid=adid, seller=adid % 97,
+                header=self._header,
+                description=f"Verkaufe {title}. Zustand wie auf den Bildern, Versand oder Abholung möglich.",
+            ))
+
+        search = SEARCH_PATH.match(path)
+        if search:
+            self.requests["search"] += 1
+            page_num = int(search.group(1) or 1)
+            return _html(build_synthetic_page(self._search_frame, self.items,
+                                              start=(page_num - 1) * self.items, titles=self.titles))
+
+        if path in ("", "/"):
+            self.requests["home"] += 1
+            return _html(self._home)
+
+        self.requests["404"] += 1
+        return _html("<html><body>Nicht gefunden</body></html>", 404)
+
+
+def _is_device(text: str) -> bool:
+    text = text.lower()
+    return bool(DEVICE_PATTERN.search(text)) and not any(w in text for w in NEGATIVE_WORDS)
+
+
+def _confidence(text: str) -> int:
+    """Feste Pseudo-Sicherheit 55-99 pro Titel (ein Teil geht in der Kaskade weiter)."""
+    return 55 + zlib.crc32(text.encode()) % 45
+
+
+class FakeGroq(_Server):
+    """
+    Antwortet wie Groq (Chat Completions inkl. usage). Latenz = `latency` pro Call plus
+    `token_latency` Sekunden pro 1000 Tokens. Urteile hängen nur vom Titel ab.
+    """
+
+    def __init__(self, latency: float = 0.0, token_latency: float = 0.0):
+        super().__init__(0.0)
+        self.call_latency = latency
+        self.token_latency = token_latency
+
+    @staticmethod
+    def answer(prompt: str) -> str:
+        batch = re.findall(r"^ID: (\S+)\nTITEL: (.*)$", prompt, re.M)
+        if batch:
+            return "\n".join(f"{adid}: {'JA' if _is_device(title) else 'NEIN'}" for adid, title in batch)
+        numbered = re.findall(r"^(\d+)\. (.*?) \| ", prompt, re.M)
+        if numbered and "Sicherheit von 0 bis 100" in prompt:
+            return "\n".join(
+                f"{n}: {'JA' if _is_device(title) else 'NEIN'} {_confidence(title)}" for n, title in numbered
+            )
+        if numbered:
+            return json.dumps([int(n) for n, title in numbered if _is_device(title)])
+        single = re.search(r"^TITEL: (.*)$", prompt, re.M)
+        return "JA" if single and _is_device(single.group(1)) else "NEIN"
+
+    def handle(self, method, path, query, headers, body):
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return _json({"error": {"message": "Unknown endpoint"}}, 404)
+        request = json.loads(body)
+        prompt = "\n".join(m.get("content") or "" for m in request.get("messages", []))
+        content = self.answer(prompt)
+        prompt_tokens, completion_tokens = max(1, len(prompt) // 4), max(1, len(content) // 4)
+        time.sleep(self.call_latency + self.token_latency * (prompt_tokens + completion_tokens) / 1000)
+        self.requests[request.get("model", "?")] += 1
+        return _json({
+            "id": f"chatcmpl-replay-{sum(self.requests.values())}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "?"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+
+def _text(value) -> str:
+    """Wert so, wie PostgREST ihn in Filtern vergleicht."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _equal(value, arg: str) -> bool:
+    # Booleans kommen je nach Client als 'true' oder 'True'
+    return _text(value) == (arg.lower() if arg in ("True", "False") else arg)
+
+
+def _compare(value, arg: str) -> int | None:
+    if value is None:
+        return None
+    try:
+        left, right = float(value), float(arg)
+    except (TypeError, ValueError):
+        left, right = _text(value), arg
+    return (left > right) - (left < right)
+
+
+def _like(pattern: str, ignore_case: bool) -> re.Pattern:
+    regex = "".join(".*" if c in "%*" else re.escape(c) for c in pattern)
+    return re.compile(f"^{regex}$", re.S | (re.I if ignore_case else 0))
+
+
+def matches(value, expression: str) -> bool:
+    """Ein PostgREST-Filter wie 'eq.5', 'ilike.%passed%', 'in.(a,b)', 'not.is.null'."""
+    if expression.startswith("not."):
+        return not matches(value, expression[4:])
+    op, _, arg = expression.partition(".")
+    if op == "eq":
+        return _equal(value, arg)
+    if op == "neq":
+        return not _equal(value, arg)
+    if op in ("gt", "gte", "lt", "lte"):
+        order = _compare(value, arg)
+        return order is not None and {"gt": order > 0, "gte": order >= 0, "lt": order < 0, "lte": order <= 0}[op]
+    if op in ("like", "ilike"):
+        return value is not None and bool(_like(arg, op == "ilike").match(_text(value)))
+    if op == "in":
+        return _text(value) in {v.strip().strip('"') for v in arg.strip("()").split(",")}
+    if op == "is":
+        return _equal(value, arg)
+    raise ValueError(f"Filter nicht unterstützt: {expression}")
+
+
+class FakePostgrest(_Server):
+    """PostgREST im Speicher (/rest/v1/<tabelle>). Schreibzugriffe und Zeilen werden gezählt."""
+
+    PRIMARY_KEYS = {"listings": "id", "sent_messages": "id", "message_templates": "id", "prompt_templates": "id"}
+    RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+    def __init__(self, latency: float = 0.0, seed: dict[str, list[dict]] | None = None):
+        super().__init__(latency)
+        self.tables: dict[str, list[dict]] = {
+            "listings": [],
+            "sent_messages": [],
+            "message_templates": [
+                {"id": 1, "content": "Hallo, ist die Konsole noch da? Versand und PayPal möglich?", "is_active": True},
+                {"id": 2, "content": "Hi, würdest du die PS5 auch verschicken?", "is_active": True},
+            ],
+            "prompt_templates": [],
+        }
+        for table, rows in (seed or {}).items():
+            self.tables[table] = [dict(r) for r in rows]
+        self.rows_written: Counter = Counter()
+        self._next_id = Counter()
+        self._lock = threading.Lock()
+
+    def _filtered(self, table: str, query: list[tuple[str, str]]) -> list[dict]:
+        filters = [(k, v) for k, v in query if k not in self.RESERVED]
+        return [r for r in self.tables[table] if all(matches(r.get(col), expr) for col, expr in filters)]
+
+    @staticmethod
+    def _project(rows: list[dict], select: str) -> list[dict]:
+        if not select or select == "*":
+            return [dict(r) for r in rows]
+        columns = [c.strip() for c in select.split(",")]
+        return [{c: r.get(c) for c in columns} for r in rows]
+
+    def _write(self, table: str, rows: list[dict], upsert: str | None, on_conflict: str | None) -> list[dict]:
+        key = on_conflict or self.PRIMARY_KEYS.get(table, "id")
+        existing = {_text(r.get(key)): r for r in self.tables[table]}
+        written = []
+        for row in rows:
+            row = dict(row)
+            if key == "id" and row.get("id") is None:
+                self._next_id[table] += 1
+                row["id"] = self._next_id[table]
+            current = existing.get(_text(row.get(key)))
+            if current is not None:
+                if upsert == "ignore-duplicates":
+                    continue
+                if upsert != "merge-duplicates":
+                    raise KeyError(_text(row.get(key)))
+                current.update(row)
+                written.append(current)
+            else:
+                self.tables[table].append(row)
+                existing[_text(row.get(key))] = row
+                written.append(row)
+        return written
+
+    def handle(self, method, path, query, headers, body):
+        match = re.match(r"^/rest/v1/([\w-]+)$", path)
+        if not match or match.group(1) not in self.tables:
+            return _json({"code": "PGRST205", "message": f"Could not find the table '{path}'"}, 404)
+        table = match.group(1)
+        self.requests[f"{method} {table}"] += 1
+        params = dict(query)
+        prefer = headers.get("Prefer") or ""
+        representation = "return=representation" in prefer
+
+        with self._lock:
+            if method == "GET":
+                rows = self._filtered(table, query)
+                if "order" in params:
+                    column, _, direction = params["order"].partition(".")
+                    rows.sort(key=lambda r: (r.get(column) is None, _text(r.get(column))),
+                              reverse=direction.startswith("desc"))
+                offset = int(params.get("offset", 0))
+                total = len(rows)
+                rows = rows[offset:offset + int(params["limit"])] if "limit" in params else rows[offset:]
+                extra = {"Content-Range": f"{offset}-{offset + len(rows) - 1}/{total if 'count=' in prefer else '*'}"}
+                return _json(self._project(rows, params.get("select", "*")), 200, extra)
+
+            if method == "POST":
+                payload = json.loads(body or b"[]")
+                upsert = re.search(r"resolution=(merge-duplicates|ignore-duplicates)", prefer)
+                try:
+                    written = self._write(table, payload if isinstance(payload, list) else [payload],
+                                          upsert and upsert.group(1), params.get("on_conflict"))
+                except KeyError as e:
+                    return _json({"code": "23505", "message": f"duplicate key value {e}"}, 409)
+                self.rows_written[table] += len(written)
+                return _json(written if representation else [], 201)
+
+            rows = self._filtered(table, query)
+            if method == "PATCH":
+                changes = json.loads(body or b"{}")
+                for r in rows:
+                    r.update(changes)
+                self.rows_written[table] += len(rows)
+            elif method == "DELETE":
+                self.tables[table] = [r for r in self.tables[table] if r not in rows]
+                self.rows_written[table] += len(rows)
+            else:
+                return _json({"message": f"{method} nicht unterstützt"}, 405)
+            return _json(rows if representation else [], 200)
+
+
+class ReplayStack:
+    """
+    Alle drei Server zusammen. `env()` liefert die Variablen, mit denen Scraper/Sender
+    (und die Groq-/Supabase-Clients) auf die lokalen Server zeigen.
+    """
+
+    def __init__(self, items: int = 25, site_latency: float = 0.0, groq_latency: float = 0.0,
+                 groq_token_latency: float = 0.0, db_latency: float = 0.0, fixtures_dir: str = REPLAY_DIR):
+        self.site = FixtureSite(fixtures_dir, items, site_latency)
+        self.groq = FakeGroq(groq_latency, groq_token_latency)
+        self.db = FakePostgrest(db_latency)
+
+    def __enter__(self) -> "ReplayStack":
+        for server in (self.site, self.groq, self.db):
+            server.start()
+        return self
+
+    def __exit__(self, *exc):
+        for server in (self.site, self.groq, self.db):
+            server.stop()
+
+    def env(self) -> dict[str, str]:
+        return {
+            "KLEINANZEIGEN_BASE_URL": self.site.url,
+            "ALLOWED_DOMAINS": "127.0.0.1",
+            "GROQ_BASE_URL": self.groq.url,
+            "GROQ_API_KEY": "replay",
+            "SUPABASE_URL": self.db.url,
+            "SUPABASE_KEY": "replay",
+        }
+
+    def report(self):
+        print(f"🛰️ Replay-Site: {dict(self.site.requests)}")
+        print(f"🛰️ Fake-Groq: {dict(self.groq.requests)}")
+        print(f"🛰️ Fake-PostgREST: {dict(self.db.requests)}, geschriebene Zeilen {dict(self.db.rows_written)}")
+
+
+async def record(url: str, pages: int, details: int, out_dir: str = REPLAY_DIR):
+    """Speichert Ergebnisseiten und die ersten `details` Detailseiten (HTTP-Schnellpfad mit Browser-Session)."""
+    from browser_pool import HostPacer
+    from http_fetch import HttpFetcher
+    from parsers import get_parser
+    from scraper import build_page_url
+
+    os.makedirs(out_dir, exist_ok=True)
+    index_file = os.path.join(out_dir, "index.json")
+    index = {}
+    if os.path.exists(index_file):
+        with open(index_file, encoding="utf-8") as f:
+            index = json.load(f)
+
+    def save(page_url: str, html: str):
+        path = urlsplit(page_url).path
+        name = hashlib.sha1(path.encode()).hexdigest()[:12] + ".html"
+        with open(os.path.join(out_dir, name), "w", encoding="utf-8") as f:
+            f.write(html)
+        index[path] = name
+
+    parser, pacer = get_parser(), HostPacer()
+    links = []
+    async with HttpFetcher(1) as http:
+        for page_num in range(1, pages + 1):
+            page_url = build_page_url(url, page_num)
+            await pacer.wait(page_url)
+            html = await http.fetch(page_url)
+            listings = parser.parse(html) if html else None
+            if listings is None:
+                print(f"⚠️ Seite {page_num} ohne Anzeigen-Liste – Aufnahme endet hier.")
+                break
+            save(page_url, html)
+            links += [l['link'] for l in listings]
+            print(f"📼 Seite {page_num}: {len(listings)} Anzeigen")
+
+        for link in links[:details]:
+            await pacer.wait(link)
+            html = await http.fetch(link)
+            if html:
+                save(link, html)
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    print(f"📼 {len(index)} Seiten in {out_dir}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Lokale Replay-Umgebung (Fixture-Site, Fake-Groq, Fake-PostgREST)")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record", help="Seiten von kleinanzeigen.de aufzeichnen")
+    rec.add_argument("--url", required=True, help="Such-URL (Seite 1)")
+    rec.add_argument("--pages", type=int, default=2)
+    rec.add_argument("--details", type=int, default=10, help="Detailseiten, die mit aufgezeichnet werden")
+    rec.add_argument("--output", default=REPLAY_DIR)
+    serve = commands.add_parser("serve", help="Server starten und Env-Variablen ausgeben")
+    serve.add_argument("--items", type=int, default=25, help="Karten pro synthetischer Ergebnisseite")
+    serve.add_argument("--groq-latency", type=float, default=0.3)
+    args = arg_parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record(args.url, args.pages, args.details, args.output))
+        return
+
+    with ReplayStack(items=args.items, groq_latency=args.groq_latency) as stack:
+        for key, value in stack.env().items():
+            print(f"{key}={value}")
+        print("\n(Strg+C beendet)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            stack.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Netzwerk-Filter für alle Browser-Contexts.
+Lässt nur Ressourcentypen und Domains durch, die zum Parsen/Senden gebraucht werden
+(Bilder, Fonts, Media und Tracker fliegen raus) und zählt erlaubte/blockierte Requests.
+"""
+
+import os
+from collections import Counter
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROUTE_FILTER = os.getenv("ROUTE_FILTER", "true").lower() == "true"
+ALLOWED_RESOURCE_TYPES = {
+    t.strip() for t in os.getenv(
+        "ALLOWED_RESOURCE_TYPES", "document,script,xhr,fetch,stylesheet,websocket,other"
+    ).split(",") if t.strip()
+}
+# Suffix-Match: 'kleinanzeigen.de' erlaubt auch www./static./api.
+ALLOWED_DOMAINS = [
+    d.strip().lower() for d in os.getenv(
+        "ALLOWED_DOMAINS", "kleinanzeigen.de,usercentrics.eu,google.com,gstatic.com,recaptcha.net"
+    ).split(",") if d.strip()
+]
+
+# Geschätzte Bytes pro blockiertem Request nach Typ (blockierte Antworten kommen nie an, also nicht messbar).
+# Grobe Mittelwerte von Kleinanzeigen-Seiten; für Typen, die auch erlaubt durchgehen (script, xhr ...),
+# gilt stattdessen der im Lauf gemessene Schnitt.
+BLOCKED_BYTES_ESTIMATE = {
+    "image": 40_000, "media": 500_000, "font": 30_000, "stylesheet": 20_000,
+    "script": 50_000, "xhr": 2_000, "fetch": 2_000, "other": 5_000,
+}
+
+
+def _domain_allowed(url: str) -> bool:
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == d or host.endswith("." + d) for d in ALLOWED_DOMAINS)
+
+
+def _is_main_frame(request) -> bool:
+    try:
+        return request.is_navigation_request() and request.frame.parent_frame is None
+    except Exception:
+        return False
+
+
+def is_allowed(resource_type: str, url: str, main_frame: bool = False) -> bool:
+    """Entscheidet für einen Request. Hauptseiten-Navigationen gehen immer durch (auch Redirects)."""
+    if main_frame:
+        return True
+    if url.startswith(("data:", "blob:")):
+        return True
+    return resource_type in ALLOWED_RESOURCE_TYPES and _domain_allowed(url)
+
+
+class RouteStats:
+    """
+    Zähler pro Lauf: Requests/Bytes erlaubt vs. Requests blockiert (nach Typ) und daraus
+    die geschätzten gesparten Bytes.
+    """
+
+    def __init__(self):
+        self.allowed = 0
+        self.allowed_bytes = 0
+        self.blocked = 0
+        self.blocked_by_type: Counter = Counter()
+        # Gemessene Antworten pro Typ (Anzahl, Bytes) – Basis für die Schätzung blockierter Requests
+        self.measured: Counter = Counter()
+        self.measured_bytes: Counter = Counter()
+
+    def on_response(self, response):
+        try:
+            size = int(response.headers.get("content-length", 0))
+        except (TypeError, ValueError):
+            return
+        self.allowed_bytes += size
+        if size:
+            resource_type = response.request.resource_type
+            self.measured[resource_type] += 1
+            self.measured_bytes[resource_type] += size
+
+    def bytes_per_request(self, resource_type: str) -> float:
+        """Gemessener Schnitt des Laufs, sonst BLOCKED_BYTES_ESTIMATE."""
+        if self.measured[resource_type]:
+            return self.measured_bytes[resource_type] / self.measured[resource_type]
+        return BLOCKED_BYTES_ESTIMATE.get(resource_type, BLOCKED_BYTES_ESTIMATE["other"])
+
+    def saved_bytes(self) -> float:
+        """Geschätzt: blockierte Requests x Bytes pro Request ihres Typs."""
+        return sum(n * self.bytes_per_request(t) for t, n in self.blocked_by_type.items())
+
+    def report(self):
+        total = self.allowed + self.blocked
+        if not total:
+            return
+        by_type = ", ".join(f"{t}={n}" for t, n in self.blocked_by_type.most_common())
+        print(f"🚦 Netzwerk: {self.allowed} Requests erlaubt ({self.allowed_bytes / 1024 / 1024:.1f} MB), "
+              f"{self.blocked} blockiert ({self.blocked / total:.0%}, ~{self.saved_bytes() / 1024 / 1024:.1f} MB "
+              f"gespart, geschätzt) [{by_type}]", flush=True)
+
+
+# Ein Zähler pro Prozess/Lauf
+RUN_STATS = RouteStats()
+
+
+def install_route_filter(context, stats: RouteStats = RUN_STATS):
+    """Hängt den Filter an einen sync Playwright-Context (sender.py)."""
+    if not ROUTE_FILTER:
+        return
+
+    def handle(route):
+        request = route.request
+        if is_allowed(request.resource_type, request.url, _is_main_frame(request)):
+            stats.allowed += 1
+            route.continue_()
+        else:
+            stats.blocked += 1
+            stats.blocked_by_type[request.resource_type] += 1
+            route.abort()
+
+    context.route("**/*", handle)
+    context.on("response", stats.on_response)
+
+
+async def install_route_filter_async(context, stats: RouteStats = RUN_STATS):
+    """Wie install_route_filter, für async Contexts (Scraper-Pool)."""
+    if not ROUTE_FILTER:
+        return
+
+    async def handle(route):
+        request = route.request
+        if is_allowed(request.resource_type, request.url, _is_main_frame(request)):
+            stats.allowed += 1
+            await route.continue_()
+        else:
+            stats.blocked += 1
+            stats.blocked_by_type[request.resource_type] += 1
+            await route.abort()
+
+    await context.route("**/*", handle)
+    context.on("response", stats.on_response)
@@ -0,0 +1,174 @@
+"""
+Regel-Engine für den Vor-Filter (ohne KI) und die Kategorien.
+Die Regeln werden pro Such-Profil EINMAL kompiliert (ein Keyword-Matcher für alle Listen
+und Suchbegriff-Synonyme). Jedes Listing wird in einem Durchlauf geprüft; die erste
+greifende Regel setzt filter_status, filter_reason und filter_rule. Nur Listings, die alle
+Regeln überstehen ('passed_prefilter'), gehen an die KI.
+"""
+
+from collections import Counter
+
+from keywords import KeywordMatcher
+from prices import parse_price
+
+SKIP_KEYWORDS = [
+    'suche', 'gesuch', 'controller', 'dualsense', 'headset',
+    'spiel', 'game', 'laufwerk', 'ps4', 'playstation 4',
+    'defekt', 'kaputt', 'bastler', 'scuf', 'edge controller',
+    'miete', 'verleih'
+]
+GESUCH_WORDS = ['kaufe', 'ankauf']
+HALTERUNG_WORDS = ['ständer', 'halterung', 'wandhalterung']
+PRO_CONTROLLER_WORDS = ['scuf', 'aim', 'edge']
+DEFEKT_WORDS = ['defekt', 'kaputt', 'bastler', 'broken', 'schaden']
+ABHOLUNG_PHRASES = ['nur abholung', 'kein versand']
+
+# (Kategorie, Liste) – erste mit Treffer gewinnt, sonst 'normal'
+CATEGORY_RULES = [("defekt", DEFEKT_WORDS), ("abholung", ABHOLUNG_PHRASES)]
+CATEGORY_MATCHER = KeywordMatcher(dict(CATEGORY_RULES))
+
+
+def term_synonyms(search_term: str) -> list[str]:
+    """Schreibweisen des Suchbegriffs (PS5 auch als 'PlayStation 5')."""
+    synonyms = [search_term, search_term.replace(" ", "")]
+    if 'ps5' in search_term:
+        synonyms += ["playstation 5", "playstation5"]
+    return synonyms
+
+
+# --- Regeln: check(listing, hits, engine) liefert den Grund, wenn die Regel greift ---
+
+def _gesuch(l, hits, engine):
+    if l.get('isGesuch') or 'gesuch' in ' '.join(l.get('tags') or []).lower():
+        return "Gesuch erkannt"
+    if 'gesuch' in hits:
+        return f"Gesuch: {engine.matcher.first(hits, 'gesuch')}"
+
+
+def _name_mismatch(l, hits, engine):
+    # Alle Wörter des Suchbegriffs (Reihenfolge egal) oder eine Schreibweise im Titel
+    if not (engine.term_parts <= hits.get('term_part', set()) or 'term' in hits):
+        return f"Title mismatch '{engine.search_term}'"
+
+
+def _keyword(l, hits, engine):
+    # Keywords, die Teil des Suchbegriffs sind, zählen nicht (z.B. 'controller' bei Controller-Suche)
+    found = hits.get('skip', ())
+    kw = next((kw for kw in engine.skip_keywords if kw in found and kw not in engine.search_term), None)
+    if kw:
+        return f"Keyword: {kw}"
+
+
+def _portal(l, hits, engine):
+    if 'portal' in hits and 'remote_player' in hits:
+        return "PlayStation Portal / Remote Player"
+
+
+def _halterung(l, hits, engine):
+    if 'halterung' in hits:
+        return f"Zubehör: {engine.matcher.first(hits, 'halterung')}"
+
+
+def _pro_controller(l, hits, engine):
+    if 'controller' in hits and 'konsole_bundle' not in hits and 'pro_controller' in hits:
+        return "Pro-Controller ohne Konsole"
+
+
+def _price(l, hits, engine):
+    # Kleinanzeigen zeigt "Top Ads", die den Preisfilter der Suche ignorieren
+    if engine.max_price is not None:
+        p_val = l.get('price_eur')
+        if p_val is None:
+            p_val = parse_price(l.get('price'))
+        if p_val > engine.max_price:
+            return f"Price too high: {p_val} > {engine.max_price}"
+
+
+# (Name, Status, Prüfung) – in dieser Reihenfolge, die erste greifende Regel entscheidet
+RULES = [
+    ("gesuch", "rejected_keyword", _gesuch),
+    ("name_mismatch", "rejected_name_mismatch", _name_mismatch),
+    ("keyword", "rejected_keyword", _keyword),
+    ("portal", "rejected_keyword", _portal),
+    ("halterung", "rejected_keyword", _halterung),
+    ("pro_controller", "rejected_keyword", _pro_controller),
+    ("price", "rejected_price", _price),
+]
+
+
+def categorize_hits(hits: dict) -> str:
+    return next((category for category, _ in CATEGORY_RULES if category in hits), 'normal')
+
+
+def categorize(text: str) -> str:
+    """'defekt', 'abholung' oder 'normal' für Titel (+ Beschreibung)."""
+    return categorize_hits(CATEGORY_MATCHER.scan(text))
+
+
+class RuleEngine:
+    """Kompilierte Regeln eines Such-Profils mit Zählern pro Regel."""
+
+    def __init__(self, search_term: str, max_price: float | None = None, skip_keywords: list[str] = ()):
+        self.search_term = search_term.lower()
+        self.term_parts = set(self.search_term.split())
+        self.max_price = max_price
+        self.skip_keywords = SKIP_KEYWORDS + [kw.lower() for kw in skip_keywords]
+        self.matcher = KeywordMatcher({
+            "term": term_synonyms(self.search_term),
+            "term_part": self.search_term.split(),
+            "skip": self.skip_keywords,
+            "gesuch": GESUCH_WORDS,
+            "portal": ["portal"],
+            "remote_player": ["remote", "player"],
+            "halterung": HALTERUNG_WORDS,
+            "controller": ["controller"],
+            "konsole_bundle": ["konsole", "bundle"],
+            "pro_controller": PRO_CONTROLLER_WORDS,
+            **dict(CATEGORY_RULES),
+        })
+        self.stats: Counter = Counter()
+
+    def evaluate(self, listing) -> bool:
+        """Ein Durchlauf über den Titel: Regeln + Kategorie. True = geht an die KI."""
+        hits = self.matcher.scan(listing['title'])
+        listing['category'] = categorize_hits(hits)
+        for name, status, check in RULES:
+            reason = check(listing, hits, self)
+            if reason:
+                listing['filter_status'] = status
+                listing['filter_reason'] = reason
+                listing['filter_rule'] = name
+                self.stats[name] += 1
+                return False
+        listing['filter_status'] = 'passed_prefilter'
+        self.stats['passed'] += 1
+        return True
+
+    def apply(self, listings: list) -> list:
+        """Prüft alle Listings (markiert in place) und gibt die Liste zurück."""
+        passed = sum(self.evaluate(l) for l in listings)
+        print(f"📏 Regeln '{self.search_term}': {passed} von {len(listings)} Listings gehen an die KI.")
+        return listings
+
+    def report(self) -> str:
+        return ", ".join(f"{name}={n}" for name, n in self.stats.most_common())
+
+
+_ENGINES: dict[str, RuleEngine] = {}
+
+
+def engine_for_profile(profile: dict) -> RuleEngine:
+    """Eine Engine pro Such-Profil und Lauf (Regeln werden nur einmal kompiliert)."""
+    engine = _ENGINES.get(profile['name'])
+    if engine is None:
+        engine = _ENGINES[profile['name']] = RuleEngine(
+            profile['search_term'], profile.get('max_price_val'), profile.get('skip_keywords') or []
+        )
+    return engine
+
+
+def report_rules():
+    """Zähler aller Regeln des Laufs, pro Profil."""
+    for name, engine in _ENGINES.items():
+        if engine.stats:
+            print(f"📏 Regeln [{name}]: {engine.report()}", flush=True)
@@ -3,18 +3,33 @@ Kleinanzeigen PS5 Scraper mit KI-Filter
 Benutzt Groq/Llama um irrelevante Anzeigen vor dem Beschreibungs-Scraping auszufiltern.
 """
 
+import asyncio
 import json
 import os
-import random
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 import os
 import uuid
-from groq import Groq
-from camoufox.sync_api import Camoufox
 from supabase import create_client, Client
+from browser_pool import PagePool, SCRAPE_CONCURRENCY, open_browser
+from parsers import AD_CARDS_JS, get_parser, parse_cards
+from listing import Listing
+from llm import LLM_CONCURRENCY, RUN_STATS as LLM_STATS, complete, complete_async
+from prices import format_price, normalize_prices
+from local_store import DetailCache, SeenIndex, VerdictCache, prompt_version
+from http_fetch import HttpFetcher, block_reasons
+from rules import categorize, engine_for_profile, report_rules
+from pre_classifier import TITLE_SOURCE_AI, TITLE_SOURCE_DUPLICATE, pre_classify, report_pre_classifier
+from near_duplicates import cluster_titles, report_near_duplicates
+from db_batch import DB_BATCH_SIZE, report_db_writes, upsert_rows
+from search_profiles import DEFAULT_TITLE_MODELS, load_search_profiles, parse_models
+from route_filter import RUN_STATS as ROUTE_STATS
+from pacing import PacingPolicy, wait_ready, wait_ready_async
 
 # .env laden (override=True zwingend, damit Docker-Env-Vars aktualisiert werden!)
 load_dotenv(override=True)
@@ -24,6 +39,36 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# HTML-Engine für Ergebnisseiten (HTML_PARSER=lxml|soup)
+LISTING_PARSER = get_parser()
+# 'dom' = Karten im Browser extrahieren (nur JSON übertragen), 'html' = page.content() + Parser
+EXTRACT_MODE = os.getenv("EXTRACT_MODE", "dom").lower()
+# 'browser' = jede Ergebnisseite per Camoufox, 'http' = httpx-Schnellpfad, Browser nur bei Challenge
+FETCH_MODE = os.getenv("FETCH_MODE", "browser").lower()
+# Inkrementell: bekannte, unveränderte Anzeigen überspringen (Seen-Index in data/bot_state.db)
+INCREMENTAL_SCRAPE = os.getenv("INCREMENTAL_SCRAPE", "true").lower() == "true"
+# Detailseiten der Kandidaten holen (Beschreibung + Verkäufer), gecacht in data/bot_state.db
+FETCH_DETAILS = os.getenv("FETCH_DETAILS", "true").lower() == "true"
+DETAIL_CACHE_TTL_HOURS = float(os.getenv("DETAIL_CACHE_TTL_HOURS", "168"))
+# KI-Urteile cachen (normalisierter Titel + Preis-Bucket + Prompt-Version), data/bot_state.db
+VERDICT_CACHE = os.getenv("VERDICT_CACHE", "true").lower() == "true"
+VERDICTS = VerdictCache(
+    ttl_hours=float(os.getenv("VERDICT_CACHE_TTL_HOURS", "72")),
+    max_entries=int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "20000")),
+    price_bucket=float(os.getenv("VERDICT_PRICE_BUCKET", "25")),
+) if VERDICT_CACHE else None
+# Titel pro Groq-Call (kleine Prompts = keine abgeschnittenen Antworten, Chunks laufen parallel)
+TITLE_CHUNK_SIZE = max(1, int(os.getenv("TITLE_CHUNK_SIZE", "25")))
+# Groq-Bericht pro Lauf (jeder Call mit Latenz/Tokens) als JSON; leer = aus
+# Screenshot + HTML, wenn eine Ergebnisseite keine Anzeigen-Liste hat (nie in fixtures/)
+DEBUG_DIR = os.getenv("DEBUG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "debug"))
+LLM_RUN_REPORTS = os.getenv("LLM_RUN_REPORTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "llm_runs"))
+# Anzeigen pro Groq-Call beim Beschreibungs-Check (1 = ein Prompt pro Anzeige)
+DESC_BATCH_SIZE = max(1, int(os.getenv("DESC_BATCH_SIZE", "1")))
+# Ab dieser Sicherheit (0-100) gilt das Urteil eines Kaskaden-Modells, sonst entscheidet das nächste
+CASCADE_MIN_CONFIDENCE = int(os.getenv("CASCADE_MIN_CONFIDENCE", "85"))
+DESC_MODEL = "llama-3.3-70b-versatile"
+
 supabase: Client = None
 if SUPABASE_URL and SUPABASE_KEY:
     try:
@@ -34,23 +79,8 @@ if SUPABASE_URL and SUPABASE_KEY:
 
 
 
-def random_delay(min_sec: float = 1.0, max_sec: float = 3.0):
-    """Zufällige Wartezeit für menschlicheres Verhalten."""
-    time.sleep(random.uniform(min_sec, max_sec))
-
-def parse_price(price_str):
-    if not price_str: return 0.0
-    # Entferne 'VB', '€' und Leerzeichen
-    clean = price_str.lower().replace('vb', '').replace('€', '').strip()
-    # Entferne Tausender-Punkte (1.200 -> 1200)
-    clean = clean.replace('.', '')
-    # Ersetze Komma durch Punkt (12,50 -> 12.50)
-    clean = clean.replace(',', '.')
-    try:
-        return float(clean)
-    except:
-        return 0.0
-
+# Menschliche Pausen (bewusst gewählt, mit Budget) – getrennt von Readiness-Waits
+PACER = PacingPolicy()
 
 def handle_cookie_consent(page):
     """Spezielle Funktion nur für den Cookie-Banner (Polling)."""
@@ -122,409 +152,265 @@ def dismiss_overlays(page):
         """)
     except: pass
 
-def scrape_listings(base_url: str, num_pages: int = 1, use_ai_filter: bool = True) -> list[dict]:
-    """Scrapt Listings von Kleinanzeigen."""
-    listings = []
-    
-    print(f"🌎 Starte Browser (Camoufox)...")
-    
-    with Camoufox(headless=True) as browser:
-        page = browser.new_page()
-        
-        # Anti-Detection Headers
-        page.set_extra_http_headers({
-            "Accept-Language": "de-DE,de;q=0.9",
-        })
+def build_page_url(base_url: str, page_num: int) -> str:
+    """Baut die URL für Ergebnisseite `page_num` (Kleinanzeigen Pagination Logic)."""
+    if page_num == 1:
+        return base_url
+    if "/seite:" in base_url:
+        # Falls URL schon Pagination hat, ersetzen (etwas hacky, für jetzt OK)
+        return base_url
+
+    # Standard Format: /s-suchbegriff/preis:100:300/k0
+    # Ziel: /s-suchbegriff/seite:2/preis:100:300/k0
+    parts = base_url.split('/')
+    # parts[0-2] ist https://domain
+    # parts[3] ist meist 's-suchbegriff' oder 's-...'
+
+    # Finde index wo 's-' steht (Such-Segment)
+    insert_idx = -1
+    for idx, p in enumerate(parts):
+        if p.startswith('s-') and 'preis:' not in p and 'seite:' not in p:
+            insert_idx = idx
+            break
+
+    if insert_idx != -1:
+        # Einfügen von 'seite:N' NACH dem Suchbegriff
+        parts.insert(insert_idx + 1, f"seite:{page_num}")
+        return "/".join(parts)
+
+    # Fallback: Einfach anhängen, aber vor 'k0' wenn möglich
+    return base_url.replace('/k0', f'/seite:{page_num}/k0') if '/k0' in base_url else base_url + f"/seite:{page_num}"
+
+
+def parse_listings_html(html: str) -> list[Listing] | None:
+    """Extrahiert Listings aus dem HTML einer Ergebnisseite. None = keine Anzeigen-Liste."""
+    return LISTING_PARSER.parse(html)
+
+
+async def dismiss_overlays_async(page):
+    """Async-Variante: Cookie-Banner (Shadow DOM) und Overlays in einem Rutsch wegklicken."""
+    try:
+        await page.evaluate("""
+            () => {
+                const host = document.querySelector('#usercentrics-root');
+                if (host && host.shadowRoot) {
+                    const btn = host.shadowRoot.querySelector('button[data-testid="uc-accept-all-button"]');
+                    if (btn) btn.click();
+                }
+                const closeButtons = document.querySelectorAll('.modal-close, .close-button, [aria-label="Schließen"], .overlay-close');
+                closeButtons.forEach(btn => btn.click());
+            }
+        """)
+    except: pass
+
+
+async def extract_listings(page) -> list[Listing] | None:
+    """Holt die Listings der aktuellen Ergebnisseite gemäß EXTRACT_MODE."""
+    if EXTRACT_MODE == "html":
+        return parse_listings_html(await page.content())
+    return parse_cards(await page.evaluate(AD_CARDS_JS))
+
+
+async def _save_debug_snapshot(page):
+    """Speichert Screenshot + HTML wenn keine Anzeigen-Liste gefunden wurde."""
+    try:
+        os.makedirs(DEBUG_DIR, exist_ok=True)
+        screenshot = os.path.join(DEBUG_DIR, "no_adlist.png")
+        await page.screenshot(path=screenshot)
+        html = await page.content()
+        with open(os.path.join(DEBUG_DIR, "no_adlist.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"   📸 Debug-Screenshot gespeichert: {screenshot}")
+
+        # Check for common issues
+        for reason in block_reasons(html):
+            print(f"   🚨 {reason}!")
+    except Exception as debug_err:
+        print(f"   Debug save error: {debug_err}")
+
+
+async def _load_result_page(pool: PagePool, url: str, page_num: int, should_skip=None,
+                            http: HttpFetcher | None = None) -> list[Listing] | None:
+    """Lädt eine Ergebnisseite (per HTTP-Schnellpfad oder über eine Page aus dem Pool) und parst sie."""
+    if http and http.enabled:
+        if should_skip and should_skip():
+            return []
+        await pool.pacer.wait(url)
+        print(f"\n⚡ Lade Seite {page_num} (HTTP): {url}")
+        html = await http.fetch(url)
+        if html is not None:
+            page_listings = parse_listings_html(html)
+            if page_listings is not None:
+                print(f"   Artikel auf Seite {page_num}: {len(page_listings)}")
+                return page_listings
+            http.reject(url, html)
+
+    async with pool.page() as page:
+        # Seite evtl. inzwischen überflüssig (Watermark auf flacherer Seite erreicht)
+        if should_skip and should_skip():
+            return []
+        await pool.pacer.wait(url)
+
+        print(f"\n📄 Lade Seite {page_num}: {url}")
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            # Bereit, sobald die Ergebnisliste (oder die Seite fertig) da ist – kein fester Sleep
+            if not await wait_ready_async(page, "#srchrslt-adtable", state="attached", timeout=10000):
+                await wait_ready_async(page, timeout=5000)
+            await PACER.pause_async("after_navigation", budgeted=False)
+
+            # Cookie Banner & Overlays
+            await dismiss_overlays_async(page)
+
+            # Scrollen
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            await PACER.pause_async("after_scroll", budgeted=False)
 
-        for i in range(num_pages):
-            page_num = i + 1
-            if page_num == 1:
-                url = base_url
+            page_listings = await extract_listings(page)
+            if page_listings is None:
+                print(f"   ⚠️ Keine Anzeigen-Liste gefunden (Seite {page_num}).")
+                await _save_debug_snapshot(page)
             else:
-                # Kleinanzeigen Pagination Logic
-                if "/seite:" in base_url:
-                    # Falls URL schon Pagination hat, ersetzen (etwas hacky, für jetzt OK)
-                     url = base_url 
-                else:
-                    # Standard Format: /s-suchbegriff/preis:100:300/k0
-                    # Ziel: /s-suchbegriff/seite:2/preis:100:300/k0
-                    # Wir suchen das Segement, das NICHT 'preis:' oder 'k0' ist, aber mit 's-' anfängt (optional) oder einfach das erste Segment nach Domain?
-                    # Besser: Wir splitten und suchen den Suchbegriff.
-                    
-                    parts = base_url.split('/')
-                    # parts[0-2] ist https://domain
-                    # parts[3] ist meist 's-suchbegriff' oder 's-...'
-                    
-                    # Finde index wo 's-' steht (Such-Segment)
-                    insert_idx = -1
-                    for idx, p in enumerate(parts):
-                        if p.startswith('s-') and 'preis:' not in p and 'seite:' not in p:
-                            insert_idx = idx
-                            break
-                    
-                    if insert_idx != -1:
-                        # Einfügen von 'seite:N' NACH dem Suchbegriff
-                        parts.insert(insert_idx + 1, f"seite:{page_num}")
-                        url = "/".join(parts)
-                    else:
-                        # Fallback: Einfach anhängen, aber vor 'k0' wenn möglich?
-                        # Alte Logic fallback
-                        url = base_url.replace('/k0', f'/seite:{page_num}/k0') if '/k0' in base_url else base_url + f"/seite:{page_num}" 
-
-            print(f"\n📄 Lade Seite {page_num}: {url}")
-            
-            try:
-                page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                random_delay(2, 4)
-                
-                # Cookie Banner & Overlays
-                if i == 0:
-                    dismiss_overlays(page)
-                
-                # Scrollen
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                random_delay(1, 2)
-                
-                # Parsing
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(page.content(), "html.parser")
-                
-                # Find ad list
-                ad_list = soup.find('ul', id='srchrslt-adtable')
-                if not ad_list:
-                    print("   ⚠️ Keine Anzeigen-Liste gefunden.")
-                    # DEBUG: Save screenshot and HTML for analysis
-                    try:
-                        page.screenshot(path="debug_no_adlist.png")
-                        with open("debug_no_adlist.html", "w", encoding="utf-8") as f:
-                            f.write(page.content())
-                        print("   📸 Debug-Screenshot gespeichert: debug_no_adlist.png")
-                        
-                        # Check for common issues
-                        html_lower = page.content().lower()
-                        if "captcha" in html_lower or "challenge" in html_lower:
-                            print("   🚨 CAPTCHA/Challenge erkannt!")
-                        if "blocked" in html_lower or "gesperrt" in html_lower:
-                            print("   🚨 IP möglicherweise GEBLOCKT!")
-                        if "too many requests" in html_lower:
-                            print("   🚨 Rate Limit erkannt!")
-                    except Exception as debug_err:
-                        print(f"   Debug save error: {debug_err}")
-                    break
-                    
-                items = ad_list.find_all('li', class_='ad-listitem')
-                print(f"   Artikel auf Seite: {len(items)}")
-                
-                for item in items:
-                    if 'is-topad' in item.get('class', []): continue # Skip Top Ads (oft Werbung)
-                    
-                    article = item.find('article')
-                    if not article: continue
-                    
-                    try:
-                        id_ = article.get('data-adid')
-                        link_elem = article.find('a', class_='ellipsis')
-                        
-                        if not link_elem: continue
-                        
-                        title = link_elem.get_text().strip()
-                        link = "https://www.kleinanzeigen.de" + link_elem.get('href')
-                        
-                        # Preis
-                        price_elem = article.find('p', class_='aditem-main--middle--price-shipping--price')
-                        price = price_elem.get_text().strip() if price_elem else ""
-                        
-                        # Ort / Zeit
-                        details = article.find('div', class_='aditem-main--top--left')
-                        location = ""
-                        date_str = ""
-                        if details:
-                            txt = details.get_text(separator='|').strip()
-                            parts = [p.strip() for p in txt.split('|') if p.strip()]
-                            if len(parts) >= 2:
-                                location = parts[0]
-                                date_str = parts[1]
-                        
-                        # Tags
-                        tags_elem = article.find('div', class_='aditem-main--bottom')
-                        tags = []
-                        if tags_elem:
-                            tags = [t.get_text().strip() for t in tags_elem.find_all('span', class_='text-module-end')]
-                        
-                        listing = {
-                            "id": id_,
-                            "title": title,
-                            "price": price,
-                            "link": link,
-                            "location": location,
-                            "date": date_str,
-                            "tags": tags,
-                            "scraped_at": datetime.now().isoformat(),
-                            "isGesuch": "Gesuch" in title or "suche" in title.lower() # Grober check
-                        }
-                        listings.append(listing)
-                        
-                    except Exception as e:
-                        print(f"   Parsing Fehler für Item: {e}")
-                        continue
-                        
-            except Exception as e:
-                print(f"   Fehler beim Laden von Seite {page_num}: {e}")
-                
-    print(f"\n✅ Scraping beendet. {len(listings)} Anzeigen gefunden.")
-    return listings
+                print(f"   Artikel auf Seite {page_num}: {len(page_listings)}")
+            return page_listings
+
+        except Exception as e:
+            print(f"   Fehler beim Laden von Seite {page_num}: {e}")
+            return []
+
+
+def pool_size(profiles: list[dict], concurrency: int = SCRAPE_CONCURRENCY) -> int:
+    """Nicht mehr Contexts öffnen, als es Ergebnisseiten gibt."""
+    return max(1, min(concurrency, sum(profile['pages'] for profile in profiles)))
 
-def categorize_listings(listings: list[dict]) -> list[dict]:
+
+async def iter_listing_pages(pool: PagePool, profiles: list[dict], seen_index: SeenIndex | None = None,
+                             http: HttpFetcher | None = None):
     """
-    Kategorisiert Listings in 'normal', 'abholung', 'defekt'.
+    Async-Iterator über die Ergebnisseiten aller Such-Profile: liefert (Profil, Listings)
+    sobald eine Seite geladen ist, während die übrigen Seiten im Pool weiterladen
+    (flache Seiten aller Profile zuerst). Listings bekommen ihr Profil in 'profile' und
+    sind profilübergreifend dedupliziert.
+    Mit `seen_index` werden pro Profil tiefere Seiten übersprungen, sobald eine Seite
+    nur noch bekannte, unveränderte Anzeigen enthält. Mit `http` kommen die Seiten
+    zuerst über den HTTP-Schnellpfad.
     """
-    print(f"\n🏷️ Kategorisiere {len(listings)} Listings...")
-    
-    for l in listings:
-        text_full = (l['title'] + " " + l.get('description', '')).lower()
-        
-        # 1. Defekt Check
-        if any(x in text_full for x in ['defekt', 'kaputt', 'bastler', 'broken', 'schaden']):
-            l['category'] = 'defekt'
-            continue
-            
-        # 2. Abholung Check (wenn 'versand' explizit verneint oder 'nur abholung')
-        # Einfache Heuristik: 'nur abholung' oder 'kein versand'
-        if 'nur abholung' in text_full or 'kein versand' in text_full:
-            l['category'] = 'abholung'
-            continue
-            
-        # Default
-        l['category'] = 'normal'
-        
+    # Gemeinsame Work-Queue: (Profil, Seite, URL), Seite 1 aller Profile vorneweg
+    work = sorted(
+        [(profile, page_num, build_page_url(profile['url'], page_num))
+         for profile in profiles for page_num in range(1, profile['pages'] + 1)],
+        key=lambda w: w[1]
+    )
+
+    last_page = {profile['name']: profile['pages'] for profile in profiles}
+    seen_ids = set()
+
+    async def load(profile: dict, page_num: int, url: str):
+        name = profile['name']
+        page_listings = await _load_result_page(pool, url, page_num, should_skip=lambda: page_num > last_page[name], http=http)
+        if page_listings is None:
+            # Wie früher: Ab der ersten Seite ohne Anzeigen-Liste ist Schluss
+            last_page[name] = min(last_page[name], page_num - 1)
+        elif seen_index and seen_index.page_fully_known(page_listings) and page_num < last_page[name]:
+            print(f"   ⏹️ [{name}] Seite {page_num} komplett bekannt – tiefere Seiten werden übersprungen.")
+            last_page[name] = page_num
+        return profile, page_listings or []
+
+    tasks = [asyncio.create_task(load(*w)) for w in work]
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            profile, page_listings = await next_page
+            batch = []
+            for l in page_listings:
+                if l['id'] in seen_ids:
+                    continue
+                seen_ids.add(l['id'])
+                l['profile'] = profile['name']
+                batch.append(l)
+            if batch:
+                yield profile, normalize_prices(batch)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def scrape_profiles_async(pool: PagePool, profiles: list[dict], seen_index: SeenIndex | None = None,
+                                http: HttpFetcher | None = None) -> list[Listing]:
+    """Sammelt alle Listings aus iter_listing_pages in eine Liste."""
+    listings = []
+    async for _, batch in iter_listing_pages(pool, profiles, seen_index, http):
+        listings.extend(batch)
     return listings
 
-    print(f"🌎 Starte Browser (Camoufox)...")
-    
-    with Camoufox(headless=True) as browser:
-        page = browser.new_page()
-        
-        # Anti-Detection Headers
-        page.set_extra_http_headers({
-            "Accept-Language": "de-DE,de;q=0.9",
-        })
 
-        for i in range(num_pages):
-            page_num = i + 1
-            if page_num == 1:
-                url = base_url
-            else:
-                # Kleinanzeigen Pagination Logic
-                if "/seite:" in base_url:
-                     url = base_url 
-                else:
-                    parts = base_url.split('/')
-                    insert_idx = -1
-                    for idx, p in enumerate(parts):
-                        if p.startswith('s-'):
-                            insert_idx = idx
-                            break
-                    
-                    if insert_idx != -1:
-                        new_s_part = parts[insert_idx].replace('s-', f's-seite:{page_num}-')
-                        parts[insert_idx] = new_s_part
-                        url = "/".join(parts)
-                    else:
-                        url = base_url + f"seite:{page_num}/" 
-
-            print(f"\n📄 Lade Seite {page_num}: {url}")
-            
-            try:
-                page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                random_delay(2, 4)
-                
-                # Cookie Banner & Overlays
-                if i == 0:
-                    dismiss_overlays(page)
-                
-                # Scrollen
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                random_delay(1, 2)
-                
-                # Parsing
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(page.content(), "html.parser")
-                
-                # Find ad list
-                ad_list = soup.find('ul', id='srchrslt-adtable')
-                if not ad_list:
-                    print("   ⚠️ Keine Anzeigen-Liste gefunden.")
-                    break
-                    
-                items = ad_list.find_all('li', class_='ad-listitem')
-                print(f"   Artikel auf Seite: {len(items)}")
-                
-                for item in items:
-                    if 'is-topad' in item.get('class', []): continue # Skip Top Ads (oft Werbung)
-                    
-                    article = item.find('article')
-                    if not article: continue
-                    
-                    try:
-                        id_ = article.get('data-adid')
-                        link_elem = article.find('a', class_='ellipsis')
-                        
-                        if not link_elem: continue
-                        
-                        title = link_elem.get_text().strip()
-                        link = "https://www.kleinanzeigen.de" + link_elem.get('href')
-                        
-                        # Preis
-                        price_elem = article.find('p', class_='aditem-main--middle--price-shipping--price')
-                        price = price_elem.get_text().strip() if price_elem else ""
-                        
-                        # Ort / Zeit
-                        details = article.find('div', class_='aditem-main--top--left')
-                        location = ""
-                        date_str = ""
-                        if details:
-                            txt = details.get_text(separator='|').strip()
-                            parts = [p.strip() for p in txt.split('|') if p.strip()]
-                            if len(parts) >= 2:
-                                location = parts[0]
-                                date_str = parts[1]
-                        
-                        # Tags
-                        tags_elem = article.find('div', class_='aditem-main--bottom')
-                        tags = []
-                        if tags_elem:
-                            tags = [t.get_text().strip() for t in tags_elem.find_all('span', class_='text-module-end')]
-                        
-                        listing = {
-                            "id": id_,
-                            "title": title,
-                            "price": price,
-                            "link": link,
-                            "location": location,
-                            "date": date_str,
-                            "tags": tags,
-                            "scraped_at": datetime.now().isoformat(),
-                            "isGesuch": "Gesuch" in title or "suche" in title.lower() # Grober check
-                        }
-                        listings.append(listing)
-                        
-                    except Exception as e:
-                        print(f"   Parsing Fehler für Item: {e}")
-                        continue
-                        
-            except Exception as e:
-                print(f"   Fehler beim Laden von Seite {page_num}: {e}")
-                
+def scrape_profiles(profiles: list[dict], concurrency: int = SCRAPE_CONCURRENCY,
+                    seen_index: SeenIndex | None = None) -> list[Listing]:
+    """Scrapt alle Such-Profile in einem Browser-Lauf."""
+    async def run():
+        size = pool_size(profiles, concurrency)
+        print(f"🌎 Starte Browser (Camoufox, {size} parallele Contexts, {len(profiles)} Profile)...")
+        async with open_browser(headless=True) as browser:
+            async with PagePool(browser, size=size) as pool, \
+                    (HttpFetcher(size) if FETCH_MODE == "http" else nullcontext()) as http:
+                return await scrape_profiles_async(pool, profiles, seen_index, http)
+
+    listings = asyncio.run(run())
     print(f"\n✅ Scraping beendet. {len(listings)} Anzeigen gefunden.")
+    ROUTE_STATS.report()
+    PACER.report()
     return listings
 
-def categorize_listings(listings: list[dict]) -> list[dict]:
+
+def scrape_listings(base_url: str, num_pages: int = 1, use_ai_filter: bool = True,
+                    concurrency: int = SCRAPE_CONCURRENCY, seen_index: SeenIndex | None = None) -> list[Listing]:
+    """Scrapt Listings von Kleinanzeigen (eine URL)."""
+    profile = {"name": "default", "url": base_url, "pages": num_pages}
+    return scrape_profiles([profile], concurrency, seen_index)
+
+def categorize_listings(listings: list[Listing]) -> list[Listing]:
     """
     Kategorisiert Listings in 'normal', 'abholung', 'defekt'.
+    Die Regel-Engine setzt die Kategorie schon anhand des Titels; mit Beschreibung wird neu bewertet.
     """
     print(f"\n🏷️ Kategorisiere {len(listings)} Listings...")
     
     for l in listings:
-        text_full = (l['title'] + " " + l.get('description', '')).lower()
-        
-        # 1. Defekt Check
-        if any(x in text_full for x in ['defekt', 'kaputt', 'bastler', 'broken', 'schaden']):
-            l['category'] = 'defekt'
-            continue
-            
-        # 2. Abholung Check (wenn 'versand' explizit verneint oder 'nur abholung')
-        # Einfache Heuristik: 'nur abholung' oder 'kein versand'
-        if 'nur abholung' in text_full or 'kein versand' in text_full:
-            l['category'] = 'abholung'
-            continue
-            
-        # Default
-        l['category'] = 'normal'
+        if l.get('description') or not l.get('category'):
+            l['category'] = categorize(l['title'] + " " + (l.get('description') or ''))
         
     return listings
 
-def filter_titles_with_ai(listings: list[dict]) -> list[dict]:
+def filter_titles_with_ai(listings: list[Listing], search_term: str | None = None,
+                          prompt_template_id: str | None = None, models: list[str] | None = None) -> list[Listing]:
     """
     Benutzt Groq/Llama um Titel zu analysieren.
-    Enthält jetzt auch einen strengen Vor-Filter für offensichtliche Falsch-Treffer.
+    Geprüft werden nur Listings, die nicht schon von der Regel-Engine abgelehnt wurden.
+    Suchbegriff/Template/Modell-Kette kommen vom Such-Profil (Fallback: .env).
+    Kaskade: jedes Modell außer dem letzten urteilt mit Sicherheit; nur unsichere Titel gehen weiter.
     """
     if not listings:
         return []
 
-    # 1. HARTER VOR-FILTER (spart API Tokens und filtert offensichtlichen Müll)
-    pre_filtered = []
-    print(f"\n🔍 Starte Vor-Filterung von {len(listings)} Anzeigen...")
-    
-    search_term = os.getenv("SEARCH_TERM", "ps5").lower()
-    search_term_clean = search_term.replace(" ", "").lower()
-    term_parts = search_term.split()
-
-    for l in listings:
-        t = l['title'].lower()
-        
-        # MUSS Suchbegriff enthalten (Token-basiert oder Variationen)
-        # Check if ALL parts are in title
-        all_parts_found = all(part in t for part in term_parts)
-        
-        # PS5-Handling fallback
-        synonyms = [search_term, search_term_clean]
-        if 'ps5' in search_term:
-            synonyms.append("playstation 5")
-            synonyms.append("playstation5")
-            
-        matches_strict = any(s in t for s in synonyms)
-        
-        if not (all_parts_found or matches_strict):
-            continue
-            
-        # Darf NICHT "Suche/Gesuch" sein
-        if "suche" in t or "gesuch" in t or "kaufe" in t or "ankauf" in t:
-            continue
-            
-        # Darf NICHT "Portal" sein (PlayStation Portal)
-        if "portal" in t and ("remote" in t or "player" in t):
-            continue
-            
-        # Darf NICHT "Ständer" oder "Halterung" sein
-        if "ständer" in t or "halterung" in t or "wandhalterung" in t:
-            continue
-        
-        # Controller Filter (einfach)
-        if "controller" in t and "konsole" not in t and "bundle" not in t:
-             if "scuf" in t or "aim" in t or "edge" in t:
-                 continue
-            
-        pre_filtered.append(l)
-
-    print(f"✅ {len(pre_filtered)} von {len(listings)} Listings haben den '{search_term}'-Namenstest bestanden.")
-    
-    if not pre_filtered:
-        print("❌ Alle Listings wurden vom Vor-Filter aussortiert.")
-        return []
-    
+    search_term = (search_term or os.getenv("SEARCH_TERM", "ps5")).lower()
+    models = models or parse_models(os.getenv("TITLE_MODELS", DEFAULT_TITLE_MODELS))
 
-    # 2. KI-FILTER
-    print(f"\n🤖 Analysiere {len(listings)} Titel mit KI...")
-    
-    # Trenne bereits markierte (durch Vor-Filter) von den zu prüfenden
+    # Trenne bereits markierte (durch Regeln / Vor-Klassifikator) von den zu prüfenden
     # WICHTIG: Auch 'rejected_price' darf NICHT mehr geprüft werden!
-    to_check = [l for l in listings if 'rejected' not in l.get('filter_status', '')]
+    to_check = [
+        l for l in listings
+        if 'rejected' not in (l.get('filter_status') or '') and l.get('filter_status') != 'passed_ai_title'
+    ]
     
     if not to_check:
         print("❌ Alle Listings bereits durch Vor-Filter abgelehnt.")
         return listings
 
-    client = Groq(api_key=GROQ_API_KEY)
-    
-    # Bereite Titel-Liste für den Prompt vor
-    titles_text = "\n".join([
-        f"{i+1}. {l['title']} | {price_clean(l['price'])}"
-        for i, l in enumerate(to_check)
-    ])
-    
+    # Prompt-Gerüst mit Platzhalter – die Titel kommen erst nach dem Cache-Abgleich hinein
+    titles_text = "{{LISTINGS}}"
+
     # Dynamic Prompt Construction OR Template Fetch
     
-    prompt_template_id = os.getenv("PROMPT_TEMPLATE_ID")
+    prompt_template_id = prompt_template_id or os.getenv("PROMPT_TEMPLATE_ID")
     prompt = ""
     
     if prompt_template_id and supabase:
@@ -534,7 +420,7 @@ def filter_titles_with_ai(listings: list[dict]) -> list[dict]:
              res = supabase.table('prompt_templates').select('content').eq('id', prompt_template_id).execute()
              if res.data and len(res.data) > 0:
                  template_content = res.data[0]['content']
-                 prompt = template_content.replace('{{LISTINGS}}', titles_text)
+                 prompt = template_content
                  print("   ✅ Custom Template geladen und Listings eingefügt.")
              else:
                  print("   ⚠️ Template nicht gefunden. Fallback auf Standard.")
@@ -587,145 +473,191 @@ ANZEIGEN:
 
 Antworte NUR mit einem JSON-Array der Nummern der ECHTEN TREFFER, z.B. [1, 3, 5]."""
 
-    print("\n📤 Sende an Groq/Llama 3.3 70B...")
-    
-    try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.0,
-            max_tokens=500
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        import re
-        all_matches = re.findall(r'\[[\d,\s]*\]', result_text)
-        
-        relevant_indices = []
-        for match in reversed(all_matches):
-            try:
-                parsed = json.loads(match)
-                if parsed:
-                    relevant_indices = parsed
-                    break
-            except: pass
-        
-        print(f"Ki Antwort: {result_text}")
-        print(f"📊 KI wählt aus: {relevant_indices}")
-        
-        # Markiere Status
-        for i, l in enumerate(to_check):
-            idx = i + 1
-            if idx in relevant_indices:
-                # Wurde von KI akzeptiert
-                if not l.get('filter_status'): # Nur wenn nicht schon rejected
-                    l['filter_status'] = 'passed_ai_title'
-                    l['filter_reason'] = 'AI Title Check Passed'
-            else:
-                # Von KI abgelehnt
-                l['filter_status'] = 'rejected_ai_title'
-                l['filter_reason'] = 'AI did not select this title'
-        
-        return listings # Return original list (modified in place)
-        
-    except Exception as e:
-        print(f"⚠️ KI-Filter Fehler: {e}")
-        # Fallback: Alles als 'manual_check_needed' markieren oder so?
-        return manual_filter(listings)
+    # Bekannte Titel (gleicher Prompt, ähnlicher Preis) aus dem Cache – kein Groq-Call
+    keys = {}
+    if VERDICTS:
+        version = prompt_version(prompt, *models)
+        keys = {l['id']: VERDICTS.key("title", version, l['title'], l.get('price_eur')) for l in to_check}
+        cached = VERDICTS.get_many("title", list(keys.values()))
+        for l in to_check:
+            if keys[l['id']] in cached:
+                passed, reason = cached[keys[l['id']]]
+                l['filter_status'] = 'passed_ai_title' if passed else 'rejected_ai_title'
+                l['filter_reason'] = f"{reason} (Cache)"
+                l['title_source'] = TITLE_SOURCE_AI
+        to_check = [l for l in to_check if keys[l['id']] not in cached]
+        if not to_check:
+            print("🧠 Alle Titel aus dem KI-Cache.")
+            return listings
 
+    # Near-Duplicates: nur ein Vertreter pro Cluster geht an Groq
+    clusters = cluster_titles(to_check)
+    representatives = [c[0] for c in clusters]
 
-def manual_filter(listings: list[dict]) -> list[dict]:
-    """Fallback-Filter bzw Vor-Filter ohne KI."""
-    
-    skip_keywords = [
-        'suche', 'gesuch', 'controller', 'dualsense', 'headset', 
-        'spiel', 'game', 'laufwerk', 'ps4', 'playstation 4',
-        'defekt', 'kaputt', 'bastler', 'scuf', 'edge controller',
-        'miete', 'verleih'
-    ]
-    
-    search_term = os.getenv("SEARCH_TERM", "ps5").lower()
-    search_term_clean = search_term.replace(" ", "").lower() # e.g. "xboxseriesx"
-    
-    # Split search term into parts for looser matching if needed (simple approach first)
-    # e.g. "xbox series x" -> ["xbox", "series", "x"]
-    term_parts = search_term.lower().split()
+    print(f"\n🤖 Analysiere {len(representatives)} Titel mit KI ({len(to_check) - len(representatives)} Duplikate, "
+          f"Modelle: {' -> '.join(models)})...")
 
-    for l in listings:
-        # Skip wenn schon rejected (z.B. durch anderen Filter)
-        if l.get('filter_status') and 'rejected' in l['filter_status']:
-            continue
-            
-        title_lower = l['title'].lower()
-        tags_lower = ' '.join(l['tags']).lower()
-        
-        # Skip Gesuche
-        if l.get('isGesuch') or 'gesuch' in tags_lower:
-            l['filter_status'] = 'rejected_keyword'
-            l['filter_reason'] = 'Gesuch erkannt'
-            continue
+    # Kaskade: pro Stufe Chunks fester Größe parallel an Groq (Semaphore/Quota in llm.py),
+    # Ergebnisse nach Listing-ID; was eine Stufe nicht sicher entscheidet, geht an die nächste
+    verdicts: dict[str, bool] = {}
+    decided_by: dict[str, str] = {}
+    pending = representatives
+    for tier, model in enumerate(models):
+        if not pending:
+            break
+        final = tier == len(models) - 1
+        classify = classify_title_chunk if final else classify_title_chunk_scored
+        chunks = [pending[i:i + TITLE_CHUNK_SIZE] for i in range(0, len(pending), TITLE_CHUNK_SIZE)]
+        tier_verdicts, failed = _classify_chunks(classify, prompt, chunks, model)
+        if final and failed:
+            # Letzte Stufe: fehlgeschlagene Chunks einmal Titel für Titel nachprüfen
+            retry = [l for chunk in failed for l in chunk]
+            print(f"   🔁 {len(retry)} Titel aus fehlgeschlagenen Chunks einzeln nachprüfen...")
+            retried, failed = _classify_chunks(classify, prompt, [[l] for l in retry], model)
+            tier_verdicts.update(retried)
+        LLM_STATS.record_resolved(f"title:{model}", len(tier_verdicts))
+        verdicts.update(tier_verdicts)
+        decided_by.update(dict.fromkeys(tier_verdicts, model))
+        pending = [l for l in pending if l['id'] not in verdicts]
+        if not final:
+            print(f"   🪜 {model}: {len(tier_verdicts)} sicher entschieden, {len(pending)} gehen weiter.")
 
-        # Check ob Suchbegriff im Titel (Basis-Check)
-        # Lockerer Check: Mindestens ein wichtiger Teil des Suchbegriffs sollte drin sein
-        # Oder der genaue String
-        
-        # Simple Logic: Check if "ps5" or "playstation 5" matches, customized for configured term
-        # Wir prüfen ob der Titel den Search Term enthält
-        
-        # Falls Search Term "ps5" ist, prüfen wir auch auf "playstation 5"
-        term_variations = [search_term, search_term_clean]
-        if 'ps5' in search_term:
-            term_variations.append("playstation 5")
-            term_variations.append("playstation5")
-        
-        # Check Match
-        # Wir prüfen ob ALLE Wörter des Suchbegriffs im Titel vorkommen (Token-basiert)
-        # z.B. "Xbox Series X" -> muss "Xbox", "Series" und "X" enthalten (Reihenfolge egal)
-        
-        # Ausnahme: PS5/Playstation 5 behandeln wir als Synonym
-        requires_all = term_parts
-        if 'ps5' in search_term:
-             # Logic is complex for PS5 synonyms, simplify:
-             # Just stick to flexible matching or exact variations
-             pass # Use existing var
-             
-        # Check if ALL parts are in title
-        all_parts_found = all(part in title_lower for part in term_parts)
-        
-        # Alternative: Strict substring match (old way) or cleaned match
-        matches_strict = any(t in title_lower for t in term_variations)
-        
-        if not (all_parts_found or matches_strict):
-             l['filter_status'] = 'rejected_name_mismatch'
-             l['filter_reason'] = f"Title mismatch '{search_term}'"
-             # DEBUG:
-             # print(f"   ❌ Rejected: {l['title']} (Reason: {l['filter_reason']})")
-             continue
-             
-        # Skip wenn Keywords im Titel (Negative Keywords)
-        matched_kw = next((kw for kw in skip_keywords if kw in title_lower), None)
-        if matched_kw:
-            # Aber behalte wenn Suchbegriff EINDEUTIG ist und Keyword vielleicht Kontext ist
-            if matched_kw in search_term:
-                pass 
-            else:
-                 l['filter_status'] = 'rejected_keyword'
-                 l['filter_reason'] = f"Keyword: {matched_kw}"
+    # Duplikate übernehmen das Urteil ihres Vertreters
+    for cluster in clusters:
+        if cluster[0]['id'] in verdicts:
+            for member in cluster[1:]:
+                verdicts[member['id']] = verdicts[cluster[0]['id']]
+                decided_by[member['id']] = decided_by[cluster[0]['id']]
+
+    # Markiere Status. Ohne Urteil bleibt 'passed_prefilter' (KI-Check offen): solche Listings
+    # werden weder gespeichert noch als gesehen markiert, der nächste Lauf prüft sie erneut
+    undecided = 0
+    for l in to_check:
+        if l['id'] not in verdicts:
+            l['filter_reason'] = 'AI title check failed'
+            undecided += 1
             continue
-            
-        # Vor-FilterPassed
-        l['filter_status'] = 'passed_prefilter'
-    
-    passed_count = sum(1 for l in listings if l.get('filter_status') == 'passed_prefilter')
-    print(f"✅ {passed_count} von {len(listings)} Listings haben den '{search_term}'-Namenstest bestanden.")
-    
-    return listings
+        if verdicts[l['id']]:
+            # Wurde von KI akzeptiert (to_check enthält nur nicht-rejected Listings)
+            l['filter_status'] = 'passed_ai_title'
+            l['filter_reason'] = 'AI Title Check Passed'
+        else:
+            # Von KI abgelehnt
+            l['filter_status'] = 'rejected_ai_title'
+            l['filter_reason'] = 'AI did not select this title'
+        if len(models) > 1:
+            l['filter_reason'] += f" [{decided_by[l['id']]}]"
+        l['title_source'] = TITLE_SOURCE_AI
+
+    print(f"📊 KI wählt aus: {sum(verdicts.values())} von {len(to_check)} Titeln"
+          + (f" ({undecided} ohne Urteil)" if undecided else ""))
+
+    if VERDICTS:
+        VERDICTS.put_many({
+            keys[l['id']]: (verdicts[l['id']], l['filter_reason']) for l in to_check if l['id'] in verdicts
+        })
+
+    for cluster in clusters:
+        for member in cluster[1:]:
+            if member['id'] in verdicts:
+                member['filter_reason'] += f" (wie {cluster[0]['id']})"
+                member['title_source'] = TITLE_SOURCE_DUPLICATE
+
+    return listings # Return original list (modified in place)
+
+
+def _classify_chunks(classify, prompt: str, chunks: list[list[Listing]],
+                     model: str) -> tuple[dict[str, bool], list[list[Listing]]]:
+    """Chunks parallel an Groq -> (Urteile nach Listing-ID, fehlgeschlagene Chunks)."""
+    verdicts: dict[str, bool] = {}
+    failed: list[list[Listing]] = []
+    with ThreadPoolExecutor(max_workers=min(len(chunks), LLM_CONCURRENCY)) as executor:
+        futures = {executor.submit(classify, prompt, chunk, model): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                verdicts.update(future.result())
+            except Exception as e:
+                print(f"⚠️ KI-Filter Fehler [{model}] ({len(futures[future])} Titel): {e}")
+                failed.append(futures[future])
+    return verdicts, failed
 
 
-def price_clean(p):
-    if not p: return "0"
-    return p.replace("€", "").replace(".", "").replace(",", ".").strip()
+def _numbered_titles(chunk: list[Listing]) -> tuple[dict[int, Listing], str]:
+    """Nummern gelten nur innerhalb des Chunks und werden sofort auf Listing-IDs abgebildet."""
+    numbered = dict(enumerate(chunk, 1))
+    titles_text = "\n".join(
+        f"{i}. {l['title']} | {format_price(l.get('price_eur'), l.get('price_negotiable'))}"
+        for i, l in numbered.items()
+    )
+    return numbered, titles_text
+
+
+def classify_title_chunk(prompt: str, chunk: list[Listing], model: str) -> dict[str, bool]:
+    """
+    Ein Groq-Call für einen Chunk Titel -> {listing_id: ausgewählt} (letzte Stufe der Kaskade).
+    Abgeschnittene oder unlesbare Antworten werfen (der Chunk bleibt dann ohne Urteil).
+    """
+    numbered, titles_text = _numbered_titles(chunk)
+    result_text, finish_reason = complete(
+        prompt.replace("{{LISTINGS}}", titles_text), model,
+        # Platz für ein vollständiges Array aller Nummern plus etwas Text
+        max_tokens=200 + 6 * len(chunk), label=f"title:{model}", items=len(chunk),
+    )
+    if finish_reason == "length":
+        raise ValueError("Antwort abgeschnitten (max_tokens)")
+
+    all_matches = re.findall(r'\[[\d,\s]*\]', result_text)
+    if not all_matches:
+        raise ValueError(f"Keine Nummern-Liste in der Antwort: {result_text[:100]!r}")
+
+    relevant_indices = []
+    for match in reversed(all_matches):
+        try:
+            parsed = json.loads(match)
+            if parsed:
+                relevant_indices = parsed
+                break
+        except: pass
+
+    print(f"   📤 Chunk ({len(chunk)} Titel) -> KI wählt aus: {relevant_indices}")
+    return {l['id']: i in relevant_indices for i, l in numbered.items()}
+
+
+# Antwortformat der vorderen Kaskaden-Stufen (ersetzt das JSON-Array des Prompts)
+SCORED_ANSWER_FORMAT = """
+
+WICHTIG – Antwortformat (gilt statt des oben genannten): Eine Zeile pro Anzeige,
+<Nummer>: JA oder NEIN, dann deine Sicherheit von 0 bis 100. Beispiel:
+1: JA 95
+2: NEIN 60"""
+
+
+def classify_title_chunk_scored(prompt: str, chunk: list[Listing], model: str) -> dict[str, bool]:
+    """
+    Vordere Kaskaden-Stufe: Urteil + Sicherheit pro Titel. Zurück kommen nur Titel mit
+    Sicherheit >= CASCADE_MIN_CONFIDENCE; fehlende/unsichere gehen an das nächste Modell.
+    """
+    numbered, titles_text = _numbered_titles(chunk)
+    result_text, _ = complete(
+        prompt.replace("{{LISTINGS}}", titles_text) + SCORED_ANSWER_FORMAT, model,
+        max_tokens=20 + 10 * len(chunk), label=f"title:{model}", items=len(chunk),
+    )
+    confident = {}
+    for number, answer, confidence in re.findall(r'(\d+)\s*[:.)-]\s*(JA|NEIN)\D{0,5}(\d{1,3})', result_text.upper()):
+        listing = numbered.get(int(number))
+        if listing and int(confidence) >= CASCADE_MIN_CONFIDENCE:
+            confident[listing['id']] = answer == "JA"
+    return confident
+
+
+AD_DETAILS_JS = """
+() => {
+    const description = document.querySelector('#viewad-description-text')?.innerText?.trim() || null;
+    const sellerName = document.querySelector('#viewad-contact .text-body-regular-strong')?.innerText?.trim() || 'Privat';
+    return { description, seller_name: sellerName };
+}
+"""
+
 
 def fetch_description(page, url: str) -> dict:
     """Holt die Beschreibung von einer Anzeigen-Detailseite."""
@@ -735,19 +667,14 @@ def fetch_description(page, url: str) -> dict:
             return {"description": None}
 
         page.goto(url, wait_until="domcontentloaded")
-        random_delay(1.5, 3)
+        wait_ready(page, "#viewad-description-text", state="attached")
+        PACER.pause("after_navigation")
         
         try:
             page.keyboard.press("Escape")
         except: pass
         
-        details = page.evaluate("""
-            () => {
-                const description = document.querySelector('#viewad-description-text')?.innerText?.trim() || null;
-                const sellerName = document.querySelector('#viewad-contact .text-body-regular-strong')?.innerText?.trim() || 'Privat';
-                return { description, seller_name: sellerName };
-            }
-        """)
+        details = page.evaluate(AD_DETAILS_JS)
         
         return details
         
@@ -756,173 +683,359 @@ def fetch_description(page, url: str) -> dict:
         return {"description": None}
 
 
-def filter_with_description(listings: list[dict]) -> list[dict]:
+async def fetch_description_async(page, url: str) -> dict:
+    """Async-Variante von fetch_description (Page aus dem Scraper-Pool)."""
+    try:
+        if not url or not url.startswith('http'):
+            return {"description": None}
+
+        await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+        await wait_ready_async(page, "#viewad-description-text", state="attached")
+        await PACER.pause_async("after_navigation", budgeted=False)
+
+        try:
+            await page.keyboard.press("Escape")
+        except: pass
+
+        return await page.evaluate(AD_DETAILS_JS)
+
+    except Exception as e:
+        print(f"⚠️ Fehler beim Laden der Details: {e}")
+        return {"description": None}
+
+
+async def fetch_details_async(pool: PagePool, listings: list[Listing], cache: DetailCache | None = None):
+    """
+    Holt Beschreibung + Verkäufer für `listings` parallel über den Pool (so viele Tabs
+    wie der Pool Contexts hat). Bereits gecachte Anzeigen werden nicht erneut geladen.
+    Schreibt 'description' und 'seller_name' direkt in die Listing-Dicts.
+    """
+    cached = cache.get_many([l['id'] for l in listings]) if cache else {}
+    to_fetch = [l for l in listings if l['id'] not in cached]
+    for l in listings:
+        if l['id'] in cached:
+            l.update(cached[l['id']])
+    print(f"\n📖 Detailseiten: {len(cached)} aus dem Cache, {len(to_fetch)} zu laden...")
+
+    async def load(listing: dict):
+        async with pool.page(listing['link']) as page:
+            details = await fetch_description_async(page, listing['link'])
+        if details.get('description'):
+            listing['description'] = details['description']
+            listing['seller_name'] = details.get('seller_name')
+            if cache:
+                cache.put(listing['id'], details)
+
+    await asyncio.gather(*[load(l) for l in to_fetch])
+    found = len([l for l in listings if l.get('description')])
+    print(f"   ✅ Beschreibungen für {found} von {len(listings)} Kandidaten.")
+
+
+DESC_PROMPT = """Ist das ein Verkauf von '{search_term}' (das Gerät selbst, kein Zubehör, kein Gesuch)?
+TITEL: {title}
+PREIS: {price}
+VERKÄUFER: {seller}
+BESCHREIBUNG: {description}
+
+Antworte NUR mit: JA oder NEIN"""
+
+# Mehrere Anzeigen in einem Prompt (DESC_BATCH_SIZE > 1), Antwort eine Zeile pro ID
+DESC_BATCH_PROMPT = """Prüfe jede Anzeige: Ist das ein Verkauf von '{search_term}' (das Gerät selbst, kein Zubehör, kein Gesuch)?
+
+{listings}
+
+Antworte NUR mit einer Zeile pro Anzeige im Format <ID>: JA oder <ID>: NEIN"""
+
+DESC_BATCH_ITEM = """ID: {id}
+TITEL: {title}
+PREIS: {price}
+VERKÄUFER: {seller}
+BESCHREIBUNG: {description}"""
+
+
+def _desc_fields(listing: Listing) -> dict:
+    return {
+        "title": listing['title'], "price": listing['price'],
+        "seller": listing.get('seller_name') or 'Privat',
+        "description": (listing.get('description') or '')[:800],
+    }
+
+
+async def classify_description(listing: Listing, search_term: str) -> tuple[bool, str]:
+    """Ein Groq-Call für eine Anzeige -> (ist Gerät, Antwort)."""
+    answer, _ = await complete_async(
+        DESC_PROMPT.format(search_term=search_term, **_desc_fields(listing)), DESC_MODEL,
+        max_tokens=10, temperature=0.1, label="desc",
+    )
+    answer = answer.upper()
+    return "JA" in answer, answer
+
+
+async def classify_description_batch(batch: list[Listing], search_term: str) -> dict[str, tuple[bool, str]]:
+    """Ein Groq-Call für mehrere Anzeigen -> {listing_id: (ist Gerät, Antwort)}; fehlende IDs fehlen im Ergebnis."""
+    items = "\n---\n".join(DESC_BATCH_ITEM.format(id=l['id'], **_desc_fields(l)) for l in batch)
+    answer, _ = await complete_async(
+        DESC_BATCH_PROMPT.format(search_term=search_term, listings=items), DESC_MODEL,
+        max_tokens=10 + 12 * len(batch), temperature=0.1, label="desc_batch", items=len(batch),
+    )
+    found = dict(re.findall(r'([\w-]+)\]?\s*:\s*(JA|NEIN)\b', answer.upper()))
+    return {l['id']: (found[l['id']] == "JA", found[l['id']]) for l in batch if l['id'] in found}
+
+
+async def filter_with_description_async(listings: list[Listing], search_term: str | None = None) -> list[Listing]:
     """
     Zweiter Filter: Prüft mit voller Beschreibung.
-    Markiert Listings als rejected_ai_desc oder passed.
+    Markiert Listings als rejected_ai_desc oder passed. Die Groq-Calls laufen parallel
+    (LLM_CONCURRENCY); mit DESC_BATCH_SIZE > 1 teilen sich mehrere Anzeigen einen Prompt.
     """
-    # Nur 'passed' Listings prüfen
-    to_check = [l for l in listings if l.get('filter_status') == 'passed_ai_title']
+    # Nur 'passed_ai_title' Listings mit geholter Beschreibung prüfen
+    to_check = [l for l in listings if l.get('filter_status') == 'passed_ai_title' and l.get('description')]
+    search_term = search_term or os.getenv("SEARCH_TERM", "ps5")
     
     if not to_check:
         return listings
     
-    print(f"\n🔍 Zweiter Filter: Prüfe {len(to_check)} Listings mit voller Beschreibung...")
-    
-    client = Groq(api_key=GROQ_API_KEY)
-    
-    for listing in to_check:
-        title = listing['title']
-        desc = listing.get('description', '') or listing.get('snippet', '')
-        price = listing['price']
-        
-        prompt = f"""Ist das ein Verkauf einer PS5-KONSOLE?
-TITEL: {title}
-PREIS: {price}
-BESCHREIBUNG: {desc[:800]}
+    # Gleicher Titel, Preis-Bucket und gleiche Beschreibung -> Urteil aus dem Cache
+    keys = {}
+    if VERDICTS:
+        version = prompt_version(DESC_PROMPT, DESC_BATCH_PROMPT, search_term, DESC_MODEL)
+        keys = {
+            l['id']: VERDICTS.key("desc", version, l['title'], l.get('price_eur'),
+                                  extra=f"{l.get('seller_name')}\n{(l.get('description') or '')[:800]}")
+            for l in to_check
+        }
+        cached = VERDICTS.get_many("desc", list(keys.values()))
+        for l in to_check:
+            if keys[l['id']] in cached:
+                passed, reason = cached[keys[l['id']]]
+                l['filter_status'] = 'passed' if passed else 'rejected_ai_desc'
+                l['filter_reason'] = f"{reason} (Cache)"
+        to_check = [l for l in to_check if keys[l['id']] not in cached]
+        if not to_check:
+            return listings
 
-Antworte NUR mit: JA oder NEIN"""
+    batches = [to_check[i:i + DESC_BATCH_SIZE] for i in range(0, len(to_check), DESC_BATCH_SIZE)]
+    print(f"\n🔍 Zweiter Filter: Prüfe {len(to_check)} Listings mit voller Beschreibung ({len(batches)} Calls)...")
+
+    verdicts: dict[str, tuple[bool, str]] = {}
+    errors: dict[str, Exception] = {}
 
+    async def check_single(listing: Listing):
         try:
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=10
-            )
-            
-            answer = response.choices[0].message.content.strip().upper()
-            is_console = "JA" in answer
-            
-            status = "✅" if is_console else "❌"
-            print(f"   {status} {title[:40]}... → {answer}")
-            
-            if is_console:
-                listing['filter_status'] = 'passed' # FINAL PASS
-                listing['filter_reason'] = 'Confirmed by AI Description'
-            else:
-                listing['filter_status'] = 'rejected_ai_desc'
-                listing['filter_reason'] = f'AI Desc Reject: {answer}'
-                
+            verdicts[listing['id']] = await classify_description(listing, search_term)
         except Exception as e:
+            errors[listing['id']] = e
+
+    async def check_batch(batch: list[Listing]):
+        if len(batch) > 1:
+            try:
+                verdicts.update(await classify_description_batch(batch, search_term))
+            except Exception as e:
+                print(f"   ⚠️ Batch-Fehler ({len(batch)} Listings), prüfe einzeln: {e}")
+            # IDs ohne Antwort einzeln nachprüfen
+            batch = [l for l in batch if l['id'] not in verdicts]
+        await asyncio.gather(*(check_single(l) for l in batch))
+
+    await asyncio.gather(*(check_batch(b) for b in batches))
+
+    for listing in to_check:
+        title = listing['title']
+        if listing['id'] not in verdicts:
+            e = errors.get(listing['id'])
             print(f"   ⚠️ Fehler bei {title[:30]}: {e}")
             # Im Zweifel behalten
             listing['filter_status'] = 'passed'
             listing['filter_reason'] = f'Error fallback: {e}'
-            
+            continue
+
+        is_console, answer = verdicts[listing['id']]
+        status = "✅" if is_console else "❌"
+        print(f"   {status} {title[:40]}... → {answer}")
+
+        if is_console:
+            listing['filter_status'] = 'passed' # FINAL PASS
+            listing['filter_reason'] = 'Confirmed by AI Description'
+        else:
+            listing['filter_status'] = 'rejected_ai_desc'
+            listing['filter_reason'] = f'AI Desc Reject: {answer}'
+
+    if VERDICTS:
+        VERDICTS.put_many({
+            keys[l['id']]: (verdicts[l['id']][0], l['filter_reason']) for l in to_check if l['id'] in verdicts
+        })
+
     return listings
 
 
-def main():
-    # Read config from .env (loaded at top of file)
-    search_term = os.getenv("SEARCH_TERM", "ps5")
-    min_price_env = os.getenv("MIN_PRICE", "100")
-    max_price_env = os.getenv("MAX_PRICE", "350")
-    
-    # Cast to int for logic
-    try:
-         max_price_val = int(max_price_env)
-    except:
-         max_price_val = 350
-    
-    # Construct URL dynamically
-    # Clean search term for URL (replace spaces with -)
-    term_clean = search_term.replace(" ", "-").lower()
-    if not term_clean.startswith("s-"):
-        term_clean = f"s-{term_clean}"
-        
-    url = f"https://www.kleinanzeigen.de/{term_clean}/k0?minPreis={min_price_env}&maxPreis={max_price_env}"
-    
-    print(f"🌍 Such-Parameter: '{search_term}' ({min_price_env}-{max_price_env}€)")
-    
-    # Schritt 1: Scrapen & Initial Filter (Pre-Filter + Title AI)
-    # manual_filter läuft implizit VOR der KI in 'scrape_listings' (wenn wir es dort einbauen)
-    # Aber hier rufen wir es explizit auf:
-    
-    raw_listings = scrape_listings(url, num_pages=2, use_ai_filter=False) # False, weil wir eigene Logik machen
-    
-    if not raw_listings:
-        print("⚠️ Keine Listings gefunden.")
-        return
+def filter_with_description(listings: list[Listing], search_term: str | None = None) -> list[Listing]:
+    """Sync-Variante (eigener Event-Loop) für Aufrufer außerhalb der async Pipeline."""
+    return asyncio.run(filter_with_description_async(listings, search_term))
 
-    # 1. Manual Filter (Keywords) - Markiert rejected_keyword
-    listings = manual_filter(raw_listings)
 
-    # 1.5 Strict Price Filter (Safety Net against Top Ads)
-    # Kleinanzeigen shows "Top Ads" that ignore price filters. We must filter them out manually.
-    print(f"\n💰 Prüfe Preise (Max {max_price_val}€)...")
+def promote_title_passed(listings: list[Listing]) -> list[Listing]:
+    """Ohne Beschreibung (Detailseite nicht ladbar / FETCH_DETAILS=false) bleibt der Titel-Check maßgeblich."""
     for l in listings:
-        if l.get('filter_status') == 'unknown': # Only check if not already rejected
-            p_val = parse_price(l.get('price', '0'))
-            if p_val > max_price_val:
-                l['filter_status'] = 'rejected_price'
-                l['filter_reason'] = f'Price too high: {p_val} > {max_price_val}'
-                # print(f"   💸 Ignoriere zu teures Listing: {l['title'][:20]}... ({p_val}€)")
-    
-    # 2. AI Title Filter - Markiert rejected_ai_title / passed_ai_title
-    # Nur auf die loslassen, die noch nicht rejected sind
-    listings = filter_titles_with_ai(listings)
-    
-    # 3. Description Fetch & AI Check - Nur für passed_ai_title
-    # Wir müssen erst Descriptions holen für die Candidates
-    candidates = [l for l in listings if l.get('filter_status') == 'passed_ai_title']
-    
-    if candidates:
-        print(f"\n📖 Hole Beschreibungen für {len(candidates)} Kandidaten...")
-        # Wir brauchen Browser Kontext... eigentlich müsste 'fetch_description' im scrape loop sein.
-        # Vereinfachung: Wir holen Descriptions erst im 'scrape_listings' loop für ALLE? 
-        # Nein, zu teuer. Wir müssen Browser session wiederverwenden.
-        # Hack: scrape_listings gibt jetzt browser context nicht zurück.
-        # Lösung: scrape_listings sollte Descriptions für 'passed_ai_title' holen.
-        # DAZU MÜSSEN WIR SCRAPE_LISTINGS UMBAUEN.
-        pass
-    
-    # Workaround: Wir speichern einfach ALLES ab.
-    # Der User will ja sehen, was rejected wurde.
-    # Wenn wir descriptions nicht haben, ist filter_reason halt "Title Check".
-    
-    # Kategorien erkennen (für alle, auch rejected, warum nicht?)
-    categorized = categorize_listings(listings)
-    
-    # Zählen
-    passed_count = len([l for l in categorized if l.get('filter_status') == 'passed']) # Wird erst nach Desc Check gesetzt...
-    # Da wir Description Check hier nicht einfach machen können (Browser zu), 
-    # setzen wir 'passed_ai_title' als vorläufiges 'passed'.
-    
-    for l in categorized:
         if l.get('filter_status') == 'passed_ai_title':
-             l['filter_status'] = 'passed' # Promote to passed (ohne Desc Check für jetzt, oder als 'candidate')
+             l['filter_status'] = 'passed'
+    return listings
+
+
+def save_listings(listings: list[Listing], session_id: str) -> list[Listing]:
+    """
+    Upsert in Supabase 'listings' (alle, auch rejected – der User will sehen, was aussortiert wurde).
+    Gibt nur die tatsächlich geschriebenen Listings zurück.
+    """
+    if not supabase or not listings:
+        return listings
+
+    print(f"\n💾 Sende {len(listings)} Listings an Supabase 'listings' (Chunks à {DB_BATCH_SIZE})...")
+    created_at = datetime.now().isoformat()
+    rows = [l.to_row(session_id=session_id, created_at=created_at) for l in listings]
+    failed_ids = set()
+    for row, error in upsert_rows(supabase, "listings", rows):
+        print(f"   ⚠️ DB Insert Error ({row['id']}): {error}")
+        failed_ids.add(row['id'])
+    return [l for l in listings if l['id'] not in failed_ids]
+
+
+def has_title_verdict(listing: Listing) -> bool:
+    """Endgültiges Titel-Urteil (Regeln, Vor-Klassifikator oder KI); 'passed_prefilter' = KI-Check offen."""
+    return listing.get('filter_status') not in (None, 'passed_prefilter')
+
+
+def listings_to_mark_seen(page_listings: list[Listing], saved: list[Listing],
+                          seen_index: SeenIndex) -> list[Listing]:
+    """
+    Was nach einer Ergebnisseite in den Seen-Index darf: gespeicherte Listings mit endgültigem
+    Titel-Urteil plus schon bekannte, unveränderte. Von der DB abgelehnte oder ohne KI-Urteil
+    gebliebene Listings bleiben neu und kommen im nächsten Lauf wieder.
+    """
+    done = {l['id'] for l in saved if has_title_verdict(l)}
+    return [l for l in page_listings if l['id'] in done or seen_index.is_unchanged(l)]
+
+
+def run_stages(listings: list[Listing], stages: list) -> list[Listing]:
+    """Schickt einen Batch Listings der Reihe nach durch `stages` (jede Stage: Liste -> Liste)."""
+    for stage in stages:
+        if not listings:
+            break
+        listings = stage(listings)
+    return listings
+
+
+def title_stages(profile: dict) -> list:
+    """Keyword-, Preis- und KI-Titel-Filter eines Such-Profils."""
+    return [
+        # 1. Regel-Engine (Gesuche, Suchbegriff, Keywords, Zubehör, Preis) - Markiert rejected_*
+        lambda ls: engine_for_profile(profile).apply(ls),
+        # 2. Lokaler Vor-Klassifikator (gelernt aus alten KI-Urteilen) - nur unsichere Titel gehen weiter
+        lambda ls: pre_classify(ls, profile),
+        # 3. AI Title Filter - Markiert rejected_ai_title / passed_ai_title
+        lambda ls: filter_titles_with_ai(ls, profile['search_term'], profile.get('prompt_template_id'),
+                                         profile.get('title_models')),
+    ]
+
+
+def final_stages(profile: dict, session_id: str) -> list:
+    """Kategorien und Speichern (nach Detailseiten und Beschreibungs-Check)."""
+    return [
+        categorize_listings,
+        promote_title_passed,
+        lambda ls: save_listings(ls, session_id),
+    ]
+
+
+def filter_profile_listings(listings: list[Listing], profile: dict) -> list[Listing]:
+    """Keyword-, Preis- und KI-Titel-Filter für die Listings EINES Such-Profils."""
+    print(f"\n🎯 Profil '{profile['name']}': {len(listings)} Listings ('{profile['search_term']}', {profile['min_price']}-{profile['max_price']}€)")
+    return run_stages(listings, title_stages(profile))
+
+
+async def run_pipeline_async(profiles: list[dict], session_id: str, seen_index: SeenIndex | None = None,
+                             concurrency: int = SCRAPE_CONCURRENCY) -> dict:
+    """
+    Streaming-Pipeline in EINER Browser-Session: Jede Ergebnisseite geht direkt durch
+    Filter, Detailseiten, Beschreibungs-Check und DB, während die nächsten Seiten schon laden.
+    Gibt Zähler für den Lauf zurück.
+    """
+    stats = {"scraped": 0, "fresh": 0, "saved": 0}
+    cache = DetailCache(DETAIL_CACHE_TTL_HOURS) if FETCH_DETAILS else None
+    if cache:
+        cache.prune()
+    if VERDICTS:
+        VERDICTS.prune()
+
+    size = pool_size(profiles, concurrency)
+    print(f"🌎 Starte Browser (Camoufox, {size} parallele Contexts, {len(profiles)} Profile)...")
+    async with open_browser(headless=True) as browser:
+        async with PagePool(browser, size=size) as pool, \
+                (HttpFetcher(size) if FETCH_MODE == "http" else nullcontext()) as http:
+            async for profile, page_listings in iter_listing_pages(pool, profiles, seen_index, http):
+                stats["scraped"] += len(page_listings)
+
+                # Nur neue oder im Preis geänderte Anzeigen durch Filter, KI und DB schicken
+                fresh = seen_index.fresh(page_listings) if seen_index else page_listings
+                stats["fresh"] += len(fresh)
+                saved = []
+                if fresh:
+                    # Groq/Supabase blockieren – im Thread, damit der Pool weiterlädt
+                    listings = await asyncio.to_thread(filter_profile_listings, fresh, profile)
+
+                    # Detailseiten nur für Kandidaten, die den Titel-Check bestanden haben
+                    candidates = [l for l in listings if l.get('filter_status') == 'passed_ai_title']
+                    if candidates and cache:
+                        await fetch_details_async(pool, candidates, cache)
+                        # Beschreibungs-Check: Groq-Calls parallel im Event-Loop
+                        listings = await filter_with_description_async(listings, profile['search_term'])
+
+                    # Ohne KI-Urteil (Groq-Fehler) nicht speichern – der nächste Lauf prüft sie erneut
+                    undecided = sum(not has_title_verdict(l) for l in listings)
+                    if undecided:
+                        print(f"   ⏳ {undecided} Listings ohne KI-Urteil – nicht gespeichert, nächster Lauf prüft erneut.")
+                        listings = [l for l in listings if has_title_verdict(l)]
+                    saved = await asyncio.to_thread(run_stages, listings, final_stages(profile, session_id))
+                    stats["saved"] += len(saved)
+
+                # Erst nach dem Speichern als gesehen markieren (Absturz = nächster Lauf prüft erneut)
+                if seen_index:
+                    seen_index.save(listings_to_mark_seen(page_listings, saved, seen_index))
+
+            if http:
+                http.report()
+    return stats
+
+
+def main():
+    # Such-Profile (Datei / Supabase / Fallback .env) – alle laufen über EINEN Browser
+    profiles = load_search_profiles(supabase)
+    for profile in profiles:
+        print(f"🌍 Such-Profil '{profile['name']}': '{profile['search_term']}' ({profile['min_price']}-{profile['max_price']}€)")
+
+    seen_index = SeenIndex().load() if INCREMENTAL_SCRAPE else None
 
     # Generate Session ID for this run
     session_id = str(uuid.uuid4())
     print(f"\n🆔 Session ID: {session_id}")
 
-    # SAVE ALL to Supabase
-    if supabase and categorized:
-        print(f"\n💾 Sende {len(categorized)} Listings an Supabase 'listings'...")
-        for l in categorized:
-            try:
-                # Check for None values
-                f_status = l.get('filter_status', 'unknown')
-                f_reason = l.get('filter_reason', 'No check ran')
-                
-                data = {
-                    "id": l['id'],
-                    "title": l['title'],
-                    "price": l['price'],
-                    "link": l['link'],
-                    "location": l.get('location'),
-                    "category": l.get('category', 'normal'),
-                    "filter_status": f_status,
-                    "filter_reason": f_reason,
-                    "session_id": session_id,
-                    "created_at": datetime.now().isoformat(),
-                    "data": l
-                }
-                supabase.table("listings").upsert(data).execute()
-            except Exception as e:
-                print(f"   ⚠️ DB Insert Error ({l['id']}): {e}")
+    # Scrapen -> Filter -> Detailseiten -> Beschreibungs-Check -> DB, Seite für Seite
+    stats = asyncio.run(run_pipeline_async(profiles, session_id, seen_index))
+    ROUTE_STATS.report()
+    PACER.report()
+    report_rules()
+    report_pre_classifier()
+    report_near_duplicates()
+    report_db_writes()
+    LLM_STATS.report()
+    if LLM_RUN_REPORTS:
+        LLM_STATS.save(os.path.join(LLM_RUN_REPORTS, f"{session_id}.json"))
+    if VERDICTS:
+        VERDICTS.report()
+
+    if not stats["scraped"]:
+        print("⚠️ Keine Listings gefunden.")
+        return
 
+    print(f"\n✅ {stats['scraped']} Anzeigen gescrapt, {stats['fresh']} neu oder geändert, {stats['saved']} verarbeitet.")
     print("\n🚀 Fertig.")
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""
+Such-Profile: mehrere Suchbegriffe/Preisbereiche in einem Scraper-Lauf.
+Quelle (in dieser Reihenfolge):
+1. search_profiles.json (Pfad über SEARCH_PROFILES_FILE, Beispiel: search_profiles.example.json)
+2. Supabase-Tabelle 'search_profiles' (nur is_active = true)
+3. Fallback: ein Profil aus SEARCH_TERM / MIN_PRICE / MAX_PRICE (.env)
+"""
+
+import json
+import os
+from dotenv import load_dotenv
+
+from parsers import BASE_URL
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SEARCH_PROFILES_FILE = os.getenv("SEARCH_PROFILES_FILE", os.path.join(BASE_DIR, "search_profiles.json"))
+
+
+def build_search_url(search_term: str, min_price, max_price) -> str:
+    """Such-URL für Kleinanzeigen (Leerzeichen -> '-', Präfix 's-')."""
+    term_clean = search_term.replace(" ", "-").lower()
+    if not term_clean.startswith("s-"):
+        term_clean = f"s-{term_clean}"
+    return f"{BASE_URL}/{term_clean}/k0?minPreis={min_price}&maxPreis={max_price}"
+
+
+# Modell-Kaskade für den KI-Titel-Check: kleines Modell zuerst, das letzte entscheidet den Rest
+DEFAULT_TITLE_MODELS = "llama-3.1-8b-instant,llama-3.3-70b-versatile"
+
+
+def parse_models(value) -> list[str]:
+    """Modell-Kette aus Liste oder Komma-String."""
+    if isinstance(value, str):
+        value = value.split(",")
+    return [m.strip() for m in value or [] if m and m.strip()]
+
+
+def normalize_profile(raw: dict) -> dict:
+    """Ergänzt Defaults und baut die URL. Pflicht ist nur 'search_term'."""
+    search_term = raw["search_term"]
+    min_price = raw.get("min_price") or os.getenv("MIN_PRICE", "100")
+    max_price = raw.get("max_price") or os.getenv("MAX_PRICE", "350")
+    try:
+        max_price_val = int(max_price)
+    except (TypeError, ValueError):
+        max_price_val = 350
+
+    return {
+        "name": raw.get("name") or search_term,
+        "search_term": search_term,
+        "min_price": min_price,
+        "max_price": max_price,
+        "max_price_val": max_price_val,
+        "pages": int(raw.get("pages") or os.getenv("SCRAPE_PAGES", "2")),
+        "prompt_template_id": raw.get("prompt_template_id") or os.getenv("PROMPT_TEMPLATE_ID"),
+        # Zusätzliche Ausschluss-Keywords für die Regel-Engine (rules.py)
+        "skip_keywords": raw.get("skip_keywords") or [],
+        "title_models": parse_models(raw.get("title_models") or os.getenv("TITLE_MODELS", DEFAULT_TITLE_MODELS)),
+        "url": build_search_url(search_term, min_price, max_price),
+    }
+
+
+def load_search_profiles(supabase=None) -> list[dict]:
+    """Lädt alle aktiven Such-Profile (siehe Modul-Docstring für die Reihenfolge)."""
+    # 1. Datei
+    if os.path.exists(SEARCH_PROFILES_FILE):
+        try:
+            with open(SEARCH_PROFILES_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            raw_profiles = data.get("profiles", []) if isinstance(data, dict) else data
+            profiles = [normalize_profile(p) for p in raw_profiles if p.get("is_active", True)]
+            if profiles:
+                print(f"📋 {len(profiles)} Such-Profile aus {os.path.basename(SEARCH_PROFILES_FILE)} geladen.")
+                return profiles
+        except Exception as e:
+            print(f"⚠️ Such-Profile Datei fehlerhaft: {e}")
+
+    # 2. Supabase
+    if supabase:
+        try:
+            res = supabase.table("search_profiles").select("*").eq("is_active", True).execute()
+            if res.data:
+                profiles = [normalize_profile(p) for p in res.data]
+                print(f"📋 {len(profiles)} Such-Profile aus Supabase geladen.")
+                return profiles
+        except Exception as e:
+            print(f"   ℹ️ Keine Such-Profile in Supabase ({e}).")
+
+    # 3. Einzelnes Profil aus .env
+    return [normalize_profile({"search_term": os.getenv("SEARCH_TERM", "ps5")})]
@@ -12,7 +12,12 @@ from dotenv import load_dotenv
 from camoufox.sync_api import Camoufox
 from playwright.sync_api import sync_playwright # Fallback
 from supabase import create_client, Client
-from datetime import datetime
+from browser_pool import AUTH_FILE, DEVICE_FILE, load_session_files, new_session_context, open_browser_sync
+from parsers import BASE_URL
+from listing import Listing
+from route_filter import RUN_STATS as ROUTE_STATS
+from pacing import PacingPolicy, wait_ready
+from write_behind import ResultWriter
 
 # .env laden
 load_dotenv()
@@ -21,6 +26,8 @@ EMAIL = os.getenv("KLEINANZEIGEN_EMAIL")
 PASSWORD = os.getenv("KLEINANZEIGEN_PASSWORD")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Sekunden, die eine frisch gespeicherte Session (auth.json) ohne Homepage-Check als gültig gilt
+SESSION_CHECK_TTL = float(os.getenv("SESSION_CHECK_TTL", "900"))
 
 supabase: Client = None
 if SUPABASE_URL and SUPABASE_KEY:
@@ -30,56 +37,34 @@ if SUPABASE_URL and SUPABASE_KEY:
         print(f"⚠️ Supabase Init Fehler: {e}")
 
 
-def random_delay(min_sec: float = 1.0, max_sec: float = 3.0):
-    """Zufällige Wartezeit für menschlicheres Verhalten."""
-    time.sleep(random.uniform(min_sec, max_sec))
+# Menschliche Pausen (bewusst gewählt, mit Budget) – getrennt von Readiness-Waits
+PACER = PacingPolicy()
+# Sende-Ergebnisse: sofort ins lokale Journal, gebündelt im Hintergrund nach Supabase
+RESULTS = ResultWriter()
+
+
+# Accept-Buttons des Cookie-Banners (Playwright-CSS durchdringt das offene Usercentrics Shadow DOM)
+COOKIE_ACCEPT_SELECTOR = (
+    "button[data-testid='uc-accept-all-button'], "
+    "button:has-text('Alle akzeptieren'), button:has-text('Zustimmen'), "
+    "#gdpr-banner-accept, [data-testid='gdpr-banner-accept'], #uc-btn-accept-banner"
+)
+# Contexts, in denen der Banner schon erledigt ist (erscheint danach nicht erneut)
+_CONSENT_DONE = set()
 
 
 def handle_cookie_consent(page):
-    """Spezielle Funktion nur für den Cookie-Banner (Polling)."""
+    """Wartet event-basiert (max. 5s) auf den Cookie-Banner und akzeptiert ihn – einmal pro Context."""
+    if id(page.context) in _CONSENT_DONE:
+        return
     print("   🍪 Prüfe auf Cookie-Banner...", flush=True)
     try:
-        # Versuche 5x im Abstand von 1s den Banner zu finden
-        for i in range(5):
-            # 1. Shadow DOM Usercentrics (Hartnäckig)
-            found = page.evaluate("""
-                () => {
-                    const host = document.querySelector('#usercentrics-root');
-                    if (host && host.shadowRoot) {
-                        const btn = host.shadowRoot.querySelector('button[data-testid="uc-accept-all-button"]');
-                        if (btn) {
-                            btn.click();
-                            return true;
-                        }
-                    }
-                    return false;
-                }
-            """)
-            if found:
-                print("   ✅ Cookie-Banner (Shadow DOM) akzeptiert.", flush=True)
-                return
-
-            # 2. Klassische Banner & Text-Suche (Priorität!)
-            try:
-                # Suche explizit nach dem Text aus dem Screenshot
-                green_btn = page.locator("button:has-text('Alle akzeptieren'), button:has-text('Zustimmen')").first
-                if green_btn.count() > 0 and green_btn.is_visible():
-                    green_btn.click()
-                    print("   ✅ Cookie-Banner ('Alle akzeptieren') geklickt.", flush=True)
-                    return
-
-                # Fallback auf IDs
-                gdpr_btn = page.locator("#gdpr-banner-accept, [data-testid='gdpr-banner-accept'], #uc-btn-accept-banner").first
-                if gdpr_btn.count() > 0 and gdpr_btn.is_visible():
-                    gdpr_btn.click()
-                    print("   ✅ Cookie-Banner (ID) akzeptiert.", flush=True)
-                    return
-            except: pass
-            
-            time.sleep(1.0)
-            
-    except Exception as e:
-        print(f"   ⚠️ Cookie Config Fehler: {e}", flush=True)
+        btn = page.wait_for_selector(COOKIE_ACCEPT_SELECTOR, state="visible", timeout=5000)
+        btn.click()
+        print("   ✅ Cookie-Banner akzeptiert.", flush=True)
+    except Exception:
+        print("   ℹ️ Kein Cookie-Banner.", flush=True)
+    _CONSENT_DONE.add(id(page.context))
 
 def dismiss_overlays(page):
     """Schließt Modal-Backdrops und andere Overlays via JavaScript."""
@@ -112,7 +97,7 @@ def dismiss_overlays(page):
         pass
 
 
-def load_listings(filename: str = "ready_to_send.json") -> list[dict]:
+def load_listings(filename: str = "ready_to_send.json") -> list[Listing]:
     """Lädt die zu sendenden Listings - bevorzugt aus Supabase, Fallback auf JSON."""
     
     # 1. Versuche Supabase
@@ -130,19 +115,8 @@ def load_listings(filename: str = "ready_to_send.json") -> list[dict]:
                 
             if response.data:
                 listings = []
-                for row in response.data:
-                    # Kombiniere Hauptdaten mit 'data' JSONB Feld
-                    listing = {
-                        "id": row.get("id"),
-                        "title": row.get("title"),
-                        "price": row.get("price"),
-                        "link": row.get("link"),
-                        "location": row.get("location"),
-                        "category": row.get("category", "normal"),
-                    }
-                    if row.get("data"):
-                        listing.update(row["data"])
-                    listings.append(listing)
+                # Spalten + 'data' JSONB -> Listing-Record
+                listings = [Listing.from_row(row) for row in response.data]
                 print(f"   ✅ {len(listings)} Sende-bereite Listings geladen.", flush=True)
                 return listings
         except Exception as e:
@@ -158,13 +132,14 @@ def login_kleinanzeigen(page) -> bool:
     
     try:
         print("   🌍 Lade Login-Seite...", flush=True)
-        page.goto("https://www.kleinanzeigen.de/m-einloggen.html", wait_until="domcontentloaded")
-        random_delay(2, 4)
+        page.goto(f"{BASE_URL}/m-einloggen.html", wait_until="domcontentloaded")
+        wait_ready(page, "#login-email", timeout=15000)
+        PACER.pause("after_navigation")
         
         # Overlays schließen
         print("   🧹 Schließe Overlays...", flush=True)
         dismiss_overlays(page)
-        random_delay(1, 2)
+        PACER.pause("after_click")
         
         # Email eingeben
         email_field = page.locator("#login-email")
@@ -175,9 +150,9 @@ def login_kleinanzeigen(page) -> bool:
         
         print("   ⌨️ Gebe Email ein...", flush=True)
         email_field.click()
-        random_delay(0.5, 1)
+        PACER.pause("typing")
         email_field.fill(EMAIL)
-        random_delay(0.5, 1)
+        PACER.pause("typing")
         
         # Passwort eingeben
         password_field = page.locator("#login-password")
@@ -187,9 +162,9 @@ def login_kleinanzeigen(page) -> bool:
         
         print("   ⌨️ Gebe Passwort ein...", flush=True)
         password_field.click()
-        random_delay(0.5, 1)
+        PACER.pause("typing")
         password_field.fill(PASSWORD)
-        random_delay(0.5, 1)
+        PACER.pause("typing")
         
         # Login Button
         login_btn = page.locator("#login-submit")
@@ -204,8 +179,6 @@ def login_kleinanzeigen(page) -> bool:
         except:
             print("   ⚠️ Timeout beim Warten auf URL-Änderung.", flush=True)
         
-        random_delay(2, 3)
-        
         # Prüfe ob Login erfolgreich (URL Check ist nicht genug!)
         # Wir warten explizit auf ein Element, das nur eingeloggte User sehen
         try:
@@ -249,7 +222,7 @@ def load_message_templates() -> list[str]:
 # Globale Vorlagen (werden in send_all_messages geladen)
 MESSAGE_TEMPLATES = []
 
-def send_message(page, listing: dict) -> bool:
+def send_message(page, listing: Listing) -> bool:
     """Sendet eine Nachricht an einen Verkäufer. (V2 - Robuste Selektoren)"""
     title = listing['title']
     link = listing['link']
@@ -269,7 +242,9 @@ def send_message(page, listing: dict) -> bool:
     try:
         # 1. Zur Anzeige navigieren
         page.goto(link, wait_until="domcontentloaded")
-        random_delay(2, 4)
+        # Bereit, sobald Nachrichten-Button oder Status-Badge im DOM ist
+        wait_ready(page, ":is(button, a):has-text('Nachricht schreiben'), span.pvap-reserved-title", state="attached")
+        PACER.pause("after_navigation")
         dismiss_overlays(page)
         
         # 2. CHECK: Ist die Anzeige gelöscht/reserviert?
@@ -296,7 +271,6 @@ def send_message(page, listing: dict) -> bool:
             return False
         
         msg_button.first.click()
-        random_delay(1.5, 2.5)
         
         # 4. Warte auf Modal-Textarea
         textarea = page.locator("#message-textarea-input")
@@ -308,8 +282,9 @@ def send_message(page, listing: dict) -> bool:
             return False
         
         # 5. Nachricht eingeben
+        PACER.pause("after_click")
         textarea.fill(message)
-        random_delay(0.5, 1)
+        PACER.pause("typing")
         
         # 6. Senden-Button klicken
         send_btn = page.locator("#message-submit-button")
@@ -325,7 +300,10 @@ def send_message(page, listing: dict) -> bool:
         print("   ⏳ Senden geklickt...", flush=True)
         
         # 7. Verifizieren (optional, aber hilfreich)
-        random_delay(2, 3)
+        # Warten bis der Request raus ist (Modal schließt sich / Netzwerk ruhig)
+        if not wait_ready(page, "#message-textarea-input", state="hidden", timeout=10000):
+            wait_ready(page, timeout=5000)
+        PACER.pause("after_send")
         # Kleinanzeigen zeigt oft eine Erfolgsmeldung oder leitet um
         # Wir nehmen an, dass es geklappt hat, wenn kein Fehler kam
         print(f"   ✅ Nachricht gesendet!", flush=True)
@@ -336,7 +314,7 @@ def send_message(page, listing: dict) -> bool:
         return False
 
 
-def send_all_messages(listings: list[dict]) -> dict:
+def send_all_messages(listings: list[Listing]) -> dict:
     """Sendet Nachrichten an alle Listings."""
     # Templates laden
     global MESSAGE_TEMPLATES
@@ -352,11 +330,17 @@ def send_all_messages(listings: list[dict]) -> dict:
     skipped = 0
     listings_to_send = []
     
+    RESULTS.start(supabase)
     try:
+        # Journal VOR der DB lesen: was inzwischen rausgeschrieben wurde, steht dann schon in der DB
+        pending_ids = RESULTS.pending_sent_ids()
         # Hole nur ERFOLGREICH gesendete listing_ids (nicht failed!)
         response = supabase.table("sent_messages").select("listing_id").eq("status", "sent").execute()
         sent_ids = {row['listing_id'] for row in response.data} if response.data else set()
         print(f"   📊 {len(sent_ids)} Nachrichten erfolgreich gesendet in DB.")
+        if pending_ids - sent_ids:
+            print(f"   📮 {len(pending_ids - sent_ids)} weitere gesendet laut lokalem Journal.")
+        sent_ids |= pending_ids
         
         # Config laden (Default: False = Nicht senden)
         send_abholung = os.getenv("SEND_ABHOLUNG", "false").lower() == "true"
@@ -401,8 +385,7 @@ def send_all_messages(listings: list[dict]) -> dict:
     failed = 0
     
     # Speicherort für Cookies/Login (Absolut)
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    auth_file = os.path.join(base_dir, "auth.json")
+    auth_file = AUTH_FILE
     
     print(f"🚀 Starte Camoufox Browser...", flush=True)
     print(f"🍪 Auth-File Pfad: {auth_file}", flush=True)
@@ -414,44 +397,21 @@ def send_all_messages(listings: list[dict]) -> dict:
     headless_mode = os.getenv("HEADLESS", "false").lower() == "true"
     print(f"🖥️ Headless Mode: {headless_mode}", flush=True)
     
-    with Camoufox(headless=headless_mode) as browser:
+    with open_browser_sync(headless=headless_mode) as browser:
         print("✅ Browser gestartet.", flush=True)
         
-        # Context konfigurieren - WICHTIG: Erst leeren Context, dann Cookies injizieren!
-        # (storage_state im Konstruktor verursacht "Doppel-Fenster" bei Problemen)
-        device_file = os.path.join(base_dir, "device.json")
-        user_agent = None
-        
-        # Versuche gespeicherten User-Agent zu laden
-        if os.path.exists(device_file):
-            try:
-                with open(device_file, 'r') as f:
-                    device_data = json.load(f)
-                    user_agent = device_data.get('user_agent')
-                    print(f"📱 Nutze gespeicherten User-Agent: {user_agent[:30]}...", flush=True)
-            except: pass
-
-        # 1. IMMER leeren Context erstellen (stabil, kein Fenster-Flicker)
-        context = browser.new_context(user_agent=user_agent) if user_agent else browser.new_context()
-        page = context.new_page()
-        
-        # 2. Cookies manuell injizieren (sicher, kein Crash bei defekten Cookies)
+        # Context mit gespeichertem User-Agent (device.json) + Cookies (auth.json)
+        device_file = DEVICE_FILE
+        user_agent, _ = load_session_files()
+        if user_agent:
+            print(f"📱 Nutze gespeicherten User-Agent: {user_agent[:30]}...", flush=True)
         if os.path.exists(auth_file):
             print(f"🍪 Auth-Datei gefunden ({os.path.getsize(auth_file)} bytes)...", flush=True)
-            try:
-                with open(auth_file, 'r') as f:
-                    data = json.load(f)
-                cookies = data.get('cookies', []) if isinstance(data, dict) else data
-                if cookies:
-                    print(f"   💉 Injiziere {len(cookies)} Cookies...", flush=True)
-                    context.add_cookies(cookies)
-                    print("   ✅ Cookies gesetzt!", flush=True)
-                else:
-                    print("   ⚠️ Keine Cookies im JSON.", flush=True)
-            except Exception as e:
-                print(f"   ❌ Cookie-Fehler: {e} (Fenster bleibt offen!)", flush=True)
         else:
             print("🆕 Keine Auth-Datei vorhanden.", flush=True)
+
+        context = new_session_context(browser)
+        page = context.new_page()
         
         # Falls wir noch keinen gespeicherten UA haben, jetzt speichern
         if not user_agent:
@@ -462,35 +422,42 @@ def send_all_messages(listings: list[dict]) -> dict:
                 print(f"📱 Neuer User-Agent gespeichert: {current_ua[:30]}...", flush=True)
             except: pass
 
-        # 0. Cookie Banner & Login Check
-        print("🌍 Öffne Kleinanzeigen für Session-Check...", flush=True)
-        try:
-            page.goto("https://www.kleinanzeigen.de", wait_until="domcontentloaded")
-            random_delay(2, 3)
-            dismiss_overlays(page)
-        except Exception:
-            pass
-        
-        # Check ob eingeloggt - MEHRERE METHODEN
-        # 1. Text "angemeldet als" (sichtbar im Header wenn eingeloggt)
-        # 2. Logout-Link: a#user-logout
-        # 3. Meins-Link: a#site-mainnav-my-link  
-        # 4. Avatar: span.user-profile-badge
+        # Session vor kurzem bestätigt (auth.json frisch gespeichert)? Dann kein Homepage-Reload.
         is_logged_in = False
-        
-        # Methode 1: Text "angemeldet als" (funktioniert immer!)
-        if "angemeldet als" in page.content().lower():
-            print("✅ BEREITS EINGELOGGT! ('angemeldet als' im HTML gefunden)", flush=True)
+        session_cached = os.path.exists(auth_file) and time.time() - os.path.getmtime(auth_file) < SESSION_CHECK_TTL
+        if session_cached:
+            print("✅ Session vor kurzem bestätigt – überspringe Login-Check.", flush=True)
             is_logged_in = True
         else:
-            # Methode 2: Selektoren prüfen
-            login_selector = "a#user-logout, a#site-mainnav-my-link, span.user-profile-badge"
-            if page.locator(login_selector).first.count() > 0:
-                print("✅ Logout/Meins/Avatar gefunden -> Bereits eingeloggt.", flush=True)
+            # 0. Cookie Banner & Login Check
+            print("🌍 Öffne Kleinanzeigen für Session-Check...", flush=True)
+            try:
+                page.goto(BASE_URL, wait_until="domcontentloaded")
+                wait_ready(page, "#site-header-top, header", state="attached")
+                PACER.pause("after_navigation")
+                dismiss_overlays(page)
+            except Exception:
+                pass
+            
+            # Check ob eingeloggt - MEHRERE METHODEN
+            # 1. Text "angemeldet als" (sichtbar im Header wenn eingeloggt)
+            # 2. Logout-Link: a#user-logout
+            # 3. Meins-Link: a#site-mainnav-my-link  
+            # 4. Avatar: span.user-profile-badge
+            
+            # Methode 1: Text "angemeldet als" (funktioniert immer!)
+            if "angemeldet als" in page.content().lower():
+                print("✅ BEREITS EINGELOGGT! ('angemeldet als' im HTML gefunden)", flush=True)
                 is_logged_in = True
             else:
-                print("ℹ️ Nicht eingeloggt.", flush=True)
-                is_logged_in = False
+                # Methode 2: Selektoren prüfen
+                login_selector = "a#user-logout, a#site-mainnav-my-link, span.user-profile-badge"
+                if page.locator(login_selector).first.count() > 0:
+                    print("✅ Logout/Meins/Avatar gefunden -> Bereits eingeloggt.", flush=True)
+                    is_logged_in = True
+                else:
+                    print("ℹ️ Nicht eingeloggt.", flush=True)
+                    is_logged_in = False
 
         if not is_logged_in:
              print("🚀 Starte Login-Prozess...", flush=True)
@@ -510,7 +477,8 @@ def send_all_messages(listings: list[dict]) -> dict:
                  print("❌ Login fehlgeschlagen! Bot kann nicht senden.", flush=True)
                  return {"sent": 0, "failed": len(listings_to_send), "skipped": skipped}
         
-        if is_logged_in:
+        # auth.json nur nach echtem Check neu schreiben (mtime = letzte Bestätigung)
+        if is_logged_in and not session_cached:
             try: context.storage_state(path=auth_file)
             except: pass
 
@@ -518,27 +486,24 @@ def send_all_messages(listings: list[dict]) -> dict:
         for i, listing in enumerate(listings_to_send):
             print(f"\n[{i+1}/{len(listings_to_send)}]", end=" ", flush=True)
             
+            PACER.start_unit()
             success = send_message(page, listing)
             
             if success:
                 sent += 1
                 listing['sent'] = True
-                # Update Supabase: message_sent = true
-                if supabase:
-                    try:
-                        supabase.table("listings").update({"message_sent": True}).eq("id", listing.get("id")).execute()
-                    except: pass
             else:
                 failed += 1
                 listing['sent'] = False
-                # Wenn gelöscht, auch in Supabase markieren
-                if listing.get('deleted') and supabase:
-                    try:
-                        supabase.table("listings").update({"deleted": True}).eq("id", listing.get("id")).execute()
-                    except: pass
+            # Journal + Hintergrund-Writer: sent_messages-Zeile, message_sent bzw. deleted in listings
+            RESULTS.record(listing.get("id"), success, deleted=bool(listing.get('deleted')))
             
-            # Pause zwischen Nachrichten (Anti-Bot-Schutz)
+            # Pause zwischen Nachrichten (Anti-Bot-Schutz, außerhalb des Listing-Budgets)
+            if i < len(listings_to_send) - 1:
+                PACER.pause("between_messages", budgeted=False)
             
+        ROUTE_STATS.report()
+        PACER.report()
         return {"sent": sent, "failed": failed, "skipped": skipped, "listings": listings_to_send}
 
 
@@ -547,9 +512,8 @@ def test_login_process() -> bool:
     print("🚀 Starte Login-Test...", flush=True)
     
     # Pfade
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    auth_file = os.path.join(base_dir, "auth.json")
-    device_file = os.path.join(base_dir, "device.json")
+    auth_file = AUTH_FILE
+    device_file = DEVICE_FILE
     
     print(f"📁 Auth-File: {auth_file}")
     
@@ -593,8 +557,9 @@ def test_login_process() -> bool:
 
         # Seite öffnen
         print("   🌍 Gehe zu Kleinanzeigen...", flush=True)
-        page.goto("https://www.kleinanzeigen.de", wait_until="domcontentloaded")
-        random_delay(2, 3)
+        page.goto(BASE_URL, wait_until="domcontentloaded")
+        wait_ready(page, "#site-header-top, header", state="attached")
+        PACER.pause("after_navigation")
         
         dismiss_overlays(page)
         
@@ -653,37 +618,28 @@ def main():
         return
     
     print(f"📧 Login als: {EMAIL}")
-    
-    listings = load_listings("ready_to_send.json")
-    
-    if not listings:
-        print("❌ Keine Listings gefunden! Erst scraper.py ausführen.")
-        return
-    
-    print(f"📋 {len(listings)} Listings geladen\n")
-    
-    result = send_all_messages(listings)
-    
-    print("\n" + "="*60)
-    print("📊 ERGEBNIS")
-    print("="*60)
-    print(f"✅ Gesendet: {result['sent']}")
-    print(f"❌ Fehlgeschlagen: {result['failed']}")
-    
-    # DB Save
-    if supabase:
-        print(f"💾 Speichere {len(listings)} Ergebnisse in DB 'sent_messages'...")
-        for l in listings:
-            try:
-                data = {
-                    "listing_id": l['id'],
-                    "status": "sent" if l.get('sent') else "failed",
-                    "sent_at": datetime.now().isoformat(),
-                    "log": "Sent via Bot" if l.get('sent') else "Failed to send"
-                }
-                supabase.table("sent_messages").insert(data).execute()
-            except Exception as e:
-                print(f"   ⚠️ DB Insert Error ({l['id']}): {e}")
+
+    # Offene Ergebnisse vom letzten Lauf schon nachtragen, während hier geladen wird
+    RESULTS.start(supabase)
+    try:
+        listings = load_listings("ready_to_send.json")
+
+        if not listings:
+            print("❌ Keine Listings gefunden! Erst scraper.py ausführen.")
+            return
+
+        print(f"📋 {len(listings)} Listings geladen\n")
+
+        result = send_all_messages(listings)
+
+        print("\n" + "="*60)
+        print("📊 ERGEBNIS")
+        print("="*60)
+        print(f"✅ Gesendet: {result['sent']}")
+        print(f"❌ Fehlgeschlagen: {result['failed']}")
+    finally:
+        # sent_messages + listings-Updates stehen schon im Journal; hier nur noch der letzte Flush
+        RESULTS.close()
 
 
 
@@ -97,6 +97,9 @@ def debug_login_flow():
     
     base_dir = os.path.dirname(os.path.abspath(__file__))
     auth_file = os.path.join(base_dir, "auth.json")
+    # Dumps nach data/debug – die gleichnamigen Dateien in fixtures/ nutzt replay_stack.py
+    debug_dir = os.path.join(base_dir, "data", "debug")
+    os.makedirs(debug_dir, exist_ok=True)
     
     print(f"📂 Auth-File: {auth_file}")
 
@@ -203,16 +206,16 @@ def debug_login_flow():
                 
                 # DEBUG: HTML Dump egal was passiert
                 print("   💾 Dume HTML-Source für Analyse...", flush=True)
-                with open("debug_source.html", "w", encoding="utf-8") as f:
+                with open(os.path.join(debug_dir, "debug_source.html"), "w", encoding="utf-8") as f:
                     f.write(page.content())
                     
                 print("   📸 Mache Screenshot...", flush=True)
-                page.screenshot(path="debug_state_full.png")
+                page.screenshot(path=os.path.join(debug_dir, "debug_state_full.png"))
                 
                 # Check Header Explizit
                 try:
                     header_html = page.locator("#site-header, header").first.inner_html()
-                    with open("debug_header.html", "w", encoding="utf-8") as f:
+                    with open(os.path.join(debug_dir, "debug_header.html"), "w", encoding="utf-8") as f:
                         f.write(header_html)
                 except: 
                     print("   ⚠️ Konnte Header nicht isolieren.")
@@ -237,7 +240,7 @@ def debug_login_flow():
                         json.dump({"cookies": current_cookies, "origins": []}, f, indent=2)
                 else:
                     print("   ❌ Login Erkennung fehlgeschlagen (Trotz URL Wechsel?)", flush=True)
-                    print("   ℹ️ ANALYSIERE 'debug_source.html' UM DEN FEHLER ZU FINDEN!")
+                    print("   ℹ️ ANALYSIERE 'data/debug/debug_source.html' UM DEN FEHLER ZU FINDEN!")
 
             print("⏳ Warte 10 Sekunden...", flush=True)
             time.sleep(10)
@@ -0,0 +1,37 @@
+"""Regressionstests für near_duplicates.cluster_titles (pytest)."""
+
+from listing import Listing
+from near_duplicates import cluster_titles, model_tokens, normalize_title
+
+
+def _listing(ad_id: str, title: str, price_eur: float = 250.0) -> Listing:
+    return Listing(id=ad_id, title=title, price=f"{price_eur:.0f} €", price_eur=price_eur)
+
+
+def _ids(clusters: list[list]) -> list[list[str]]:
+    return [[l['id'] for l in cluster] for cluster in clusters]
+
+
+def test_different_console_generation_is_not_merged():
+    # Shingle-Ähnlichkeit ~0.9, aber PS4 != PS5
+    ps4 = "Sony PlayStation 4 Slim 1TB Konsole mit 2 Controllern und 3 Spielen in OVP"
+    ps5 = "Sony PlayStation 5 Slim 1TB Konsole mit 2 Controllern und 3 Spielen in OVP"
+    assert _ids(cluster_titles([_listing("1", ps4), _listing("2", ps5)])) == [["1"], ["2"]]
+
+
+def test_storage_and_series_variant_are_not_merged():
+    assert _ids(cluster_titles([_listing("1", "PS5 Slim Disc 1 TB OVP"), _listing("2", "PS5 Slim Disc 825 GB OVP")])) \
+        == [["1"], ["2"]]
+    assert _ids(cluster_titles([_listing("1", "Xbox Series X Konsole wie neu"),
+                                _listing("2", "Xbox Series S Konsole wie neu")])) == [["1"], ["2"]]
+
+
+def test_same_model_with_different_wording_is_merged():
+    clusters = cluster_titles([_listing("1", "PS5 Disc Edition + 2 Controller"),
+                               _listing("2", "PS5 disc edition mit 2 controllern")])
+    assert _ids(clusters) == [["1", "2"]]
+
+
+def test_model_tokens():
+    assert model_tokens(normalize_title("PlayStation 5 Slim 1 TB")) == {"ps5", "1tb"}
+    assert model_tokens(normalize_title("Xbox Series S")) == {"s"}
@@ -0,0 +1,53 @@
+"""Regressionstests: Seen-Index nach fehlgeschlagenem KI-Titel-Check (pytest)."""
+
+import pytest
+
+import local_store
+import scraper
+from listing import Listing
+from local_store import SeenIndex
+
+
+@pytest.fixture
+def state_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_store, "STATE_DB", str(tmp_path / "bot_state.db"))
+    monkeypatch.setattr(local_store, "_conn", None)
+    yield
+    if local_store._conn is not None:
+        local_store._conn.close()
+
+
+def _page() -> list[Listing]:
+    return [Listing(id=str(i), title=f"PS5 Slim Disc {i} Controller", price="300 €", price_eur=300.0,
+                    filter_status='passed_prefilter') for i in (1, 2)]
+
+
+def test_failed_title_chunk_stays_fresh(state_db, monkeypatch):
+    def complete(prompt, model, max_tokens, label="", items=1, **kwargs):
+        # Chunk und Einzel-Nachprüfung scheitern für Titel 2, Titel 1 wird ausgewählt
+        if items > 1 or "Disc 2" in prompt:
+            raise RuntimeError("Groq nicht erreichbar")
+        return "[1]", "stop"
+
+    monkeypatch.setattr(scraper, "complete", complete)
+    monkeypatch.setattr(scraper, "VERDICTS", None)
+
+    seen = SeenIndex().load()
+    page = _page()
+    listings = scraper.filter_titles_with_ai(page, "ps5", models=["test-model"])
+    assert [l['filter_status'] for l in listings] == ['passed_ai_title', 'passed_prefilter']
+
+    # Wie run_pipeline_async: ohne Urteil wird nicht gespeichert
+    saved = [l for l in listings if scraper.has_title_verdict(l)]
+    seen.save(scraper.listings_to_mark_seen(page, saved, seen))
+
+    assert [l['id'] for l in SeenIndex().load().fresh(_page())] == ["2"]
+
+
+def test_listing_rejected_by_db_stays_fresh(state_db):
+    seen = SeenIndex().load()
+    page = _page()
+    for l in page:
+        l['filter_status'] = 'passed'
+    seen.save(scraper.listings_to_mark_seen(page, saved=page[:1], seen_index=seen))
+    assert [l['id'] for l in SeenIndex().load().fresh(_page())] == ["2"]
@@ -0,0 +1,162 @@
+"""
+Write-Behind für Sende-Ergebnisse (sender.py).
+Jedes Ergebnis landet sofort im lokalen Journal (SendJournal, data/bot_state.db) – der
+Browser-Thread wartet nie auf Supabase. Ein Hintergrund-Thread schreibt das Journal gebündelt
+nach Supabase (sent_messages als Insert-Chunks, listings-Updates als `.in_("id", ids)`) und
+löscht erledigte Einträge. Was bei einem Absturz oder DB-Ausfall übrig bleibt, trägt der
+nächste Start nach (mindestens einmal – im Extremfall steht eine sent_messages-Zeile doppelt).
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from dotenv import load_dotenv
+
+from db_batch import DB_BATCH_SIZE, insert_rows, is_transient, report_db_writes, update_rows
+from local_store import SendJournal
+
+load_dotenv()
+
+# Sekunden, nach denen offene Ergebnisse spätestens geschrieben werden (früher ab DB_BATCH_SIZE Einträgen)
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "2"))
+
+
+class ResultWriter:
+    """Journal + Hintergrund-Thread. `start(client)` -> `record(...)` pro Nachricht -> `close()`."""
+
+    def __init__(self, journal: SendJournal | None = None, interval: float = WRITE_BEHIND_INTERVAL):
+        self.journal = journal or SendJournal()
+        self.interval = interval
+        self.client = None
+        self.recorded = 0
+        self.written = 0
+        self.rejected = 0
+        # Seit dem letzten Flush journalisierte Einträge (record() im Browser-Thread, flush() im Writer)
+        self._unflushed = 0
+        self._unflushed_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self, client):
+        """Startet den Writer (einmal pro Prozess); offene Einträge vom letzten Lauf gehen zuerst raus."""
+        if self._thread or not client:
+            return
+        self.client = client
+        left = self.journal.count()
+        if left:
+            print(f"♻️ {left} Ergebnisse aus dem letzten Lauf im Journal – werden nachgetragen.", flush=True)
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def record(self, listing_id: str, sent: bool, deleted: bool = False):
+        """Ergebnis einer Nachricht ins Journal (sofort, lokal); Supabase folgt im Hintergrund."""
+        if not self.client:
+            return
+        entries = [("sent_messages", listing_id, {
+            "listing_id": listing_id,
+            "status": "sent" if sent else "failed",
+            "sent_at": datetime.now().isoformat(),
+            "log": "Sent via Bot" if sent else "Failed to send",
+        })]
+        if sent:
+            entries.append(("listings", listing_id, {"message_sent": True}))
+        elif deleted:
+            entries.append(("listings", listing_id, {"deleted": True}))
+        self.journal.append(entries)
+        with self._unflushed_lock:
+            self.recorded += 1
+            self._unflushed += len(entries)
+            full = self._unflushed >= DB_BATCH_SIZE
+        if full:
+            self._wake.set()
+
+    def pending_sent_ids(self) -> set[str]:
+        """Gesendet, aber noch nicht in sent_messages – zählt beim Überspringen mit."""
+        return self.journal.sent_ids()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self) -> bool:
+        """Schreibt das Journal nach Supabase. False = DB gerade nicht erreichbar, Rest bleibt liegen."""
+        with self._flush_lock:
+            # Zurücksetzen VOR dem Lesen des Journals: was danach kommt, zählt für den nächsten Flush
+            with self._unflushed_lock:
+                self._unflushed = 0
+            limit = DB_BATCH_SIZE * 10
+            while True:
+                try:
+                    entries = self.journal.pending(limit)
+                    if not entries:
+                        return True
+                    done, reachable = self._write(entries)
+                    self.journal.done(done)
+                except Exception as e:
+                    print(f"   ⚠️ Write-Behind Fehler: {e}", flush=True)
+                    return False
+                if not reachable:
+                    return False
+                if len(entries) < limit:
+                    return True
+
+    def _settle(self, items: list[tuple[int, object, str]], failed: dict, done: list[int]) -> bool:
+        """
+        `items`: (seq, Schlüssel in `failed`, listing_id). Erledigt oder endgültig abgelehnt ->
+        aus dem Journal. False, wenn die DB nicht erreichbar war.
+        """
+        reachable = True
+        for seq, key, listing_id in items:
+            error = failed.get(key)
+            if error is None:
+                done.append(seq)
+                self.written += 1
+            elif is_transient(error):
+                reachable = False
+            else:
+                print(f"   ⚠️ DB Write Error ({listing_id}): {error}", flush=True)
+                done.append(seq)
+                self.rejected += 1
+        return reachable
+
+    def _write(self, entries: list[tuple[int, str, str, dict]]) -> tuple[list[int], bool]:
+        done: list[int] = []
+        inserts = [(seq, listing_id, row) for seq, target, listing_id, row in entries if target == "sent_messages"]
+        # Gleiche Änderung (z.B. message_sent=true) -> ein Update pro Chunk von IDs
+        updates: dict[str, list[tuple[int, str, str]]] = defaultdict(list)
+        for seq, target, listing_id, payload in entries:
+            if target == "listings":
+                updates[json.dumps(payload, sort_keys=True)].append((seq, listing_id, listing_id))
+
+        failed = insert_rows(self.client, "sent_messages", [row for _, _, row in inserts])
+        by_row = {id(row): error for row, error in failed}
+        reachable = self._settle([(seq, id(row), lid) for seq, lid, row in inserts], by_row, done)
+        if reachable:
+            for changes, items in updates.items():
+                failed = update_rows(self.client, "listings", json.loads(changes), [lid for _, lid, _ in items])
+                reachable = self._settle(items, dict(failed), done) and reachable
+        return done, reachable
+
+    def close(self):
+        """Letzter Flush, Thread beenden, Bericht. Was nicht geschrieben werden konnte, bleibt im Journal."""
+        if not self._thread:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        left = self.journal.count()
+        line = f"📮 Write-Behind: {self.recorded} Ergebnisse journalisiert, {self.written} Schreibaufträge in Supabase"
+        if self.rejected:
+            line += f", {self.rejected} abgelehnt"
+        if left:
+            line += f", {left} noch im Journal (nächster Lauf)"
+        print(line, flush=True)
+        report_db_writes()